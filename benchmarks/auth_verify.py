@@ -0,0 +1,75 @@
+"""
+Задержка проверки авторизации: подписанный токен против сессии в файле.
+
+Запуск из корня проекта:
+    python -m benchmarks.auth_verify --iterations 20000 --sessions 1000
+
+Сравниваются три пути verify():
+    file    — SessionManager без кэша: exists() и чтение JSON через executor на каждый запрос;
+    cached  — SessionManager с кэшем сессий (после прогрева);
+    token   — TokenSigner.verify, только HMAC.
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, List
+
+from src.chat.business.auth_token import TokenSigner
+from src.chat.business.session_cache import SessionCache
+from src.chat.business.session_interactor import SessionManager
+
+
+async def measure(iterations: int, call: Callable[[int], Awaitable[object]]) -> List[float]:
+    samples: List[float] = []
+    for index in range(iterations):
+        started = time.perf_counter()
+        await call(index)
+        samples.append((time.perf_counter() - started) * 1_000_000)
+    return samples
+
+
+def report(title: str, samples: List[float]) -> None:
+    ordered = sorted(samples)
+    p99 = ordered[int(len(ordered) * 0.99) - 1]
+    print(
+        f"{title:<8} p50={statistics.median(ordered):9.1f} мкс  p99={p99:9.1f} мкс  "
+        f"{len(ordered) / (sum(ordered) / 1_000_000):10.0f} проверок/с"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--sessions", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = SessionManager(sessions_dir=Path(tmp))
+        session_ids = [f"bench-{index}" for index in range(args.sessions)]
+        salts = [await manager.set_password(session_id, "password") for session_id in session_ids]
+
+        async def verify_session(index: int) -> object:
+            position = index % args.sessions
+            return await manager.verify_session(session_ids[position], salts[position])
+
+        manager._cache = SessionCache(max_entries=0, ttl=0, negative_ttl=0)
+        report("file", await measure(args.iterations, verify_session))
+
+        manager._cache = SessionCache(max_entries=args.sessions, ttl=3600, negative_ttl=5)
+        await measure(args.sessions, verify_session)
+        report("cached", await measure(args.iterations, verify_session))
+
+    signer = TokenSigner(secret=b"benchmark-secret", ttl=3600)
+    tokens = [signer.issue(session_id) for session_id in session_ids]
+
+    async def verify_token(index: int) -> object:
+        return signer.verify(tokens[index % args.sessions])
+
+    report("token", await measure(args.iterations, verify_token))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""
+Скорость декодирования строк messages в Message.
+
+Запуск из корня проекта:
+    python -m benchmarks.decode_messages --sizes 10000 100000
+
+Сравниваются: валидирующий конструктор Message(...) (как было раньше), декодирование DbManager
+через Message.model_construct (_row_to_message) и потоковый iter_messages.
+"""
+import argparse
+import asyncio
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from src.chat.db.db_manager import DbManager, MESSAGE_COLUMNS, _row_to_message
+from src.chat.model.messages import Message, MessageType
+from benchmarks.event_loop_latency import seed
+
+
+def validated(row: sqlite3.Row) -> Message:
+    return Message(
+        id=row["id"],
+        chat_id=row["chat_id"],
+        session_id=row["session_id"],
+        message_type=MessageType(row["message_type"]),
+        agent_id=row["agent_id"],
+        name=row["name"],
+        timestamp=row["timestamp"],
+        message=row["message"],
+        prompt_tokens=row["prompt_tokens"],
+        completion_tokens=row["completion_tokens"],
+        request_time=row["request_time"],
+        price=row["price"],
+        meta=row["meta"],
+    )
+
+
+def decode_rate(rows: List, decode: Callable) -> float:
+    started = time.perf_counter()
+    for row in rows:
+        decode(row)
+    return len(rows) / (time.perf_counter() - started)
+
+
+async def run(size: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DbManager(db_dir=Path(tmp))
+        seed(db, "bench", size)
+
+        with db._pool.connection() as connection:
+            rows = connection.execute(
+                f"SELECT {MESSAGE_COLUMNS} FROM {db.TABLE_MESSAGES} WHERE chat_id = ? ORDER BY id", ("bench",)
+            ).fetchall()
+
+        validated_rate = decode_rate(rows, validated)
+        construct_rate = decode_rate(rows, _row_to_message)
+
+        started = time.perf_counter()
+        streamed = 0
+        async for _ in db.iter_messages("bench", batch_size=1000):
+            streamed += 1
+        stream_rate = streamed / (time.perf_counter() - started)
+        db.close()
+
+    print(
+        f"{size:>8} строк  validated={validated_rate:9.0f}  model_construct={construct_rate:9.0f}  "
+        f"iter_messages={stream_rate:9.0f} rows/s (последнее — вместе с чтением из базы)"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        await run(size)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""
+Задержка event loop во время чтения длинной истории.
+
+Запуск из корня проекта:
+    python -m benchmarks.event_loop_latency --messages 200000
+
+Параллельно с get_messages крутится "пульс" — корутина, которая спит 1 мс и меряет,
+на сколько она опоздала. Это и есть задержка для любых других запросов воркера
+(verify(), статика). Сравниваются чтение через executor DbManager и прямой блокирующий вызов.
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from src.chat.db.db_manager import DbManager
+
+HEARTBEAT_INTERVAL = 0.001
+
+
+def seed(db: DbManager, chat_id: str, count: int) -> None:
+    rows = [
+        (chat_id, "bench", "USER" if i % 2 else "AI", None, "bench", "00:00:00", f"message {i} " * 8, 0, 0, 0, 0, "")
+        for i in range(count)
+    ]
+    with db._pool.connection() as connection:
+        connection.executemany(
+            f'''
+            INSERT INTO {db.TABLE_MESSAGES}
+            (chat_id, session_id, message_type, agent_id, name, timestamp, message, prompt_tokens, completion_tokens, request_time, price, meta)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''',
+            rows,
+        )
+        connection.commit()
+
+
+async def heartbeat(lags: List[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        lags.append((time.perf_counter() - started - HEARTBEAT_INTERVAL) * 1000)
+
+
+async def measure(db: DbManager, chat_id: str, reads: int, blocking: bool) -> List[float]:
+    lags: List[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(heartbeat(lags, stop))
+    await asyncio.sleep(0.05)
+
+    for _ in range(reads):
+        if blocking:
+            db._get_messages(chat_id, None, None)
+            await asyncio.sleep(0)
+        else:
+            await db.get_messages(chat_id=chat_id)
+
+    stop.set()
+    await probe
+    return lags
+
+
+def report(title: str, lags: List[float]) -> None:
+    ordered = sorted(lags)
+    p99 = ordered[int(len(ordered) * 0.99) - 1] if ordered else 0.0
+    print(
+        f"{title:<12} samples={len(ordered):<6} "
+        f"p50={statistics.median(ordered):8.2f} ms  p99={p99:8.2f} ms  max={max(ordered):8.2f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--reads", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DbManager(db_dir=Path(tmp))
+        seed(db, "bench", args.messages)
+        print(f"История: {args.messages} сообщений, чтений: {args.reads}")
+
+        report("executor", await measure(db, "bench", args.reads, blocking=False))
+        report("blocking", await measure(db, "bench", args.reads, blocking=True))
+        db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+"""
+Вставки в секунду с групповым коммитом (write-behind) и без него.
+
+Запуск из корня проекта:
+    python -m benchmarks.group_commit --inserts 5000 --concurrency 64
+
+--concurrency одновременных "запросов" вызывают add_message, пока не будет записано --inserts сообщений.
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from src.chat.db.db_manager import DbManager
+from src.chat.db.storage_profile import STORAGE_PROFILES
+from benchmarks.storage_profiles import make_message
+
+
+async def run(write_behind: bool, inserts: int, concurrency: int, profile_name: str) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DbManager(db_dir=Path(tmp), profile=STORAGE_PROFILES[profile_name], write_behind=write_behind)
+        remaining = iter(range(inserts))
+
+        async def worker(number: int) -> None:
+            for index in remaining:
+                await db.add_message(make_message(str(number % 4), index))
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(i) for i in range(concurrency)])
+        await db.flush()
+        elapsed = time.perf_counter() - started
+
+        stats = db.get_stats().write_behind
+        db.close()
+
+    details = f"  avg_batch={stats.avg_batch:6.1f}" if stats else ""
+    title = "group commit" if write_behind else "per-insert"
+    print(f"{title:<13} {inserts / elapsed:9.1f} inserts/s  ({elapsed:.2f} s){details}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--inserts", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--profile", choices=sorted(STORAGE_PROFILES), default="durable")
+    args = parser.parse_args()
+
+    print(f"Профиль: {args.profile}, вставок: {args.inserts}, параллельно: {args.concurrency}")
+    await run(False, args.inserts, args.concurrency, args.profile)
+    await run(True, args.inserts, args.concurrency, args.profile)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+"""
+Нагрузочный прогон блокировок SessionManager (корректность проверяет tests/business/test_session_concurrency.py).
+
+Запуск из корня проекта:
+    python -m benchmarks.session_concurrency --requests 200 --sessions 200 --write-delay 0.005
+
+Сценарии:
+    single-flight — requests параллельных get_or_create_session одной новой сессии;
+    unrelated     — set_password для sessions разных сессий параллельно: время близко к одной записи,
+                    а не к sessions записям подряд;
+    same-session  — set_password для одной сессии: записи строго по одной.
+
+write-delay добавляет задержку к каждой записи, чтобы разница была видна и на быстром диске.
+"""
+import argparse
+import asyncio
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from src.chat.business.session_interactor import SessionManager
+from src.chat.business.session_store import FileSessionStore
+
+
+class CountingFileSessionStore(FileSessionStore):
+    """Файловое хранилище, которое считает записи и их максимальную параллельность."""
+
+    def __init__(self, sessions_dir: Path, write_delay: float) -> None:
+        super().__init__(sessions_dir=sessions_dir, ttl=3600)
+        self.write_delay: float = write_delay
+        self.saves: int = 0
+        self.max_parallel: int = 0
+        self._parallel: int = 0
+        self._counter_lock = threading.Lock()
+
+    def save(self, session_id: str, record: Dict[str, Any]) -> None:
+        with self._counter_lock:
+            self.saves += 1
+            self._parallel += 1
+            self.max_parallel = max(self.max_parallel, self._parallel)
+        try:
+            time.sleep(self.write_delay)
+            super().save(session_id, record)
+        finally:
+            with self._counter_lock:
+                self._parallel -= 1
+
+    def reset(self) -> None:
+        self.saves = 0
+        self.max_parallel = 0
+
+
+def report(title: str, store: CountingFileSessionStore, elapsed: float, manager: SessionManager) -> None:
+    print(
+        f"{title:<14} записей={store.saves:5d}  одновременно={store.max_parallel:3d}  "
+        f"время={elapsed * 1000:8.1f} мс  lock в таблице={len(manager._locks)}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--write-delay", type=float, default=0.005)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CountingFileSessionStore(Path(tmp), args.write_delay)
+        manager = SessionManager(store=store)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[manager.get_or_create_session("new-session") for _ in range(args.requests)])
+        report("single-flight", store, time.perf_counter() - started, manager)
+
+        session_ids = [f"user-{index}" for index in range(args.sessions)]
+        await asyncio.gather(*[manager.get_or_create_session(session_id) for session_id in session_ids])
+        store.reset()
+        started = time.perf_counter()
+        await asyncio.gather(*[manager.set_password(session_id, "password") for session_id in session_ids])
+        report("unrelated", store, time.perf_counter() - started, manager)
+
+        store.reset()
+        started = time.perf_counter()
+        await asyncio.gather(*[manager.set_password("user-0", f"password-{index}") for index in range(args.sessions)])
+        report("same-session", store, time.perf_counter() - started, manager)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
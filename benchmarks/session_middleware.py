@@ -0,0 +1,131 @@
+"""
+Накладные расходы middleware выдачи session_id: BaseHTTPMiddleware против чистого ASGI.
+
+Запуск из корня проекта:
+    python -m benchmarks.session_middleware --requests 20000 --chunks 100
+
+Приложение Starlette вызывается напрямую через ASGI, без сети и сервера, поэтому в замер попадает
+только стек middleware. Сценарии:
+    cookie     — у клиента уже есть session_id (обычный запрос);
+    first      — cookie нет, middleware выдаёт новый session_id;
+    streaming  — StreamingResponse из chunks частей, cookie есть.
+Базовая строка "none" — то же приложение без middleware.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Tuple
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.types import ASGIApp, Message
+
+from src.chat.core.constants import KEY_SESSION_ID, ONE_DAY_IN_SECONDS
+from src.chat.server.session_middleware import SessionInitMiddleware, get_request_session_id
+
+
+class BaseHTTPSessionInitMiddleware(BaseHTTPMiddleware):
+    """Прежняя реализация — для сравнения."""
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        session_id = request.cookies.get(KEY_SESSION_ID)
+        if not session_id:
+            session_id = str(uuid.uuid4())
+
+        response = await call_next(request)
+
+        if KEY_SESSION_ID not in request.cookies:
+            response.set_cookie(key=KEY_SESSION_ID, value=session_id, httponly=True, max_age=ONE_DAY_IN_SECONDS)
+        return response
+
+
+def build_app(middleware: List[Middleware], chunks: int) -> ASGIApp:
+    async def plain(request: Request) -> PlainTextResponse:
+        return PlainTextResponse(get_request_session_id(request) or "")
+
+    async def stream(request: Request) -> StreamingResponse:
+        async def body() -> AsyncIterator[bytes]:
+            for _ in range(chunks):
+                yield b"x" * 64
+
+        return StreamingResponse(body())
+
+    return Starlette(routes=[Route("/plain", plain), Route("/stream", stream)], middleware=middleware)
+
+
+async def call(app: ASGIApp, path: str, headers: List[Tuple[bytes, bytes]]) -> List[Message]:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": headers, "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80),
+    }
+    sent: List[Message] = []
+    body_sent = False
+
+    async def receive() -> Message:
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Как у сервера: дальше только ожидание отключения клиента (задачу отменят по окончании ответа)
+        await asyncio.Event().wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent
+
+
+async def measure(requests: int, request: Callable[[], Awaitable[Any]]) -> List[float]:
+    samples: List[float] = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        await request()
+        samples.append((time.perf_counter() - started) * 1_000_000)
+    return samples
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--chunks", type=int, default=100)
+    args = parser.parse_args()
+
+    apps: Dict[str, ASGIApp] = {
+        "none": build_app([], args.chunks),
+        "base-http": build_app([Middleware(BaseHTTPSessionInitMiddleware)], args.chunks),
+        "asgi": build_app([Middleware(SessionInitMiddleware)], args.chunks),
+    }
+    with_cookie = [(b"cookie", f"{KEY_SESSION_ID}=bench-session".encode())]
+    scenarios = {
+        "cookie": ("/plain", with_cookie),
+        "first": ("/plain", []),
+        "streaming": ("/stream", with_cookie),
+    }
+
+    # Новый session_id должен дойти до обработчика и до Set-Cookie
+    first = await call(apps["asgi"], "/plain", [])
+    set_cookie = [value for name, value in first[0]["headers"] if name == b"set-cookie"]
+    assert set_cookie and first[1]["body"].decode() in set_cookie[0].decode(), "session_id не виден обработчику"
+
+    for scenario, (path, headers) in scenarios.items():
+        for name, app in apps.items():
+            await measure(args.requests // 10, lambda: call(app, path, headers))
+            samples = await measure(args.requests, lambda: call(app, path, headers))
+            ordered = sorted(samples)
+            print(
+                f"{scenario:<10} {name:<10} p50={statistics.median(ordered):8.1f} мкс  "
+                f"p99={ordered[int(len(ordered) * 0.99) - 1]:8.1f} мкс"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
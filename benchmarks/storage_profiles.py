@@ -0,0 +1,90 @@
+"""
+Пропускная способность смешанной нагрузки чтение/запись для профилей хранения.
+
+Запуск из корня проекта:
+    python -m benchmarks.storage_profiles --seconds 5 --writers 4 --readers 8
+
+Писатели вызывают add_message, читатели — get_messages(latest=True, limit=50),
+как при открытии чата. Для каждого профиля из STORAGE_PROFILES — своя временная база.
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from src.chat.db.db_manager import DbManager
+from src.chat.db.storage_profile import STORAGE_PROFILES, StorageProfile
+from src.chat.model.messages import Message, MessageType
+
+CHATS = ["1", "2", "12"]
+
+
+def make_message(chat_id: str, index: int) -> Message:
+    return Message(
+        id=None,
+        chat_id=chat_id,
+        session_id="bench",
+        message_type=MessageType.USER if index % 2 else MessageType.AI,
+        agent_id=None,
+        name="bench",
+        timestamp="00:00:00",
+        message=f"message {index} " * 8,
+        prompt_tokens=0,
+        completion_tokens=0,
+        request_time=0,
+        price=0,
+        meta="",
+    )
+
+
+async def writer(db: DbManager, number: int, deadline: float, counter: List[int]) -> None:
+    index = 0
+    while time.perf_counter() < deadline:
+        await db.add_message(make_message(CHATS[(number + index) % len(CHATS)], index))
+        index += 1
+    counter.append(index)
+
+
+async def reader(db: DbManager, number: int, deadline: float, counter: List[int]) -> None:
+    reads = 0
+    while time.perf_counter() < deadline:
+        await db.get_messages(chat_id=CHATS[(number + reads) % len(CHATS)], limit=50, latest=True)
+        reads += 1
+    counter.append(reads)
+
+
+async def run_profile(name: str, profile: StorageProfile, seconds: float, writers: int, readers: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DbManager(db_dir=Path(tmp), profile=profile)
+        writes: List[int] = []
+        reads: List[int] = []
+        deadline = time.perf_counter() + seconds
+
+        await asyncio.gather(
+            *[writer(db, i, deadline, writes) for i in range(writers)],
+            *[reader(db, i, deadline, reads) for i in range(readers)],
+        )
+        pool = db.get_stats().pool
+        db.close()
+
+    print(
+        f"{name:<16} writes/s={sum(writes) / seconds:9.1f}  reads/s={sum(reads) / seconds:9.1f}  "
+        f"pool_wait_avg={pool.avg_wait_ms:7.2f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    args = parser.parse_args()
+
+    for name, profile in STORAGE_PROFILES.items():
+        await run_profile(name, profile, args.seconds, args.writers, args.readers)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
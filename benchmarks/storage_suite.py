@@ -0,0 +1,237 @@
+"""
+Набор замеров DbManager на истории реалистичного размера с машиночитаемым результатом.
+
+Запуск из корня проекта:
+    python -m benchmarks.storage_suite --sizes 10000,100000,1000000 --json results.json
+    python -m benchmarks.storage_suite --sizes 10000 --compare results.json
+
+Для каждого размера — своя временная база, в которую засевается чат из --sizes сообщений. Меряются:
+    get_messages   — вся история (мимо кэша и из кэша) и последняя страница;
+    add_message    — последовательные вставки в большой чат;
+    mix            — параллельные читатели страниц и писатели;
+    summarize      — replace_chat_history (перенос истории в архив);
+    clear          — clear_messages и фоновое удаление устаревшей эпохи.
+--json сохраняет результаты с метаданными (коммит, версии), --compare печатает отношение к прошлому прогону.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.chat.db.db_manager import CHAT_EPOCH_SQL, DbManager
+from src.chat.db.storage_profile import STORAGE_PROFILES
+from src.chat.model.chat import Chat
+from benchmarks.storage_profiles import make_message
+
+CHAT_ID = "bench"
+SEED_BATCH = 10_000
+
+
+def seed(db: DbManager, chat_id: str, count: int) -> None:
+    # Мимо add_messages: миллион строк через pydantic засевался бы минутами
+    with db._pool.connection() as connection:
+        for start in range(0, count, SEED_BATCH):
+            rows = [
+                (chat_id, "bench", "USER" if i % 2 else "AI", None, "bench", "00:00:00",
+                 f"message {i} " * 8, 10, 20, 1, 1, "", chat_id)
+                for i in range(start, min(start + SEED_BATCH, count))
+            ]
+            connection.executemany(
+                f'''
+                INSERT INTO {db.TABLE_MESSAGES}
+                (chat_id, session_id, message_type, agent_id, name, timestamp, message,
+                 prompt_tokens, completion_tokens, request_time, price, meta, epoch)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {CHAT_EPOCH_SQL})
+                ''',
+                rows,
+            )
+        connection.commit()
+
+
+def latency(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered),
+        "p50_ms": statistics.median(ordered),
+        "p95_ms": ordered[max(0, int(len(ordered) * 0.95) - 1)],
+        "max_ms": ordered[-1],
+    }
+
+
+async def timed(repeat: int, call: Callable[[], Awaitable[Any]]) -> List[float]:
+    samples: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+async def bench_reads(db: DbManager, reads: int) -> Dict[str, Any]:
+    async def cold_full() -> None:
+        db._history_cache.invalidate(CHAT_ID)
+        await db.get_messages(chat_id=CHAT_ID)
+
+    async def cold_page() -> None:
+        db._history_cache.invalidate(CHAT_ID)
+        await db.get_messages(chat_id=CHAT_ID, limit=50, latest=True)
+
+    results = {
+        "full_db": latency(await timed(reads, cold_full)),
+        "page_db": latency(await timed(reads * 10, cold_page)),
+    }
+    await db.get_messages(chat_id=CHAT_ID)
+    results["full_cached"] = latency(await timed(reads, lambda: db.get_messages(chat_id=CHAT_ID)))
+    return results
+
+
+async def bench_inserts(db: DbManager, inserts: int) -> Dict[str, Any]:
+    samples = await timed(inserts, lambda: db.add_message(make_message(CHAT_ID, 0)))
+    return {"inserts_per_s": inserts / (sum(samples) / 1000), **latency(samples)}
+
+
+async def bench_mix(db: DbManager, seconds: float, readers: int, writers: int) -> Dict[str, Any]:
+    # Кэш сброшен: страницы читаются из базы, как у чата, который не открывали с рестарта
+    db._history_cache.invalidate(CHAT_ID)
+    deadline = time.perf_counter() + seconds
+    read_samples: List[float] = []
+    write_samples: List[float] = []
+
+    async def loop(samples: List[float], call: Callable[[], Awaitable[Any]]) -> None:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await call()
+            samples.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(
+        *[loop(read_samples, lambda: db.get_messages(chat_id=CHAT_ID, limit=50, latest=True)) for _ in range(readers)],
+        *[loop(write_samples, lambda: db.add_message(make_message(CHAT_ID, 0))) for _ in range(writers)],
+    )
+    return {
+        "readers": readers,
+        "writers": writers,
+        "reads_per_s": len(read_samples) / seconds,
+        "writes_per_s": len(write_samples) / seconds,
+        "read": latency(read_samples),
+        "write": latency(write_samples),
+    }
+
+
+async def bench_summarize(db: DbManager) -> Dict[str, Any]:
+    started = time.perf_counter()
+    await db.replace_chat_history(CHAT_ID, [make_message(CHAT_ID, 0)], system_prompt="summary")
+    return {"replace_ms": (time.perf_counter() - started) * 1000}
+
+
+async def bench_clear(db: DbManager, size: int) -> Dict[str, Any]:
+    seed(db, CHAT_ID, size)
+    started = time.perf_counter()
+    await db.clear_messages(CHAT_ID)
+    clear_ms = (time.perf_counter() - started) * 1000
+
+    reclaim = await db.reclaim_stale_messages(batch_size=1000, max_batches=size)
+    return {"clear_ms": clear_ms, "reclaim_ms": reclaim.duration_ms, "reclaimed": reclaim.reclaimed}
+
+
+async def run_size(size: int, args: argparse.Namespace) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DbManager(db_dir=Path(tmp), profile=STORAGE_PROFILES[args.profile], write_behind=args.write_behind)
+        await db.add_chat(Chat(id=CHAT_ID, name=CHAT_ID, system_prompt="", created_at=None))
+
+        started = time.perf_counter()
+        seed(db, CHAT_ID, size)
+        result: Dict[str, Any] = {"size": size, "seed_s": time.perf_counter() - started}
+
+        result["get_messages"] = await bench_reads(db, args.reads)
+        result["add_message"] = await bench_inserts(db, args.inserts)
+        result["mix"] = await bench_mix(db, args.seconds, args.readers, args.writers)
+        result["summarize"] = await bench_summarize(db)
+        result["clear"] = await bench_clear(db, size)
+        result["db_size_bytes"] = (await db.get_size_stats()).file_size_bytes
+
+        await db.flush()
+        db.close()
+    return result
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(value: Any, prefix: str = "") -> Dict[str, float]:
+    if isinstance(value, dict):
+        flat: Dict[str, float] = {}
+        for key, item in value.items():
+            flat.update(flatten(item, f"{prefix}.{key}" if prefix else key))
+        return flat
+    return {prefix: value} if isinstance(value, (int, float)) else {}
+
+
+def print_result(result: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    print(f"\n=== {result['size']} сообщений ===")
+    previous = flatten(baseline) if baseline else {}
+    for key, value in flatten(result).items():
+        line = f"  {key:<32} {value:14.2f}"
+        if previous.get(key):
+            line += f"   x{value / previous[key]:.2f} к базовому"
+        print(line)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000", help="Размеры истории через запятую")
+    parser.add_argument("--profile", choices=sorted(STORAGE_PROFILES), default="balanced")
+    parser.add_argument("--write-behind", action="store_true", help="Включить групповой коммит")
+    parser.add_argument("--reads", type=int, default=5, help="Чтений всей истории на размер")
+    parser.add_argument("--inserts", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=5.0, help="Длительность смешанной нагрузки")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--json", type=Path, help="Куда сохранить результаты")
+    parser.add_argument("--compare", type=Path, help="Результаты прошлого прогона для сравнения")
+    args = parser.parse_args()
+
+    baselines: Dict[int, Dict[str, Any]] = {}
+    if args.compare:
+        previous = json.loads(args.compare.read_text(encoding="utf-8"))
+        baselines = {item["size"]: item for item in previous["results"]}
+        print(f"Сравнение с {args.compare} (коммит {previous['meta'].get('git_revision')})")
+
+    results = []
+    for size in (int(size) for size in args.sizes.split(",")):
+        result = await run_size(size, args)
+        results.append(result)
+        print_result(result, baselines.get(size))
+
+    if args.json:
+        report = {
+            "meta": {
+                "git_revision": git_revision(),
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "platform": platform.platform(),
+                "args": {key: str(value) for key, value in vars(args).items()},
+            },
+            "results": results,
+        }
+        args.json.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nРезультаты сохранены: {args.json}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+Подписанные токены сессии (AUTH_MODE=token).
+
+/v1/login выдаёт токен "v1.<session_id>.<issued_ms>.<expires>.<подпись>", подпись — HMAC-SHA256
+секретом сервера. verify() проверяет токен только вычислениями, без чтения хранилища сессий.
+Отзыв — in-memory denylist по session_id: токены, выпущенные до отзыва, отклоняются. Denylist
+локален для процесса, поэтому при нескольких воркерах отзыв виден только в том, где он сделан.
+"""
+import base64
+import hashlib
+import hmac
+import logging
+import secrets
+import time
+from typing import Dict, Optional, Tuple
+
+from src.chat.core.configs import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VERSION = "v1"
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class TokenSigner:
+
+    def __init__(self, secret: bytes, ttl: int) -> None:
+        if not secret:
+            raise ValueError("Секрет для подписи токенов пуст")
+        self._secret: bytes = secret
+        self.ttl: int = ttl
+        # session_id -> (время отзыва в мс, когда запись можно забыть)
+        self._revoked: Dict[str, Tuple[int, float]] = {}
+
+    def _sign(self, payload: str) -> str:
+        return _b64encode(hmac.new(self._secret, payload.encode("ascii"), hashlib.sha256).digest())
+
+    def issue(self, session_id: str) -> str:
+        now_ms = int(time.time() * 1000)
+        expires = now_ms // 1000 + self.ttl
+        payload = f"{TOKEN_VERSION}.{_b64encode(session_id.encode('utf-8'))}.{now_ms}.{expires}"
+        return f"{payload}.{self._sign(payload)}"
+
+    def verify(self, token: Optional[str]) -> Optional[str]:
+        """session_id из действующего токена или None."""
+        if not token:
+            return None
+        try:
+            payload, signature = token.rsplit(".", 1)
+            version, encoded_session_id, issued_ms, expires = payload.split(".")
+            if version != TOKEN_VERSION or not hmac.compare_digest(signature, self._sign(payload)):
+                return None
+            if int(expires) < time.time():
+                return None
+            session_id = _b64decode(encoded_session_id).decode("utf-8")
+        except ValueError:
+            # Битый токен: не та структура, не ASCII, не base64, не число
+            return None
+
+        revoked = self._revoked.get(session_id)
+        if revoked is not None and int(issued_ms) < revoked[0]:
+            return None
+        return session_id
+
+    def revoke(self, session_id: str) -> None:
+        """Отзывает все уже выданные токены сессии."""
+        now = time.time()
+        self._revoked[session_id] = (int(now * 1000), now + self.ttl)
+        # Старше ttl токенов не бывает — такие записи больше не нужны
+        for expired_id in [key for key, (_, forget_at) in self._revoked.items() if forget_at < now]:
+            del self._revoked[expired_id]
+        logger.info(f"Токены сессии отозваны: {session_id}")
+
+
+_token_signer: Optional[TokenSigner] = None
+
+
+def get_token_signer() -> TokenSigner:
+    global _token_signer
+    if _token_signer is None:
+        secret = settings.AUTH_TOKEN_SECRET.encode("utf-8")
+        if not secret:
+            # Токены не переживут рестарт и не подойдут другим воркерам
+            logger.warning("⚠️ AUTH_TOKEN_SECRET не задан — используется случайный секрет процесса")
+            secret = secrets.token_bytes(32)
+        _token_signer = TokenSigner(secret=secret, ttl=settings.AUTH_TOKEN_TTL_SECONDS)
+    return _token_signer
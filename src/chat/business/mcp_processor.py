@@ -195,25 +195,21 @@ class McpProcessor:
             f"{self.system_prompt}"
         )
 
-        await get_db_manager().remove_all_messages_chat(
-            chat_id=self.message_user.chat_id
-        )
-
-        update_chat: Optional[Chat] = await get_db_manager().update_chat_system_prompt(
-            chat_id=self.chat.id, system_prompt=self.system_prompt
-        )
-
-        if update_chat:
-            self.chat = update_chat
-
         try:
-            summary_message_db: Message = await get_db_manager().add_message(summary_message)  # type: ignore
+            # История и промпт заменяются одним атомарным коммитом
+            summary_message_db, = await get_db_manager().replace_chat_history(
+                chat_id=self.message_user.chat_id,
+                messages=[summary_message],
+                system_prompt=self.system_prompt,
+            )
         except Exception as e:
             print(
                 f"❌ Ошибка добавления сообщений на уровне процесса суммаризации: {e}"
             )
             raise HTTPException(status_code=503, detail="Ошибка сохранения")
 
+        self.chat = self.chat.model_copy(update={"system_prompt": self.system_prompt})
+
         return await self._process_default([summary_message_db])
 
     async def _process_default(self, list_message: list[Message]) -> List[Message]:
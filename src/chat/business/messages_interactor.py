@@ -1,9 +1,10 @@
 import logging
-from typing import List
+from datetime import date
+from typing import List, Optional
 
 from src.chat.business.standart_process import StandartProcess
 from src.chat.db.db_manager import get_db_manager
-from src.chat.core.constants import CHATS_DEFAULT
+from src.chat.core.constants import CHATS_DEFAULT, HISTORY_PAGE_SIZE
 from src.chat.model.chat import Chat, ChatList
 from src.chat.business.mcp_processor import McpProcessor
 from src.chat.business.telegram_scanner import stop_scanner_service, start_scanner_service, get_scanner_service
@@ -14,6 +15,8 @@ from src.chat.model.messages import (
     MessageList,
     MessageType
 )
+from src.chat.model.search import SearchResultList
+from src.chat.model.usage import ChatUsage
 from src.chat.model.tape_formats_response import FormatType
 
 logger = logging.getLogger(__name__)
@@ -92,9 +95,74 @@ async def get_all_messages() -> MessageList:
 
     return MessageList(messages=list_message)
 
-async def get_all_messages_chat(chat_id: str) -> MessageList:
-    list_message: List[Message] = await get_db_manager().get_messages(chat_id=chat_id)
-    return MessageList(messages=list_message)
+async def get_all_messages_chat(
+    chat_id: str,
+    limit: Optional[int] = None,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+) -> MessageList:
+    if limit is None and before_id is None and after_id is None:
+        list_message: List[Message] = await get_db_manager().get_messages(chat_id=chat_id)
+        return MessageList(messages=list_message)
+
+    page_size: int = limit or HISTORY_PAGE_SIZE
+    # after_id листает вперёд, иначе — назад от before_id или с конца истории ("последние N")
+    forward: bool = after_id is not None
+
+    # Лишняя запись показывает, есть ли следующая страница
+    list_message = await get_db_manager().get_messages(
+        chat_id=chat_id,
+        limit=page_size + 1,
+        before_id=None if forward else before_id,
+        after_id=after_id if forward else None,
+        latest=not forward,
+    )
+
+    next_cursor: Optional[int] = None
+    if len(list_message) > page_size:
+        if forward:
+            list_message = list_message[:page_size]
+            next_cursor = list_message[-1].id
+        else:
+            list_message = list_message[1:]
+            next_cursor = list_message[0].id
+
+    return MessageList(messages=list_message, next_cursor=next_cursor)
+
+async def get_archived_messages_chat(
+    chat_id: str,
+    limit: int = HISTORY_PAGE_SIZE,
+    before_id: Optional[int] = None,
+) -> MessageList:
+    # Архив листается только назад: от before_id или с самых свежих суммаризированных сообщений
+    list_message: List[Message] = await get_db_manager().get_archived_messages(
+        chat_id=chat_id,
+        limit=limit + 1,
+        before_id=before_id,
+    )
+
+    next_cursor: Optional[int] = None
+    if len(list_message) > limit:
+        list_message = list_message[1:]
+        next_cursor = list_message[0].id
+
+    return MessageList(messages=list_message, next_cursor=next_cursor)
+
+async def search_messages(
+    query: str,
+    chat_id: Optional[str] = None,
+    limit: int = HISTORY_PAGE_SIZE,
+    cursor: Optional[int] = None,
+) -> SearchResultList:
+    return await get_db_manager().search_messages(
+        query=query,
+        chat_id=chat_id,
+        limit=limit,
+        cursor=cursor,
+    )
+
+async def get_chat_usage(chat_id: str, day: Optional[date] = None) -> ChatUsage:
+    return await get_db_manager().get_usage(chat_id=chat_id, day=day)
 
 async def get_all_chats() -> ChatList:
     list_chats: list[Chat] = await get_db_manager().get_chats()
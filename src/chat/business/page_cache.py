@@ -0,0 +1,85 @@
+"""
+Кэш страницы в памяти с условными ответами.
+
+Файл перечитывается только при смене mtime или размера; на каждом запросе — один stat.
+ETag — хэш отдаваемого содержимого, поэтому совпадает во всех воркерах и не меняется от touch без правки
+файла. Страница чата отдаётся со ссылками на статику по адресам с отпечатком содержимого.
+"""
+import hashlib
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+from src.chat.core.configs import settings
+from src.chat.server.static_assets import get_static_assets
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PageSnapshot:
+    body: bytes
+    etag: str
+    last_modified: str
+    mtime: float
+
+    def is_not_modified(self, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+        """Можно ли ответить 304 на запрос с такими заголовками."""
+        if if_none_match is not None:
+            # If-None-Match важнее If-Modified-Since; сравнение слабое — W/ не учитывается
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return "*" in tags or self.etag in tags
+        if if_modified_since is not None:
+            try:
+                return int(self.mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+
+class CachedPage:
+
+    def __init__(self, path: Path, transform: Optional[Callable[[bytes], bytes]] = None) -> None:
+        self.path: Path = path
+        # Преобразование содержимого при загрузке (например, переписывание ссылок)
+        self.transform: Optional[Callable[[bytes], bytes]] = transform
+        self._snapshot: Optional[PageSnapshot] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> PageSnapshot:
+        """Текущее содержимое; FileNotFoundError, если файла нет."""
+        stat = os.stat(self.path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        snapshot = self._snapshot
+        if snapshot is not None and signature == self._signature:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is None or signature != self._signature:
+                body = self.path.read_bytes()
+                if self.transform is not None:
+                    body = self.transform(body)
+                self._snapshot = PageSnapshot(
+                    body=body,
+                    etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+                    last_modified=formatdate(stat.st_mtime, usegmt=True),
+                    mtime=stat.st_mtime,
+                )
+                self._signature = signature
+                logger.info(f"📄 Страница загружена в кэш: {self.path}")
+            return self._snapshot
+
+
+_chat_page: Optional[CachedPage] = None
+
+
+def get_chat_page() -> CachedPage:
+    global _chat_page
+    if _chat_page is None:
+        _chat_page = CachedPage(settings.SITE_DIR / "index.html", transform=get_static_assets().rewrite_references)
+    return _chat_page
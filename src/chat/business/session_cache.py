@@ -0,0 +1,94 @@
+"""
+Ограниченный TTL-кэш записей сессий в памяти процесса.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from src.chat.model.stats import SessionCacheStats
+
+SessionRecord = Dict[str, Any]
+
+# Маркер промаха: None в кэше означает "сессии нет"
+MISS: Any = object()
+
+
+class SessionCache:
+
+    def __init__(self, max_entries: int, ttl: float, negative_ttl: float) -> None:
+        self.max_entries: int = max_entries
+        self.ttl: float = ttl
+        self.negative_ttl: float = negative_ttl
+
+        # Без блокировок: кэш трогают только корутины SessionManager в event loop
+        # session_id -> (момент устаревания по time.monotonic, запись или None)
+        self._entries: "OrderedDict[str, Tuple[float, Optional[SessionRecord]]]" = OrderedDict()
+        # Растёт при каждой записи: чтение файла, начатое до изменения сессии, не кэшируется
+        self._generation: int = 0
+
+        self._hits: int = 0
+        self._negative_hits: int = 0
+        self._misses: int = 0
+        self._evictions: int = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, session_id: str) -> Any:
+        """Запись сессии, None — сессии нет, MISS — в кэше нет или устарела."""
+        entry = self._entries.get(session_id)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[session_id]
+            self._misses += 1
+            return MISS
+
+        self._entries.move_to_end(session_id)
+        record = entry[1]
+        if record is None:
+            self._negative_hits += 1
+        else:
+            self._hits += 1
+        return record
+
+    def put(self, session_id: str, record: Optional[SessionRecord], generation: Optional[int] = None) -> None:
+        """Кладёт запись; generation передаёт чтение из файла, изменения сессии кладут без него."""
+        if generation is None:
+            self._generation += 1
+        elif generation != self._generation:
+            return
+        if not self.enabled:
+            return
+        ttl = self.ttl if record is not None else self.negative_ttl
+        if ttl <= 0:
+            self._entries.pop(session_id, None)
+            return
+
+        self._entries[session_id] = (time.monotonic() + ttl, record)
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def invalidate(self, session_id: str) -> None:
+        self._generation += 1
+        self._entries.pop(session_id, None)
+
+    def stats(self) -> SessionCacheStats:
+        requests = self._hits + self._negative_hits + self._misses
+        return SessionCacheStats(
+            entries=len(self._entries),
+            max_entries=self.max_entries,
+            ttl_seconds=self.ttl,
+            negative_ttl_seconds=self.negative_ttl,
+            hits=self._hits,
+            negative_hits=self._negative_hits,
+            misses=self._misses,
+            hit_rate=(self._hits + self._negative_hits) / requests if requests else 0.0,
+            evictions=self._evictions,
+        )
@@ -1,68 +1,40 @@
-import json
+import copy
 import hashlib
-import os
 import secrets
 import logging
-import tempfile
-from typing import Any, Dict, Optional
+import time
+from contextlib import AsyncExitStack
+from typing import Any, Callable, Dict, List, Optional, TypeVar
 from pathlib import Path
 from datetime import datetime, timezone
 import asyncio
 from functools import partial
 
+from src.chat.business.auth_token import get_token_signer
+from src.chat.business.keyed_lock import KeyedLock
+from src.chat.business.session_cache import MISS, SessionCache
+from src.chat.business.session_store import SessionStore, create_session_store
 from src.chat.core.configs import settings
+from src.chat.model.stats import SessionCacheStats, SessionSweepStats
 
 logger = logging.getLogger(__name__)
 
-def _blocking_read_json(path: Path) -> Dict[str, Any]:
-    try:
-        text = path.read_text(encoding="utf-8")
-        return json.loads(text)
-    except Exception as e:
-        logger.exception("blocking read json error for %s: %s", path, e)
-        return {}
-
-
-def _blocking_write_json_atomic(path: Path, data: Dict[str, Any]) -> None:
-    text = json.dumps(data, indent=2, ensure_ascii=False)
-    dirpath = str(path.parent)
-    fd, tmp_path = tempfile.mkstemp(prefix=path.name, dir=dirpath, text=True)
-    try:
-        # fdopen использует файловый дескриптор, гарантируем sync на диск
-        with os.fdopen(fd, "w", encoding="utf-8") as f:
-            f.write(text)
-            f.flush()
-            try:
-                os.fsync(f.fileno())
-            except Exception:
-                # fsync может отсутствовать на некоторых FS — не критично
-                pass
-        os.replace(tmp_path, str(path))
-    except Exception:
-        logger.exception("blocking write json error for %s", path)
-        # попытаться удалить tmp
-        try:
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
-        except Exception:
-            pass
-
-
-def _blocking_remove_file(path: Path) -> None:
-    try:
-        if path.exists():
-            path.unlink()
-    except Exception:
-        logger.exception("blocking remove file error for %s", path)
+T = TypeVar("T")
 
 
 class SessionManager:
 
-    def __init__(self, sessions_dir: Optional[Path] = None) -> None:
-        self.sessions_dir = sessions_dir or settings.SESSIONS_DIR
-        self.sessions_dir.mkdir(parents=True, exist_ok=True)
-        # Lock для модификаций одной сессии
-        self._lock = asyncio.Lock()
+    def __init__(self, sessions_dir: Optional[Path] = None, store: Optional[SessionStore] = None) -> None:
+        self.store: SessionStore = store or create_session_store(settings, sessions_dir)
+        # Lock на каждую сессию: изменения разных сессий не ждут друг друга
+        self._locks = KeyedLock()
+        self._cache = SessionCache(
+            max_entries=settings.SESSION_CACHE_MAX_ENTRIES,
+            ttl=settings.SESSION_CACHE_TTL_SECONDS,
+            negative_ttl=settings.SESSION_CACHE_NEGATIVE_TTL_SECONDS,
+        )
+        self._last_sweep: Optional[SessionSweepStats] = None
+        self._total_swept: int = 0
 
     @staticmethod
     def _default_session(session_id: str) -> Dict[str, Any]:
@@ -73,45 +45,69 @@ class SessionManager:
         }
 
     @staticmethod
-    async def _read_json(path: Path) -> Dict[str, Any]:
+    async def _run(func: Callable[..., T], *args: Any) -> T:
+        # Хранилище блокирующее — выполняем в executor
         loop = asyncio.get_running_loop()
         return await loop.run_in_executor(
             executor=None,
-            func=partial(_blocking_read_json, path)
+            func=partial(func, *args)
         )
 
-    @staticmethod
-    async def _write_json_atomic(path: Path, data: Dict[str, Any]) -> None:
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(
-            executor=None,
-            func=partial(_blocking_write_json_atomic, path, data)
-        )
+    def _load_and_touch(self, session_id: str) -> Optional[Dict[str, Any]]:
+        session = self.store.load(session_id)
+        if session:
+            # Промах кэша — не чаще раза за SESSION_CACHE_TTL_SECONDS, им и продлеваем жизнь сессии
+            self.store.touch(session_id)
+        return session
 
-    @staticmethod
-    async def _remove_file(path: Path) -> None:
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(
-            executor=None,
-            func=partial(_blocking_remove_file, path)
-        )
+    def cache_stats(self) -> SessionCacheStats:
+        stats = self._cache.stats()
+        stats.locks = len(self._locks)
+        stats.last_sweep = self._last_sweep
+        return stats
+
+    async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Запись сессии из кэша или хранилища; None — сессии нет или она устарела. Сессию не создаёт."""
+        cached: Optional[Dict[str, Any]] = self._cache.get(session_id)
+        if cached is not MISS:
+            return cached
+
+        generation = self._cache.generation
+        session = await self._run(self._load_and_touch, session_id)
+        if session:
+            logger.info(f"✅ Сессия загружена: {session_id}")
+
+        self._cache.put(session_id, session, generation)
+        return session
 
     async def get_or_create_session(self, session_id: str) -> Dict[str, Any]:
-        session_file = self.sessions_dir / f"{session_id}.json"
+        session = await self.get_session(session_id)
+        if session:
+            return session
 
-        if session_file.exists():
-            session = await self._read_json(session_file)
-            logger.info(f"✅ Сессия загружена: {session_id}")
-            if session:
-                return session
+        # Параллельные первые запросы одной сессии: создаёт первый, остальные дожидаются его записи
+        async with self._locks.hold(session_id):
+            return await self._get_or_create_locked(session_id)
+
+    async def _get_or_create_locked(self, session_id: str) -> Dict[str, Any]:
+        """Вызывается под lock сессии."""
+        session = await self.get_session(session_id)
+        if session:
+            return session
 
         session = self._default_session(session_id)
-        await self._write_json_atomic(session_file, session)
+        await self._run(self.store.save, session_id, session)
+        self._cache.put(session_id, session)
         logger.info("📝 Новая сессия создана: %s", session_id)
         return session
 
     async def verify_session(self, session_id: str, cookie_password_salt: str) -> Optional[str]:
-        session = await self.get_or_create_session(session_id)
+        if not session_id or not cookie_password_salt:
+            return None
+        # Неизвестная сессия не проходит проверку — создавать её незачем
+        session = await self.get_session(session_id)
+        if not session:
+            return None
         password_salt: Optional[str] = session["password"]["salt"]
         return password_salt if password_salt == cookie_password_salt else None
 
@@ -130,9 +126,9 @@ class SessionManager:
         return salt if password_hash == password_hash_check else None
 
     async def set_password(self, session_id: str, password: str) -> str:
-        async with self._lock:
-            # читаем без lock, т.к. get_or_create_session не берёт lock
-            session = await self.get_or_create_session(session_id)
+        async with self._locks.hold(session_id):
+            # Копия: запись из кэша видят параллельные verify, меняем её только после сохранения
+            session = copy.deepcopy(await self._get_or_create_locked(session_id))
 
             salt = secrets.token_hex(16)
             password_hash = self._hash_password(password, salt)
@@ -140,22 +136,76 @@ class SessionManager:
             session["password"]["hash"] = password_hash
             session["password"]["salt"] = salt
 
-            session_file = self.sessions_dir / f"{session_id}.json"
-            await self._write_json_atomic(session_file, session)
+            await self._run(self.store.save, session_id, session)
+            self._cache.put(session_id, session)
+            self._revoke_tokens(session_id)
             logger.info("Password set for session: %s", session_id)
             return salt
 
     async def delete_session(self, session_id: str) -> bool:
-        async with self._lock:
-            session_file = self.sessions_dir / f"{session_id}.json"
-
-            if session_file.exists():
-                await self._remove_file(session_file)
+        async with self._locks.hold(session_id):
+            self._cache.put(session_id, None)
+            self._revoke_tokens(session_id)
+            if await self._run(self.store.delete, session_id):
                 logger.info("Session deleted: %s", session_id)
                 return True
 
             return False
 
+    async def delete_expired_sessions(self, batch_size: int, max_batches: int) -> SessionSweepStats:
+        """Удаляет устаревшие сессии пачками по batch_size, не больше max_batches пачек за вызов."""
+        started = time.perf_counter()
+        # Один обход хранилища на запуск, дальше кандидаты обрабатываются пачками
+        scan = await self._run(self.store.scan_expired, batch_size * max_batches)
+        session_ids = scan.session_ids
+        swept = 0
+        batches = 0
+        for start in range(0, max(len(session_ids), 1), batch_size):
+            batch = session_ids[start:start + batch_size]
+            last = start + batch_size >= len(session_ids)
+            # Проход до конца каталога — следующий запуск начнёт сначала, иначе продолжит после пачки
+            cursor = "" if last and scan.finished else batch[-1]
+            swept += len(await self._delete_expired_batch(batch, cursor))
+            batches += 1
+            if not last:
+                # Между пачками отдаём потоки executor обычным запросам
+                await asyncio.sleep(0.01)
+
+        self._total_swept += swept
+        self._last_sweep = SessionSweepStats(
+            backend=self.store.backend,
+            swept=swept,
+            scanned=len(session_ids),
+            batches=batches,
+            finished=scan.finished,
+            cursor=self.store.cursor,
+            duration_ms=(time.perf_counter() - started) * 1000,
+            total_swept=self._total_swept,
+            finished_at=datetime.now(timezone.utc).isoformat(),
+        )
+        if swept:
+            logger.info(f"🧹 Удалено устаревших сессий: {swept} из {len(session_ids)} за {batches} пачек")
+        return self._last_sweep
+
+    async def _delete_expired_batch(self, session_ids: List[str], cursor: str) -> List[str]:
+        # Под lock каждой сессии: set_password или создание сессии не попадут между проверкой срока и удалением
+        async with AsyncExitStack() as stack:
+            for session_id in session_ids:
+                await stack.enter_async_context(self._locks.hold(session_id))
+            deleted = await self._run(self.store.delete_expired, session_ids, cursor)
+            for session_id in deleted:
+                self._cache.invalidate(session_id)
+        return deleted
+
+    def close(self) -> None:
+        self.store.close()
+
+    @staticmethod
+    def _revoke_tokens(session_id: str) -> None:
+        # Токены, выданные до смены пароля или удаления сессии, больше не действуют
+        if settings.AUTH_MODE == "token":
+            get_token_signer().revoke(session_id)
+
     @staticmethod
     def _hash_password(password: str, salt: Optional[str]) -> str:
         return hashlib.sha256(f"{password}{salt}".encode()).hexdigest()
@@ -0,0 +1,66 @@
+"""
+Фоновое удаление устаревших сессий.
+
+Сессия устаревает через SESSION_TTL_SECONDS после последней активности — как и её cookie, после
+этого её уже никто не предъявит. В SQLite удаление идёт пачками по индексу expires_at. Каталог файлов
+сессий обходится пачками по SESSION_EXPIRY_BATCH_SIZE имён с сохраняемой позицией: один запуск
+обрабатывает не больше SESSION_EXPIRY_MAX_BATCHES пачек, следующий продолжает с того же места.
+"""
+import logging
+from typing import Optional
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+
+from src.chat.business.session_interactor import SessionManager, get_session_manager
+from src.chat.core.configs import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SessionMaintenanceService:
+
+    def __init__(self, session_manager: Optional[SessionManager] = None) -> None:
+        self.session_manager: SessionManager = session_manager or get_session_manager()
+        self.scheduler: Optional[AsyncIOScheduler] = None
+
+    async def start(self) -> None:
+        self.scheduler = AsyncIOScheduler()
+
+        if settings.SESSION_EXPIRY_SECONDS > 0:
+            self.scheduler.add_job(
+                self._delete_expired_sessions,
+                IntervalTrigger(seconds=settings.SESSION_EXPIRY_SECONDS),
+                id="session_expiry",
+                name="удаление устаревших сессий",
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+            )
+
+        self.scheduler.start()
+        logger.info("✅ Обслуживание сессий запущено")
+
+    async def shutdown(self) -> None:
+        if self.scheduler and self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+            logger.info("❌ Обслуживание сессий остановлено")
+
+    async def _delete_expired_sessions(self) -> None:
+        try:
+            await self.session_manager.delete_expired_sessions(
+                batch_size=settings.SESSION_EXPIRY_BATCH_SIZE,
+                max_batches=settings.SESSION_EXPIRY_MAX_BATCHES,
+            )
+        except Exception as e:
+            logger.error(f"Ошибка удаления устаревших сессий: {e}")
+
+
+_session_maintenance_service: Optional[SessionMaintenanceService] = None
+
+
+def get_session_maintenance_service() -> SessionMaintenanceService:
+    global _session_maintenance_service
+    if _session_maintenance_service is None:
+        _session_maintenance_service = SessionMaintenanceService()
+    return _session_maintenance_service
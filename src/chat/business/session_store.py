@@ -0,0 +1,365 @@
+"""
+Хранилища записей сессий для SessionManager.
+
+FileSessionStore — прежний формат: JSON-файл на сессию в SESSIONS_DIR, время последней активности —
+mtime файла. Устаревшие файлы удаляются инкрементальным обходом каталога в порядке имён: один scandir
+на запуск очистки выбирает следующие имена после позиции обхода, а она сохраняется в файле .sweep_cursor,
+поэтому после рестарта обход продолжается с того же места.
+SqliteSessionStore — одна таблица с индексом по expires_at: устаревшие сессии выбираются
+диапазоном по индексу. При первом запуске она переносит в себя существующие JSON-файлы.
+
+Методы блокирующие — SessionManager вызывает их через executor.
+"""
+import heapq
+import json
+import logging
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.chat.core.configs import Settings
+from src.chat.db.connection_pool import ConnectionPool
+from src.chat.db.storage_profile import StorageProfile
+
+logger = logging.getLogger(__name__)
+
+SessionRecord = Dict[str, Any]
+
+SWEEP_CURSOR_FILE = ".sweep_cursor"
+
+
+def _blocking_read_json(path: Path) -> Dict[str, Any]:
+    try:
+        text = path.read_text(encoding="utf-8")
+        return json.loads(text)
+    except Exception as e:
+        logger.exception("blocking read json error for %s: %s", path, e)
+        return {}
+
+
+def _blocking_write_json_atomic(path: Path, data: Dict[str, Any]) -> None:
+    text = json.dumps(data, indent=2, ensure_ascii=False)
+    dirpath = str(path.parent)
+    fd, tmp_path = tempfile.mkstemp(prefix=path.name, dir=dirpath, text=True)
+    try:
+        # fdopen использует файловый дескриптор, гарантируем sync на диск
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            try:
+                os.fsync(f.fileno())
+            except Exception:
+                # fsync может отсутствовать на некоторых FS — не критично
+                pass
+        os.replace(tmp_path, str(path))
+    except Exception:
+        logger.exception("blocking write json error for %s", path)
+        # попытаться удалить tmp
+        try:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        except Exception:
+            pass
+
+
+def _blocking_remove_file(path: Path) -> None:
+    try:
+        if path.exists():
+            path.unlink()
+    except Exception:
+        logger.exception("blocking remove file error for %s", path)
+
+
+@dataclass(frozen=True)
+class ExpiryScan:
+    # Кандидаты на удаление в порядке обхода; устарела ли каждая, перепроверяет delete_expired
+    session_ids: List[str]
+    # Проход завершён: устаревших сессий больше нет (SQLite) или каталог обойден до конца (файлы)
+    finished: bool
+
+
+class SessionStore(ABC):
+    """Сессия живёт ttl секунд с последней активности (создание, смена пароля, touch)."""
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl: float = ttl
+
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[SessionRecord]:
+        """Запись сессии или None, если её нет или она устарела."""
+
+    @abstractmethod
+    def save(self, session_id: str, record: SessionRecord) -> None:
+        ...
+
+    @abstractmethod
+    def touch(self, session_id: str) -> None:
+        """Продлевает жизнь сессии без перезаписи данных."""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def scan_expired(self, limit: int) -> ExpiryScan:
+        """Кандидаты на удаление для одного запуска очистки, не больше limit."""
+
+    @abstractmethod
+    def delete_expired(self, session_ids: List[str], cursor: Optional[str] = None) -> List[str]:
+        """
+        Удаляет те из session_ids, что всё ещё устарели, и возвращает их.
+
+        cursor — session_id, после которого продолжит следующий scan_expired ("" — с начала, None — не менять).
+        """
+
+    @property
+    def backend(self) -> str:
+        return "unknown"
+
+    @property
+    def cursor(self) -> Optional[str]:
+        return None
+
+    def close(self) -> None:
+        pass
+
+
+class FileSessionStore(SessionStore):
+
+    def __init__(self, sessions_dir: Path, ttl: float) -> None:
+        super().__init__(ttl)
+        self.sessions_dir: Path = sessions_dir
+        self.sessions_dir.mkdir(parents=True, exist_ok=True)
+        self._cursor_file: Path = self.sessions_dir / SWEEP_CURSOR_FILE
+        self._cursor: str = self._load_cursor()
+
+    @property
+    def backend(self) -> str:
+        return "file"
+
+    @property
+    def cursor(self) -> Optional[str]:
+        return self._cursor or None
+
+    def path(self, session_id: str) -> Path:
+        return self.sessions_dir / f"{session_id}.json"
+
+    def load(self, session_id: str) -> Optional[SessionRecord]:
+        session_file = self.path(session_id)
+        try:
+            if session_file.stat().st_mtime < time.time() - self.ttl:
+                return None
+        except FileNotFoundError:
+            return None
+        return _blocking_read_json(session_file) or None
+
+    def save(self, session_id: str, record: SessionRecord) -> None:
+        _blocking_write_json_atomic(self.path(session_id), record)
+
+    def touch(self, session_id: str) -> None:
+        try:
+            os.utime(self.path(session_id))
+        except FileNotFoundError:
+            pass
+
+    def delete(self, session_id: str) -> bool:
+        session_file = self.path(session_id)
+        if not session_file.exists():
+            return False
+        _blocking_remove_file(session_file)
+        return True
+
+    def scan_expired(self, limit: int) -> ExpiryScan:
+        # Следующие limit имён после курсора за один проход каталога: scandir не сортирует,
+        # но и не вызывает stat — mtime проверяет delete_expired только для выбранных файлов
+        with os.scandir(self.sessions_dir) as entries:
+            names = heapq.nsmallest(limit, (
+                entry.name for entry in entries
+                if entry.name.endswith(".json") and entry.name > self._cursor
+            ))
+        return ExpiryScan(session_ids=[name[:-len(".json")] for name in names], finished=len(names) < limit)
+
+    def delete_expired(self, session_ids: List[str], cursor: Optional[str] = None) -> List[str]:
+        deadline = time.time() - self.ttl
+        deleted: List[str] = []
+        for session_id in session_ids:
+            path = self.path(session_id)
+            try:
+                expired = path.stat().st_mtime < deadline
+            except FileNotFoundError:
+                continue
+            if expired:
+                _blocking_remove_file(path)
+                deleted.append(session_id)
+
+        if cursor is not None:
+            self._save_cursor(self.path(cursor).name if cursor else "")
+        return deleted
+
+    def _load_cursor(self) -> str:
+        if not self._cursor_file.exists():
+            return ""
+        return str(_blocking_read_json(self._cursor_file).get("cursor", ""))
+
+    def _save_cursor(self, cursor: str) -> None:
+        if cursor == self._cursor:
+            return
+        self._cursor = cursor
+        _blocking_write_json_atomic(self._cursor_file, {"cursor": cursor})
+
+
+class SqliteSessionStore(SessionStore):
+
+    TABLE_SESSIONS = "sessions"
+
+    def __init__(
+            self,
+            db_path: Path,
+            ttl: float,
+            profile: StorageProfile,
+            pool_size: int,
+            import_dir: Optional[Path] = None,
+    ) -> None:
+        super().__init__(ttl)
+        self.db_path: Path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._pool: ConnectionPool = ConnectionPool(
+            db_path=db_path,
+            max_size=pool_size,
+            pragmas=profile.pragmas(),
+        )
+        self._init_db(import_dir)
+
+    def _init_db(self, import_dir: Optional[Path]) -> None:
+        with self._pool.connection() as connection:
+            # session_id — первичный ключ (WITHOUT ROWID: сама таблица и есть индекс по нему)
+            connection.execute(
+                f'''
+                CREATE TABLE IF NOT EXISTS {self.TABLE_SESSIONS} (
+                    session_id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                ) WITHOUT ROWID
+                '''
+            )
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON {self.TABLE_SESSIONS} (expires_at)"
+            )
+            connection.commit()
+
+            # user_version = 1 — JSON-файлы уже перенесены
+            if import_dir is not None and connection.execute("PRAGMA user_version").fetchone()[0] < 1:
+                imported = self._import_json_files(connection, import_dir)
+                connection.execute("PRAGMA user_version = 1")
+                connection.commit()
+                logger.info(f"Сессий перенесено из {import_dir} в {self.db_path}: {imported}")
+
+    def _import_json_files(self, connection: Any, import_dir: Path) -> int:
+        if not import_dir.exists():
+            return 0
+        imported = 0
+        with os.scandir(import_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".json"):
+                    continue
+                record = _blocking_read_json(Path(entry.path))
+                if not record:
+                    continue
+                # Активность файловой сессии — mtime: срок жизни отсчитываем от него
+                updated_at = entry.stat().st_mtime
+                connection.execute(
+                    f'''
+                    INSERT OR IGNORE INTO {self.TABLE_SESSIONS} (session_id, data, updated_at, expires_at)
+                    VALUES (?, ?, ?, ?)
+                    ''',
+                    (entry.name[:-len(".json")], json.dumps(record, ensure_ascii=False), updated_at, updated_at + self.ttl)
+                )
+                imported += 1
+        return imported
+
+    def load(self, session_id: str) -> Optional[SessionRecord]:
+        with self._pool.connection() as connection:
+            row = connection.execute(
+                f"SELECT data FROM {self.TABLE_SESSIONS} WHERE session_id = ? AND expires_at >= ?",
+                (session_id, time.time())
+            ).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def save(self, session_id: str, record: SessionRecord) -> None:
+        now = time.time()
+        with self._pool.connection() as connection:
+            connection.execute(
+                f'''
+                INSERT INTO {self.TABLE_SESSIONS} (session_id, data, updated_at, expires_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (session_id) DO UPDATE SET
+                    data = excluded.data,
+                    updated_at = excluded.updated_at,
+                    expires_at = excluded.expires_at
+                ''',
+                (session_id, json.dumps(record, ensure_ascii=False), now, now + self.ttl)
+            )
+            connection.commit()
+
+    def touch(self, session_id: str) -> None:
+        now = time.time()
+        with self._pool.connection() as connection:
+            connection.execute(
+                f"UPDATE {self.TABLE_SESSIONS} SET updated_at = ?, expires_at = ? WHERE session_id = ?",
+                (now, now + self.ttl, session_id)
+            )
+            connection.commit()
+
+    def delete(self, session_id: str) -> bool:
+        with self._pool.connection() as connection:
+            cursor = connection.execute(f"DELETE FROM {self.TABLE_SESSIONS} WHERE session_id = ?", (session_id,))
+            connection.commit()
+            return cursor.rowcount > 0
+
+    @property
+    def backend(self) -> str:
+        return "sqlite"
+
+    def scan_expired(self, limit: int) -> ExpiryScan:
+        # Диапазон по индексу expires_at, без скана таблицы
+        with self._pool.connection() as connection:
+            rows = connection.execute(
+                f"SELECT session_id FROM {self.TABLE_SESSIONS} WHERE expires_at < ? LIMIT ?",
+                (time.time(), limit)
+            ).fetchall()
+        return ExpiryScan(session_ids=[row["session_id"] for row in rows], finished=len(rows) < limit)
+
+    def delete_expired(self, session_ids: List[str], cursor: Optional[str] = None) -> List[str]:
+        # Условие по expires_at повторяем: сессию могли продлить после scan_expired
+        now = time.time()
+        deleted: List[str] = []
+        with self._pool.connection() as connection:
+            for session_id in session_ids:
+                if connection.execute(
+                        f"DELETE FROM {self.TABLE_SESSIONS} WHERE session_id = ? AND expires_at < ?",
+                        (session_id, now)
+                ).rowcount:
+                    deleted.append(session_id)
+            connection.commit()
+        return deleted
+
+    def close(self) -> None:
+        self._pool.close()
+
+
+def create_session_store(settings: Settings, sessions_dir: Optional[Path] = None) -> SessionStore:
+    sessions_dir = sessions_dir or settings.SESSIONS_DIR
+    if settings.SESSION_BACKEND == "sqlite":
+        return SqliteSessionStore(
+            db_path=settings.SESSIONS_DB_PATH,
+            ttl=settings.SESSION_TTL_SECONDS,
+            profile=StorageProfile.from_settings(settings),
+            pool_size=settings.DB_POOL_SIZE,
+            import_dir=sessions_dir,
+        )
+    return FileSessionStore(sessions_dir=sessions_dir, ttl=settings.SESSION_TTL_SECONDS)
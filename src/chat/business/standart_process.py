@@ -196,23 +196,19 @@ class StandartProcess:
             ),
         )
 
-        await get_db_manager().remove_all_messages_chat(chat_id=self.message_user.chat_id)
-        update_chat: Optional[Chat] =await get_db_manager().update_chat_system_prompt(
-            chat_id = self.chat.id,
-            system_prompt=self.system_prompt
-        )
-
-        if update_chat:
-            self.chat = update_chat
-
         try:
-            summary_message_db: Message = await get_db_manager().add_message(summary_message)  # type: ignore
-            message_user_db: Message = await get_db_manager().add_message(self.message_user)  # type: ignore
-            message_db: Message = await get_db_manager().add_message(response_message)  # type: ignore
+            # История, промпт и новые сообщения заменяются одним атомарным коммитом
+            summary_message_db, message_user_db, message_db = await get_db_manager().replace_chat_history(
+                chat_id=self.message_user.chat_id,
+                messages=[summary_message, self.message_user, response_message],
+                system_prompt=self.system_prompt,
+            )
         except Exception as e:
             print(f"❌ Ошибка добавления сообщений на уровне процесса суммаризации: {e}")
             raise HTTPException(status_code=503, detail="Ошибка сохранения")
 
+        self.chat = self.chat.model_copy(update={"system_prompt": self.system_prompt})
+
         return [
             summary_message_db,
             message_user_db,
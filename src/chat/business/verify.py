@@ -3,22 +3,36 @@ import logging
 from starlette.requests import Request
 from fastapi import HTTPException
 
+from src.chat.business.auth_token import get_token_signer
 from src.chat.business.session_interactor import get_session_manager
-from src.chat.core.constants import KEY_SESSION_ID, KEY_PASSWORD_SALT
+from src.chat.core.configs import settings
+from src.chat.core.constants import KEY_PASSWORD_SALT, KEY_AUTH_TOKEN
+from src.chat.server.session_middleware import get_request_session_id
 
 logger = logging.getLogger(__name__)
 
 
-async def verify(
-        request: Request
-) -> None:
-    session_id = request.cookies.get(KEY_SESSION_ID)
+async def is_authorized(request: Request) -> bool:
+    session_id = get_request_session_id(request)
+
+    if settings.AUTH_MODE == "token":
+        # Только проверка подписи — без обращения к хранилищу сессий
+        token_session_id = get_token_signer().verify(request.cookies.get(KEY_AUTH_TOKEN))
+        return token_session_id is not None and token_session_id == session_id
+
     password_salt = request.cookies.get(KEY_PASSWORD_SALT)
     verify_session = await get_session_manager().verify_session(
         session_id=session_id,
         cookie_password_salt=password_salt
     )
-    if not verify_session:
+    return bool(verify_session)
+
+
+async def verify(
+        request: Request
+) -> None:
+    if not await is_authorized(request):
+        session_id = get_request_session_id(request)
         logger.warning(f"❌ Неверный пароль или нет сессии {session_id}")
         raise HTTPException(
             status_code=401,
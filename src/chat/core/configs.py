@@ -41,6 +41,109 @@ class Settings:
 
         self.CORS_ALLOWED_HOSTS: list[str] | None = ["http://localhost:5173"]
 
+        # ===== Настройки базы данных =====
+        # Максимум соединений SQLite в пуле одного процесса
+        self.DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "8"))
+        # Сколько секунд ждать свободное соединение из пула
+        self.DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+        # Сколько миллисекунд SQLite ждёт снятия блокировки другим соединением/воркером
+        self.DB_BUSY_TIMEOUT_MS: int = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+
+        # Профиль хранения: применяется PRAGMA к каждому соединению
+        # WAL — читатели не блокируются пишущим add_message
+        self.DB_JOURNAL_MODE: str = os.getenv("DB_JOURNAL_MODE", "WAL")
+        # NORMAL в режиме WAL — fsync только на чекпоинте; FULL — на каждом коммите
+        self.DB_SYNCHRONOUS: str = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+        # Размер memory-mapped I/O в байтах (0 — выключено)
+        self.DB_MMAP_SIZE: int = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+        # Кэш страниц: отрицательное значение — в КиБ, положительное — в страницах
+        self.DB_CACHE_SIZE: int = int(os.getenv("DB_CACHE_SIZE", str(-64 * 1024)))
+        # Автоматический чекпоинт WAL каждые N страниц (0 — только фоновый)
+        self.DB_WAL_AUTOCHECKPOINT: int = int(os.getenv("DB_WAL_AUTOCHECKPOINT", "1000"))
+        # Период фонового чекпоинта WAL в секундах (0 — выключен)
+        self.DB_WAL_CHECKPOINT_SECONDS: int = int(os.getenv("DB_WAL_CHECKPOINT_SECONDS", "60"))
+        # Если WAL вырос больше этого размера, фоновый чекпоинт делает TRUNCATE вместо PASSIVE
+        self.DB_WAL_TRUNCATE_BYTES: int = int(os.getenv("DB_WAL_TRUNCATE_BYTES", str(64 * 1024 * 1024)))
+
+        # Групповой коммит: add_message ставит вставку в очередь, фоновая задача пишет пачками
+        self.DB_WRITE_BEHIND: bool = os.getenv("DB_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+        # Максимум сообщений в одной транзакции
+        self.DB_WRITE_BEHIND_BATCH_SIZE: int = int(os.getenv("DB_WRITE_BEHIND_BATCH_SIZE", "100"))
+        # Сколько миллисекунд добирать пачку после первого сообщения
+        self.DB_WRITE_BEHIND_FLUSH_MS: int = int(os.getenv("DB_WRITE_BEHIND_FLUSH_MS", "5"))
+
+        # Фоновое удаление сообщений устаревших эпох (очищенная история): период в секундах (0 — выключено)
+        self.DB_RECLAIM_SECONDS: int = int(os.getenv("DB_RECLAIM_SECONDS", "30"))
+        # Строк в одной транзакции удаления — короткая блокировка записи
+        self.DB_RECLAIM_BATCH_SIZE: int = int(os.getenv("DB_RECLAIM_BATCH_SIZE", "500"))
+        # Максимум пачек за один запуск
+        self.DB_RECLAIM_MAX_BATCHES: int = int(os.getenv("DB_RECLAIM_MAX_BATCHES", "20"))
+
+        # Обслуживание базы: хранение, incremental_vacuum, optimize. Период в секундах (0 — выключено)
+        self.DB_MAINTENANCE_SECONDS: int = int(os.getenv("DB_MAINTENANCE_SECONDS", "3600"))
+        # Сколько дней хранить сообщения и архив (0 — бессрочно)
+        self.DB_MESSAGES_RETENTION_DAYS: int = int(os.getenv("DB_MESSAGES_RETENTION_DAYS", "0"))
+        self.DB_ARCHIVE_RETENTION_DAYS: int = int(os.getenv("DB_ARCHIVE_RETENTION_DAYS", "0"))
+        # Строк в одной транзакции удаления по сроку хранения и максимум пачек за запуск
+        self.DB_RETENTION_BATCH_SIZE: int = int(os.getenv("DB_RETENTION_BATCH_SIZE", "500"))
+        self.DB_RETENTION_MAX_BATCHES: int = int(os.getenv("DB_RETENTION_MAX_BATCHES", "100"))
+        # Сколько свободных страниц возвращать за один запуск incremental_vacuum
+        self.DB_INCREMENTAL_VACUUM_PAGES: int = int(os.getenv("DB_INCREMENTAL_VACUUM_PAGES", "2000"))
+        # Рабочие часы (локальное время, [начало, конец)): удаление и vacuum не запускаются (начало = конец — без ограничений)
+        self.DB_BUSINESS_HOURS_START: int = int(os.getenv("DB_BUSINESS_HOURS_START", "9"))
+        self.DB_BUSINESS_HOURS_END: int = int(os.getenv("DB_BUSINESS_HOURS_END", "19"))
+
+        # Кэш истории чатов в памяти (0 — выключен)
+        self.DB_HISTORY_CACHE_MAX_CHATS: int = int(os.getenv("DB_HISTORY_CACHE_MAX_CHATS", "256"))
+        self.DB_HISTORY_CACHE_MAX_BYTES: int = int(os.getenv("DB_HISTORY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        # Как часто сверять закэшированную историю с базой, с: изменения из других воркеров
+        # видны с задержкой до этого интервала (0 — сверка на каждом чтении, один запрос к chats)
+        self.DB_HISTORY_CACHE_CHECK_INTERVAL: float = float(os.getenv("DB_HISTORY_CACHE_CHECK_INTERVAL", "1.0"))
+
+        # Число файлов базы: чат живёт в шарде crc32(chat_id) % DB_SHARDS (1 — одна база app.db).
+        # Чаты, которые при новом значении живут в других шардах, переносятся туда при старте вместе с историей
+        self.DB_SHARDS: int = int(os.getenv("DB_SHARDS", "1"))
+
+        # Кэш метаданных чатов (таблица chats) в памяти процесса
+        self.DB_CHAT_CACHE: bool = os.getenv("DB_CHAT_CACHE", "true").lower() in ("1", "true", "yes")
+        # Как часто сверять кэш чатов с базой, с: изменения chats из других воркеров видны с задержкой
+        # до этого интервала (0 — сверка на каждом чтении)
+        self.DB_CHAT_CACHE_CHECK_INTERVAL: float = float(os.getenv("DB_CHAT_CACHE_CHECK_INTERVAL", "1.0"))
+
+        # ===== Настройки сессий =====
+        # Хранилище сессий: file — JSON-файл на сессию в SESSIONS_DIR, sqlite — таблица в SESSIONS_DB_PATH.
+        # При первом запуске sqlite переносит в себя существующие файлы сессий (файлы остаются на месте)
+        self.SESSION_BACKEND: str = os.getenv("SESSION_BACKEND", "file").lower()
+        self.SESSIONS_DB_PATH: Path = Path(os.getenv("SESSIONS_DB_PATH", str(self.DB_DIR / "sessions.db")))
+        # Время жизни сессии с последней активности в секундах (как у cookie session_id)
+        self.SESSION_TTL_SECONDS: int = int(os.getenv("SESSION_TTL_SECONDS", str(60 * 60 * 24)))
+        # Удаление устаревших сессий: период в секундах (0 — выключено) и объём одного запуска.
+        # Для файлов пачка — столько имён каталога сессий, следующий запуск продолжает обход с того же места
+        self.SESSION_EXPIRY_SECONDS: int = int(os.getenv("SESSION_EXPIRY_SECONDS", "600"))
+        self.SESSION_EXPIRY_BATCH_SIZE: int = int(os.getenv("SESSION_EXPIRY_BATCH_SIZE", "1000"))
+        self.SESSION_EXPIRY_MAX_BATCHES: int = int(os.getenv("SESSION_EXPIRY_MAX_BATCHES", "20"))
+
+        # Кэш сессий в памяти: максимум записей (0 — выключен) и время жизни записи в секундах.
+        # Смену пароля в другом воркере этот процесс увидит не позже чем через TTL
+        self.SESSION_CACHE_MAX_ENTRIES: int = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "10000"))
+        self.SESSION_CACHE_TTL_SECONDS: float = float(os.getenv("SESSION_CACHE_TTL_SECONDS", "60"))
+        # Сколько помнить, что сессии нет (её может создать другой воркер)
+        self.SESSION_CACHE_NEGATIVE_TTL_SECONDS: float = float(os.getenv("SESSION_CACHE_NEGATIVE_TTL_SECONDS", "5"))
+
+        # Режим авторизации: session — соль из cookie сверяется с файлом сессии,
+        # token — подписанный HMAC токен проверяется без обращения к хранилищу сессий
+        self.AUTH_MODE: str = os.getenv("AUTH_MODE", "session").lower()
+        # Секрет подписи токенов; общий для всех воркеров, иначе токен одного не примет другой
+        self.AUTH_TOKEN_SECRET: str = os.getenv("AUTH_TOKEN_SECRET", "")
+        # Время жизни токена в секундах
+        self.AUTH_TOKEN_TTL_SECONDS: int = int(os.getenv("AUTH_TOKEN_TTL_SECONDS", str(60 * 60 * 24)))
+
+        # ===== Настройки статики =====
+        # Предсжатые варианты gzip/brotli файлов SITE_DIR при старте (brotli — если установлен пакет brotli)
+        self.STATIC_PRECOMPRESS: bool = os.getenv("STATIC_PRECOMPRESS", "true").lower() in ("1", "true", "yes")
+        # Файлы меньше этого размера в байтах не сжимаются
+        self.STATIC_COMPRESS_MIN_BYTES: int = int(os.getenv("STATIC_COMPRESS_MIN_BYTES", "512"))
+
         # ===== Настройки сертификатов =====
         # Путь к файлу сертификата НУЦ Минцифры
         # https://developers.sber.ru/docs/ru/gigachat/certificates
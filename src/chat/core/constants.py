@@ -12,12 +12,17 @@ KEY_SELECTED_FORMAT_TYPE_REQUEST: Final[str] = "KEY_SELECTED_FORMAT_TYPE_REQUEST
 KEY_SELECTED_FORMAT_REQUEST: Final[str] = "KEY_SELECTED_FORMAT_REQUEST"
 KEY_PASSWORD_SALT: Final[str] = "KEY_PASSWORD_SALT"
 KEY_SESSION_ID: Final[str] = "KEY_SESSION_ID"
+KEY_AUTH_TOKEN: Final[str] = "KEY_AUTH_TOKEN"
 
 # ИНСТРУМЕНТЫ
 MAX_FILE_SIZE: Final[int] = 10 * 1024 * 1024  # 10MB
 MAX_FILE_READ_SIZE: Final[int] = 1 * 1024 * 1024  # 1MB
 ONE_DAY_IN_SECONDS: Final[int] = 60 * 60 * 24 # 1 день # секунды
 
+# ИСТОРИЯ СООБЩЕНИЙ
+HISTORY_PAGE_SIZE: Final[int] = 50
+HISTORY_PAGE_SIZE_MAX: Final[int] = 500
+
 
 CHATS_DEFAULT: Final[list[Chat]] =[
     Chat(
@@ -0,0 +1,85 @@
+"""
+Кэш таблицы chats целиком в памяти процесса.
+"""
+import logging
+import time
+from typing import Dict, List, Optional
+
+from src.chat.model.chat import Chat
+from src.chat.model.stats import ChatCacheStats
+
+logger = logging.getLogger(__name__)
+
+
+class ChatCache:
+
+    def __init__(self, enabled: bool = True, check_interval: float = 0.0) -> None:
+        self.enabled: bool = enabled
+        # Как часто сверять версию chats с базой, с (0 — на каждом чтении)
+        self.check_interval: float = check_interval
+
+        # Без блокировок: кэш трогают только корутины DbManager в event loop.
+        # Chat в нём общие для всех вызывающих — менять только через model_copy
+        self._chats: Optional[Dict[str, Chat]] = None
+        # Версия таблицы chats в базе, при которой прочитаны закэшированные чаты
+        self._data_version: Optional[int] = None
+        # Когда _data_version последний раз совпала с базой (time.monotonic)
+        self._checked_at: float = 0.0
+        # Версия растёт при каждом изменении chats: чтение из базы, начатое до изменения, не кэшируется
+        self._version: int = 0
+
+        self._hits: int = 0
+        self._misses: int = 0
+        self._stale: int = 0
+        self._invalidations: int = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def needs_check(self) -> bool:
+        """Кэш заполнен, и его версию пора сверить с базой."""
+        return self._chats is not None and time.monotonic() - self._checked_at >= self.check_interval
+
+    def revalidate(self, data_version: Optional[int]) -> None:
+        """data_version — текущая версия chats в базе; кэш другой версии устарел и сбрасывается."""
+        if self._chats is None:
+            return
+        if self._data_version != data_version:
+            self._stale += 1
+            self._chats = None
+            return
+        self._checked_at = time.monotonic()
+
+    def get(self) -> Optional[Dict[str, Chat]]:
+        """Все чаты по id; None — промах, таблицу нужно прочитать из базы."""
+        if self._chats is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        return self._chats
+
+    def put(self, chats: List[Chat], version: int, data_version: Optional[int]) -> None:
+        if not self.enabled or version != self._version or data_version is None:
+            return
+        self._chats = {chat.id: chat for chat in chats}
+        self._data_version = data_version
+        self._checked_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        self._version += 1
+        self._invalidations += 1
+        self._chats = None
+        self._data_version = None
+
+    def stats(self) -> ChatCacheStats:
+        requests = self._hits + self._misses
+        return ChatCacheStats(
+            enabled=self.enabled,
+            chats=len(self._chats) if self._chats is not None else 0,
+            hits=self._hits,
+            misses=self._misses,
+            hit_rate=self._hits / requests if requests else 0.0,
+            stale=self._stale,
+            invalidations=self._invalidations,
+        )
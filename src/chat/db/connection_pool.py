@@ -0,0 +1,189 @@
+import os
+import sqlite3
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from sqlite3 import Connection
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+from src.chat.model.stats import PoolStats
+
+logger = logging.getLogger(__name__)
+
+PragmaValue = Union[str, int]
+
+
+class PoolTimeoutError(Exception):
+    """Не удалось получить соединение из пула за отведённое время."""
+
+
+class ConnectionPool:
+    """
+    Ограниченный пул долгоживущих соединений SQLite.
+
+    Соединения создаются лениво до max_size, при создании на них применяются PRAGMA.
+    После fork (несколько воркеров uvicorn) унаследованные соединения не переиспользуются:
+    каждый процесс открывает свои.
+    """
+
+    DEFAULT_MAX_SIZE = 8
+    DEFAULT_TIMEOUT = 30.0
+
+    def __init__(
+            self,
+            db_path: Path,
+            max_size: int = DEFAULT_MAX_SIZE,
+            timeout: float = DEFAULT_TIMEOUT,
+            pragmas: Optional[Dict[str, PragmaValue]] = None,
+            on_connect: Optional[Callable[[Connection], None]] = None,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size должен быть >= 1")
+
+        self.db_path: Path = db_path
+        self.max_size: int = max_size
+        self.timeout: float = timeout
+        self.pragmas: Dict[str, PragmaValue] = pragmas or {}
+        # Дополнительная настройка нового соединения (например, регистрация SQL-функций)
+        self.on_connect: Optional[Callable[[Connection], None]] = on_connect
+
+        self._condition = threading.Condition(threading.Lock())
+        self._idle: List[Connection] = []
+        self._created: int = 0
+        self._pid: int = os.getpid()
+        self._closed: bool = False
+
+        self._hits: int = 0
+        self._misses: int = 0
+        self._waits: int = 0
+        self._timeouts: int = 0
+        self._total_wait: float = 0.0
+        self._max_wait: float = 0.0
+
+    def _create_connection(self) -> Connection:
+        connection = sqlite3.connect(
+            str(self.db_path),
+            timeout=self.timeout,
+            check_same_thread=False,
+        )
+        connection.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            connection.execute(f"PRAGMA {name} = {value}")
+        if self.on_connect is not None:
+            self.on_connect(connection)
+        return connection
+
+    def _reset_after_fork(self) -> None:
+        # Соединения SQLite нельзя использовать в дочернем процессе — просто забываем их
+        self._condition = threading.Condition(threading.Lock())
+        self._idle = []
+        self._created = 0
+        self._pid = os.getpid()
+
+    def _acquire(self) -> Connection:
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+
+        started = time.perf_counter()
+        waited = False
+        connection: Optional[Connection] = None
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise PoolTimeoutError(f"Пул соединений закрыт: {self.db_path}")
+
+                if self._idle:
+                    connection = self._idle.pop()
+                    self._hits += 1
+                    break
+
+                if self._created < self.max_size:
+                    self._created += 1
+                    self._misses += 1
+                    break
+
+                waited = True
+                remaining = self.timeout - (time.perf_counter() - started)
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    if not self._idle:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"Нет свободных соединений за {self.timeout} c (max_size={self.max_size})"
+                        )
+
+            if waited:
+                elapsed = time.perf_counter() - started
+                self._waits += 1
+                self._total_wait += elapsed
+                self._max_wait = max(self._max_wait, elapsed)
+
+        if connection is None:
+            try:
+                connection = self._create_connection()
+            except Exception:
+                with self._condition:
+                    self._created -= 1
+                    self._condition.notify()
+                raise
+            logger.info(f"Новое соединение SQLite открыто ({self._created}/{self.max_size}): {self.db_path}")
+
+        return connection
+
+    def _release(self, connection: Connection, broken: bool = False) -> None:
+        if not broken and connection.in_transaction:
+            try:
+                connection.rollback()
+            except sqlite3.Error:
+                broken = True
+
+        with self._condition:
+            if broken or self._closed:
+                self._created -= 1
+                connection.close()
+            else:
+                self._idle.append(connection)
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Connection]:
+        connection = self._acquire()
+        broken = False
+        try:
+            yield connection
+        except sqlite3.Error as e:
+            # Повреждённое/закрытое соединение в пул не возвращаем
+            broken = isinstance(e, (sqlite3.ProgrammingError, sqlite3.InterfaceError))
+            raise
+        finally:
+            self._release(connection, broken=broken)
+
+    def stats(self) -> PoolStats:
+        with self._condition:
+            acquired = self._hits + self._misses
+            return PoolStats(
+                db_path=str(self.db_path),
+                max_size=self.max_size,
+                size=self._created,
+                idle=len(self._idle),
+                in_use=self._created - len(self._idle),
+                hits=self._hits,
+                misses=self._misses,
+                hit_rate=self._hits / acquired if acquired else 0.0,
+                waits=self._waits,
+                timeouts=self._timeouts,
+                total_wait_ms=self._total_wait * 1000,
+                avg_wait_ms=(self._total_wait / self._waits * 1000) if self._waits else 0.0,
+                max_wait_ms=self._max_wait * 1000,
+            )
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            for connection in self._idle:
+                connection.close()
+            self._created -= len(self._idle)
+            self._idle = []
+            self._condition.notify_all()
+        logger.info(f"Пул соединений закрыт: {self.db_path}")
@@ -1,38 +1,368 @@
-import sqlite3
+import asyncio
 import logging
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from functools import partial
 from pathlib import Path
 from sqlite3 import Connection, Cursor
-from typing import List, Optional
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, Final, List, Optional, Tuple, TypeVar, Union
 
+from src.chat.db.chat_cache import ChatCache
+from src.chat.db.connection_pool import ConnectionPool
+from src.chat.db.history_cache import HistoryCache
+from src.chat.db.migrations import apply_migrations, set_schema_version
+from src.chat.db.storage_profile import StorageProfile
+from src.chat.db.write_behind import WriteBehindQueue
 from src.chat.model.chat import Chat
 from src.chat.core.constants import CHATS_DEFAULT
 from src.chat.model.messages import Message, MessageType
+from src.chat.model.search import SearchResult, SearchResultList
+from src.chat.model.usage import ChatUsage
+from src.chat.model.stats import DbSizeStats, DbStats, MaintenanceRunStats, ReclaimStats, WalCheckpointStats
+
+if TYPE_CHECKING:
+    from src.chat.db.sharded_db_manager import ShardedDbManager
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Порядок колонок совпадает с индексами в _row_to_message
+MESSAGE_COLUMNS: Final[str] = (
+    "id, chat_id, session_id, message_type, agent_id, name, timestamp, message, "
+    "prompt_tokens, completion_tokens, request_time, price, meta"
+)
+# Те же колонки в messages_archive: id сообщения хранится в message_id, id — собственный ключ архива
+ARCHIVE_COLUMNS: Final[str] = (
+    "message_id, chat_id, session_id, message_type, agent_id, name, timestamp, message, "
+    "prompt_tokens, completion_tokens, request_time, price, meta"
+)
+# Текущая эпоха истории чата (параметр — chat_id); чат без записи в chats живёт в эпохе 0
+CHAT_EPOCH_SQL: Final[str] = "COALESCE((SELECT history_epoch FROM chats WHERE chat_id = ?), 0)"
+# Базу не больше стольких страниц переводим в auto_vacuum=INCREMENTAL прямо при старте (VACUUM мгновенный)
+_VACUUM_ON_INIT_MAX_PAGES: Final[int] = 1024
+_AUTO_VACUUM_MODES: Final[Dict[int, str]] = {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}
+_MESSAGE_TYPES: Final[Dict[str, MessageType]] = {message_type.value: message_type for message_type in MessageType}
+
+
+def _row_to_message(row: Any) -> Message:
+    """
+    Строка messages (колонки MESSAGE_COLUMNS) в Message без повторной валидации.
+
+    Строки пишет только DbManager из уже провалидированных Message.
+    """
+    return Message.model_construct(
+        id=row[0],
+        chat_id=row[1],
+        session_id=row[2],
+        message_type=_MESSAGE_TYPES[row[3]],
+        agent_id=row[4],
+        name=row[5],
+        timestamp=row[6],
+        message=row[7],
+        prompt_tokens=row[8],
+        completion_tokens=row[9],
+        request_time=row[10],
+        price=row[11],
+        meta=row[12] or "",
+    )
+
+
+def _zlib_compress(value: Optional[str]) -> Optional[bytes]:
+    if value is None:
+        return None
+    return zlib.compress(value.encode("utf-8"), 6)
+
+
+def _zlib_decompress(value: Optional[bytes]) -> str:
+    if value is None:
+        return ""
+    return zlib.decompress(value).decode("utf-8")
+
+
+def _register_functions(connection: Connection) -> None:
+    connection.create_function("zlib_compress", 1, _zlib_compress, deterministic=True)
+
 
 class DbManager:
     TABLE_MESSAGES = "messages"
     TABLE_CHATS = "chats"
+    TABLE_MESSAGES_FTS = "messages_fts"
+    TABLE_USAGE_DAILY = "usage_daily"
+    TABLE_USAGE_TOTALS = "usage_totals"
+    TABLE_MESSAGES_ARCHIVE = "messages_archive"
 
-    def __init__(self, db_dir: Optional[Path] = None) -> None:
+    def __init__(
+            self,
+            db_dir: Optional[Path] = None,
+            profile: Optional[StorageProfile] = None,
+            write_behind: Optional[bool] = None,
+            db_name: str = "app.db",
+            default_chats: Optional[List[Chat]] = None,
+            message_id_base: int = 0,
+    ) -> None:
+        from src.chat.core.configs import settings
         if db_dir is None:
-            from src.chat.core.configs import settings
             db_dir = settings.DB_DIR
+        if profile is None:
+            profile = StorageProfile.from_settings(settings)
+        if write_behind is None:
+            write_behind = settings.DB_WRITE_BEHIND
 
         self.db_dir: Path = Path(db_dir)
         self.db_dir.mkdir(parents=True, exist_ok=True)
-        self.db_path: Path = self.db_dir / "app.db"
+        self.db_path: Path = self.db_dir / db_name
+        # Чаты, которые создаются при инициализации (в шардированном режиме — только свои для шарда)
+        self.default_chats: List[Chat] = CHATS_DEFAULT if default_chats is None else default_chats
+        # Нижняя граница id новых сообщений: у каждого шарда свой диапазон, id уникальны между шардами
+        self.message_id_base: int = message_id_base
+        self.profile: StorageProfile = profile
+        self._last_checkpoint: Optional[WalCheckpointStats] = None
+        self._last_reclaim: Optional[ReclaimStats] = None
+        self._total_reclaimed: int = 0
+        self._last_maintenance: Dict[str, MaintenanceRunStats] = {}
+
+        self._pool: ConnectionPool = ConnectionPool(
+            db_path=self.db_path,
+            max_size=settings.DB_POOL_SIZE,
+            timeout=settings.DB_POOL_TIMEOUT,
+            pragmas=profile.pragmas(),
+            on_connect=_register_functions,
+        )
+
+        # Отдельный ограниченный пул потоков: блокирующие вызовы sqlite3 не занимают event loop
+        # и не конкурируют с default executor (его использует SessionManager)
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=settings.DB_POOL_SIZE,
+            thread_name_prefix="sqlite",
+        )
+
+        self._history_cache: HistoryCache = HistoryCache(
+            max_chats=settings.DB_HISTORY_CACHE_MAX_CHATS,
+            max_bytes=settings.DB_HISTORY_CACHE_MAX_BYTES,
+            check_interval=settings.DB_HISTORY_CACHE_CHECK_INTERVAL,
+        )
+
+        self._chat_cache: ChatCache = ChatCache(
+            enabled=settings.DB_CHAT_CACHE,
+            check_interval=settings.DB_CHAT_CACHE_CHECK_INTERVAL,
+        )
+
+        self._write_behind: Optional[WriteBehindQueue] = None
+        if write_behind:
+            self._write_behind = WriteBehindQueue(
+                write_batch=self._write_batch,
+                batch_size=settings.DB_WRITE_BEHIND_BATCH_SIZE,
+                flush_interval=settings.DB_WRITE_BEHIND_FLUSH_MS / 1000,
+            )
 
         self._init_db()
 
-    def _get_connection(self) -> Connection:
-        connection = sqlite3.connect(str(self.db_path))
-        connection.row_factory = sqlite3.Row
-        return connection
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            partial(func, *args)
+        )
+
+    def get_stats(self) -> DbStats:
+        return DbStats(
+            pool=self._pool.stats(),
+            storage_profile=self.profile.pragmas(),
+            last_checkpoint=self._last_checkpoint,
+            last_reclaim=self._last_reclaim,
+            maintenance=dict(self._last_maintenance),
+            write_behind=self._write_behind.stats() if self._write_behind else None,
+            history_cache=self._history_cache.stats(),
+            chat_cache=self._chat_cache.stats(),
+        )
+
+    async def collect_stats(self) -> DbStats:
+        """get_stats вместе с размером файла (для него нужен запрос к базе)."""
+        stats = self.get_stats()
+        stats.size = await self.get_size_stats()
+        return stats
+
+    @property
+    def shards(self) -> List["DbManager"]:
+        """Базы, которые обслуживает фоновое обслуживание: здесь одна, у ShardedDbManager — все шарды."""
+        return [self]
+
+    def wal_size_bytes(self) -> int:
+        wal_path = self.db_path.with_name(self.db_path.name + "-wal")
+        try:
+            return wal_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    async def checkpoint_wal(self, mode: str = "PASSIVE") -> Optional[WalCheckpointStats]:
+        return await self._run(self._checkpoint_wal, mode)
+
+    def _checkpoint_wal(self, mode: str = "PASSIVE") -> Optional[WalCheckpointStats]:
+        if not self.profile.is_wal:
+            return None
+
+        wal_size = self.wal_size_bytes()
+        started = time.perf_counter()
+        with self._pool.connection() as connection:
+            busy, log_frames, checkpointed = connection.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+
+        self._last_checkpoint = WalCheckpointStats(
+            mode=mode,
+            busy=bool(busy),
+            log_frames=log_frames,
+            checkpointed_frames=checkpointed,
+            wal_size_bytes=wal_size,
+            duration_ms=(time.perf_counter() - started) * 1000,
+            finished_at=datetime.now(timezone.utc).isoformat(),
+        )
+        logger.info(f"WAL checkpoint {mode}: {checkpointed}/{log_frames} кадров, busy={bool(busy)}")
+        return self._last_checkpoint
+
+    async def get_size_stats(self) -> DbSizeStats:
+        return await self._run(self._get_size_stats)
+
+    def _get_size_stats(self) -> DbSizeStats:
+        with self._pool.connection() as connection:
+            page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+            page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+            freelist_count = connection.execute("PRAGMA freelist_count").fetchone()[0]
+            auto_vacuum = connection.execute("PRAGMA auto_vacuum").fetchone()[0]
+
+        try:
+            file_size = self.db_path.stat().st_size
+        except FileNotFoundError:
+            file_size = 0
+
+        return DbSizeStats(
+            file_size_bytes=file_size,
+            wal_size_bytes=self.wal_size_bytes(),
+            page_size=page_size,
+            page_count=page_count,
+            freelist_count=freelist_count,
+            free_ratio=freelist_count / page_count if page_count else 0.0,
+            auto_vacuum=_AUTO_VACUUM_MODES.get(auto_vacuum, str(auto_vacuum)),
+        )
+
+    def _record_maintenance(self, task: str, rows: int, started: float) -> MaintenanceRunStats:
+        stats = MaintenanceRunStats(
+            task=task,
+            rows=rows,
+            duration_ms=(time.perf_counter() - started) * 1000,
+            finished_at=datetime.now(timezone.utc).isoformat(),
+        )
+        self._last_maintenance[task] = stats
+        logger.info(f"Обслуживание {task}: {rows} за {stats.duration_ms:.0f} мс")
+        return stats
+
+    async def enforce_retention(self, table: str, days: int, batch_size: int, max_batches: int) -> MaintenanceRunStats:
+        """
+        Удаляет из messages или messages_archive строки старше days дней пачками по batch_size.
+        Каждая пачка — отдельная короткая транзакция, между пачками блокировка записи отпускается.
+        """
+        if table not in (self.TABLE_MESSAGES, self.TABLE_MESSAGES_ARCHIVE):
+            raise ValueError(f"Срок хранения не поддерживается для таблицы {table}")
+
+        started = time.perf_counter()
+        deleted = 0
+        for _ in range(max_batches):
+            batch_deleted = await self._run(self._delete_expired_batch, table, days, batch_size)
+            deleted += batch_deleted
+            if batch_deleted < batch_size:
+                break
+            await asyncio.sleep(0.01)
+
+        if deleted and table == self.TABLE_MESSAGES:
+            # Из кэша могли пропасть самые старые сообщения любого чата
+            self._history_cache.clear()
+        return self._record_maintenance(f"retention_{table}", deleted, started)
+
+    def _delete_expired_batch(self, table: str, days: int, batch_size: int) -> int:
+        # id растёт вместе с created_at: берём самые старые строки по первичному ключу без скана таблицы.
+        # Если в пачке попалась ещё не устаревшая строка — устаревших больше нет
+        with self._pool.connection() as connection:
+            try:
+                cursor = connection.execute(
+                    f'''
+                    DELETE FROM {table}
+                    WHERE id IN (SELECT id FROM {table} ORDER BY id LIMIT ?)
+                      AND created_at < datetime('now', ?)
+                    ''',
+                    (batch_size, f"-{int(days)} days")
+                )
+                connection.commit()
+                return cursor.rowcount
+            except Exception as e:
+                logger.error(f"Retention error ({table}): {e}")
+                raise
+
+    async def incremental_vacuum(self, pages: int) -> MaintenanceRunStats:
+        """Возвращает ОС до pages свободных страниц (нужен auto_vacuum=INCREMENTAL)."""
+        started = time.perf_counter()
+        freed = await self._run(self._incremental_vacuum, pages)
+        return self._record_maintenance("incremental_vacuum", freed, started)
+
+    def _incremental_vacuum(self, pages: int) -> int:
+        with self._pool.connection() as connection:
+            before = int(connection.execute("PRAGMA freelist_count").fetchone()[0])
+            # execute() делает один шаг (одну страницу) для PRAGMA без результата — executescript доводит до конца
+            connection.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+            return before - int(connection.execute("PRAGMA freelist_count").fetchone()[0])
+
+    async def optimize(self) -> MaintenanceRunStats:
+        """PRAGMA optimize: обновляет статистику планировщика только там, где она устарела."""
+        started = time.perf_counter()
+        await self._run(self._optimize)
+        return self._record_maintenance("optimize", 0, started)
+
+    def _optimize(self) -> None:
+        with self._pool.connection() as connection:
+            connection.execute("PRAGMA optimize")
+
+    async def enable_incremental_vacuum(self) -> Optional[MaintenanceRunStats]:
+        """Переводит базу в auto_vacuum=INCREMENTAL полным VACUUM; None — уже переведена."""
+        started = time.perf_counter()
+        with_vacuum = await self._run(self._enable_incremental_vacuum)
+        if not with_vacuum:
+            return None
+        return self._record_maintenance("vacuum", 0, started)
+
+    def _enable_incremental_vacuum(self) -> bool:
+        with self._pool.connection() as connection:
+            return self._set_incremental_auto_vacuum(connection)
+
+    def _set_incremental_auto_vacuum(self, connection: Connection) -> bool:
+        if connection.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return False
+        # Режим auto_vacuum меняется только полным VACUUM, а он не работает внутри транзакции
+        connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        connection.execute("VACUUM")
+        logger.warning(f"База переведена в auto_vacuum=INCREMENTAL: {self.db_path}")
+        return True
+
+    async def flush(self) -> None:
+        """Дописывает очередь группового коммита (при выключении приложения)."""
+        if self._write_behind:
+            await self._write_behind.close()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self._pool.close()
 
     def _init_db(self) -> None:
-        connection: Connection = self._get_connection()
+        with self._pool.connection() as connection:
+            self._init_tables(connection)
+
+            # Новую базу переводим в auto_vacuum=INCREMENTAL сразу, большую — обслуживание вне рабочих часов
+            try:
+                if connection.execute("PRAGMA page_count").fetchone()[0] <= _VACUUM_ON_INIT_MAX_PAGES:
+                    self._set_incremental_auto_vacuum(connection)
+            except Exception as e:
+                logger.error(f"Ошибка включения incremental auto_vacuum: {e}")
+
+    def _init_tables(self, connection: Connection) -> None:
         cursor: Cursor = connection.cursor()
 
         try:
@@ -63,7 +393,7 @@ class DbManager:
                 )
             ''')
 
-            for chat in CHATS_DEFAULT:
+            for chat in self.default_chats:
                 cursor.execute(f"SELECT 1 FROM {self.TABLE_CHATS} WHERE chat_id=?", (chat.id,))
                 if not cursor.fetchone():
                     cursor.execute(
@@ -72,276 +402,935 @@ class DbManager:
                     )
 
             connection.commit()
-            logger.info(f"Basis initialized: {self.db_path}")
         except Exception as e:
             logger.error(f"DB initialization error: {e}")
-        finally:
-            connection.close()
 
-    async def add_message(self, message: Message) -> Optional[Message]:
-        connection = self._get_connection()
-        cursor = connection.cursor()
+        # Ошибка миграции не глушится: без новой схемы все запросы упадут на "no such column"
+        version = apply_migrations(connection)
+        self._reserve_message_ids(connection)
+        logger.info(f"Basis initialized: {self.db_path}, schema version {version}")
+
+        for problem in self._check_query_plans(connection):
+            logger.warning(f"Медленный план запроса: {problem}")
+
+    def _reserve_message_ids(self, connection: Connection) -> None:
+        # AUTOINCREMENT продолжает sqlite_sequence — достаточно поднять её до нижней границы диапазона
+        if self.message_id_base <= 0:
+            return
 
+        connection.execute("BEGIN IMMEDIATE")
         try:
-            # Проверка наличия обязательных полей
+            if connection.execute(
+                    f"SELECT 1 FROM {self.TABLE_MESSAGES} WHERE id < ? LIMIT 1", (self.message_id_base,)
+            ).fetchone():
+                raise RuntimeError(
+                    f"В {self.db_path} есть сообщения с id меньше {self.message_id_base}: "
+                    f"они пересекаются с id других шардов"
+                )
+            self._raise_message_sequence(connection, self.message_id_base)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+
+    def _raise_message_sequence(self, connection: Connection, floor: int) -> None:
+        """Следующий id сообщения будет больше floor (в уже открытой транзакции)."""
+        row = connection.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = ?", (self.TABLE_MESSAGES,)
+        ).fetchone()
+        if row is None:
+            connection.execute(
+                "INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (self.TABLE_MESSAGES, floor)
+            )
+        elif row[0] < floor:
+            connection.execute(
+                "UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (floor, self.TABLE_MESSAGES)
+            )
+
+    async def add_message(self, message: Message) -> Optional[Message]:
+        if self._write_behind:
+            # Проверяем заранее, чтобы невалидное сообщение не откатывало чужую пачку
             if not all([message.chat_id, message.session_id]):
                 raise ValueError("Обязательные поля отсутствуют: chat_id или session_id")
-            
-            cursor.execute(
-                f'''
-                INSERT INTO {self.TABLE_MESSAGES} 
-                (chat_id, session_id, message_type, agent_id, name, timestamp, message, prompt_tokens,completion_tokens,request_time,price,meta)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                    message.chat_id,
-                    message.session_id,
-                    message.message_type.value,
-                    message.agent_id,
-                    message.name,
-                    message.timestamp,
-                    message.message,
-                    message.prompt_tokens,
-                    message.completion_tokens,
-                    message.request_time,
-                    message.price,
-                    message.meta,
-                ))
-            connection.commit()
-            message_id = cursor.lastrowid
+            # Кэш истории дополняет _write_batch — там известны версии чатов после коммита пачки
+            message_with_id: Optional[Message] = await self._write_behind.submit(message)
+        else:
+            message_with_id, history_version = await self._run(self._add_message, message)
+            if message_with_id:
+                self._history_cache.append(message_with_id.chat_id, [message_with_id], history_version)
+        return message_with_id
 
-            message_with_id = message.model_copy(update={"id": message_id})
+    def _add_message(self, message: Message) -> Tuple[Optional[Message], Optional[int]]:
+        with self._pool.connection() as connection:
+            cursor = connection.cursor()
 
-            logger.info(f"Message added: ID={message_with_id.id}, chat={message_with_id.chat_id}")
-            return message_with_id
-        except Exception as e:
-            logger.error(f"DB insert error: {e}")
-            raise
-        finally:
-            connection.close()
+            try:
+                message_id = self._insert_message(cursor, message)
+                history_version = self._history_version(cursor, message.chat_id)
+                connection.commit()
+
+                message_with_id = message.model_copy(update={"id": message_id})
+
+                logger.info(f"Message added: ID={message_with_id.id}, chat={message_with_id.chat_id}")
+                return message_with_id, history_version
+            except Exception as e:
+                logger.error(f"DB insert error: {e}")
+                raise
+
+    async def add_messages(self, messages: List[Message]) -> List[Message]:
+        """Вставляет сообщения одной транзакцией (один коммит) и возвращает их с присвоенными id."""
+        return await self._write_batch(messages)
+
+    async def _write_batch(self, messages: List[Message]) -> List[Message]:
+        messages_with_id, history_versions = await self._run(self._add_messages, messages)
+        for chat_id, history_version in history_versions.items():
+            self._history_cache.append(
+                chat_id, [m for m in messages_with_id if m.chat_id == chat_id], history_version
+            )
+        return messages_with_id
+
+    def _add_messages(self, messages: List[Message]) -> Tuple[List[Message], Dict[str, Optional[int]]]:
+        with self._pool.connection() as connection:
+            cursor = connection.cursor()
+
+            try:
+                messages_with_id = self._insert_messages(cursor, messages)
+                history_versions = {
+                    chat_id: self._history_version(cursor, chat_id)
+                    for chat_id in dict.fromkeys(message.chat_id for message in messages_with_id)
+                }
+                connection.commit()
+                logger.info(f"{len(messages_with_id)} messages added in one transaction")
+                return messages_with_id, history_versions
+            except Exception as e:
+                logger.error(f"DB bulk insert error: {e}")
+                raise
+
+    def _history_version(self, cursor: Cursor, chat_id: str) -> Optional[int]:
+        # Растёт триггерами на messages и при смене эпохи; None — чата нет в chats
+        row = cursor.execute(
+            f"SELECT history_version FROM {self.TABLE_CHATS} WHERE chat_id = ?", (chat_id,)
+        ).fetchone()
+        return int(row[0]) if row else None
+
+    def _get_history_version(self, chat_id: str) -> Optional[int]:
+        with self._pool.connection() as connection:
+            return self._history_version(connection.cursor(), chat_id)
+
+    async def replace_chat_history(
+            self,
+            chat_id: str,
+            messages: List[Message],
+            system_prompt: Optional[str] = None,
+            archive: bool = True,
+    ) -> List[Message]:
+        """
+        Атомарно заменяет историю чата: переносит старые сообщения в архив (или удаляет при archive=False),
+        обновляет системный промпт (если передан) и вставляет новые — всё одним коммитом.
+        """
+        messages_with_id, history_version = await self._run(
+            self._replace_chat_history, chat_id, messages, system_prompt, archive
+        )
+        self._history_cache.replace(chat_id, messages_with_id, history_version)
+        if system_prompt is not None:
+            self._chat_cache.invalidate()
+        return messages_with_id
+
+    def _replace_chat_history(
+            self,
+            chat_id: str,
+            messages: List[Message],
+            system_prompt: Optional[str] = None,
+            archive: bool = True,
+    ) -> Tuple[List[Message], Optional[int]]:
+        with self._pool.connection() as connection:
+            cursor = connection.cursor()
+
+            try:
+                if archive:
+                    self._archive_chat_messages(cursor, chat_id)
+                self._start_new_epoch(cursor, chat_id)
+                if system_prompt is not None:
+                    cursor.execute(
+                        f"UPDATE {self.TABLE_CHATS} SET system_prompt = ? WHERE chat_id = ?",
+                        (system_prompt, chat_id)
+                    )
+                messages_with_id = self._insert_messages(cursor, messages)
+                history_version = self._history_version(cursor, chat_id)
+                connection.commit()
+                logger.info(f"History replaced for chat {chat_id}: {len(messages_with_id)} messages")
+                return messages_with_id, history_version
+            except Exception as e:
+                logger.error(f"Error replacing chat history: {e}")
+                raise
+
+    def _archive_chat_messages(self, cursor: Cursor, chat_id: str) -> int:
+        # Один INSERT ... SELECT: текст сжимается внутри SQLite, строки не проходят через Python
+        cursor.execute(
+            f'''
+            INSERT INTO {self.TABLE_MESSAGES_ARCHIVE}
+            ({ARCHIVE_COLUMNS}, created_at)
+            SELECT id, chat_id, session_id, message_type, agent_id, name, timestamp, zlib_compress(message),
+                   prompt_tokens, completion_tokens, request_time, price, zlib_compress(meta), created_at
+            FROM {self.TABLE_MESSAGES}
+            WHERE chat_id = ? AND epoch = {CHAT_EPOCH_SQL}
+            ORDER BY id
+            ''',
+            (chat_id, chat_id)
+        )
+        logger.info(f"Archived {cursor.rowcount} messages of chat {chat_id}")
+        return cursor.rowcount
+
+    async def get_archived_messages(
+            self,
+            chat_id: str,
+            limit: int = 50,
+            before_id: Optional[int] = None,
+    ) -> List[Message]:
+        """Страница архива чата: до limit сообщений старше before_id (или самые новые), по возрастанию id."""
+        return await self._run(self._get_archived_messages, chat_id, limit, before_id)
+
+    def _get_archived_messages(
+            self,
+            chat_id: str,
+            limit: int = 50,
+            before_id: Optional[int] = None,
+    ) -> List[Message]:
+        query = f"SELECT {ARCHIVE_COLUMNS} FROM {self.TABLE_MESSAGES_ARCHIVE} WHERE chat_id = ?"
+        params: list = [chat_id]
+        if before_id is not None:
+            query += " AND message_id < ?"
+            params.append(before_id)
+        query += " ORDER BY message_id DESC LIMIT ?"
+        params.append(limit)
+
+        with self._pool.connection() as connection:
+            try:
+                rows = connection.execute(query, params).fetchall()
+            except Exception as e:
+                logger.error(f"Archive retrieval error: {e}")
+                raise
+
+        messages: List[Message] = []
+        for row in reversed(rows):
+            message = _row_to_message(row)
+            message.message = _zlib_decompress(row[7])
+            message.meta = _zlib_decompress(row[12])
+            messages.append(message)
+        return messages
+
+    def _insert_messages(self, cursor: Cursor, messages: List[Message]) -> List[Message]:
+        # executemany не возвращает lastrowid для каждой строки, а коммит всё равно один на всю пачку
+        return [
+            message.model_copy(update={"id": self._insert_message(cursor, message)})
+            for message in messages
+        ]
+
+    def _insert_message(self, cursor: Cursor, message: Message) -> Optional[int]:
+        # Проверка наличия обязательных полей
+        if not all([message.chat_id, message.session_id]):
+            raise ValueError("Обязательные поля отсутствуют: chat_id или session_id")
+
+        cursor.execute(
+            f'''
+            INSERT INTO {self.TABLE_MESSAGES} 
+            (chat_id, session_id, message_type, agent_id, name, timestamp, message, prompt_tokens,completion_tokens,request_time,price,meta,epoch)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {CHAT_EPOCH_SQL})
+        ''', (
+                message.chat_id,
+                message.session_id,
+                message.message_type.value,
+                message.agent_id,
+                message.name,
+                message.timestamp,
+                message.message,
+                message.prompt_tokens,
+                message.completion_tokens,
+                message.request_time,
+                message.price,
+                message.meta,
+                message.chat_id,
+            ))
+        return cursor.lastrowid
 
     async def get_messages(
             self,
             chat_id: str,
             session_id: Optional[str] = None,
-            limit: Optional[int] = None
+            limit: Optional[int] = None,
+            before_id: Optional[int] = None,
+            after_id: Optional[int] = None,
+            latest: bool = False,
     ) -> List[Message]:
-        connection: Connection = self._get_connection()
-        cursor: Cursor = connection.cursor()
+        """
+        Сообщения чата по возрастанию id.
 
-        try:
-            query: str = f'SELECT * FROM {self.TABLE_MESSAGES}'
-            params: list = []
-
-            conditions = []
-            if chat_id:
-                conditions.append("chat_id = ?")
-                params.append(chat_id)
-
-            if session_id:
-                conditions.append("session_id = ?")
-                params.append(session_id)
-
-            if len(conditions) > 0:
-                query += " WHERE " + " AND ".join(conditions)
-
-            query += ' ORDER BY created_at ASC'
-
-            if limit:
-                query += ' LIMIT ?'
-                params.append(limit)
-
-            cursor.execute(query, params)
-            rows: list = cursor.fetchall()
-
-            messages = [
-                Message(
-                    id=row['id'],
-                    chat_id=row['chat_id'],
-                    session_id=row['session_id'],
-                    message_type=MessageType(row['message_type']),
-                    agent_id=row['agent_id'],
-                    name=row['name'],
-                    timestamp=row['timestamp'],
-                    message=row['message'],
-                    prompt_tokens=row['prompt_tokens'],
-                    completion_tokens=row['completion_tokens'],
-                    request_time=row['request_time'],
-                    price=row['price'],
-                    meta=row['meta'],
-                )
-                for row in rows
-            ]
+        Без курсора и latest — с начала истории (limit ограничивает самые старые).
+        after_id — страница после указанного id; before_id или latest=True — последние limit
+        сообщений перед курсором (или в конце истории), тоже по возрастанию id.
+        """
+        # Кэш хранит полную историю чата без фильтра по сессии
+        if not chat_id or session_id or not self._history_cache.enabled:
+            return await self._run(self._get_messages, chat_id, session_id, limit, before_id, after_id, latest)
 
-            logger.info(f"{len(messages)} messages retrieved.")
-            return messages
-        except Exception as e:
-            logger.error(f"DB retrieval error: {e}")
-            raise
-        finally:
-            connection.close()
+        if self._history_cache.needs_check(chat_id):
+            # Чат мог изменить другой воркер: раз в check_interval сверяем версию истории с базой.
+            # Между проверками запись другого процесса видна здесь с задержкой до check_interval
+            self._history_cache.revalidate(chat_id, await self._run(self._get_history_version, chat_id))
+        cached = self._history_cache.get(chat_id, limit, before_id, after_id, latest)
+        if cached is not None:
+            return cached
+
+        if limit or before_id is not None or after_id is not None:
+            return await self._run(self._get_messages, chat_id, session_id, limit, before_id, after_id, latest)
+
+        version = self._history_cache.version(chat_id)
+        history_version, messages = await self._run(self._get_history, chat_id)
+        self._history_cache.put(chat_id, messages, version, history_version)
+        return list(messages)
+
+    def _get_history(self, chat_id: str) -> Tuple[Optional[int], List[Message]]:
+        # Версия читается до строк: коммит между ними только сделает запись кэша устаревшей
+        history_version = self._get_history_version(chat_id)
+        return history_version, self._get_messages(chat_id)
+
+    def _get_messages(
+            self,
+            chat_id: str,
+            session_id: Optional[str] = None,
+            limit: Optional[int] = None,
+            before_id: Optional[int] = None,
+            after_id: Optional[int] = None,
+            latest: bool = False,
+    ) -> List[Message]:
+        with self._pool.connection() as connection:
+            cursor: Cursor = connection.cursor()
+
+            try:
+                query, params = self._build_messages_query(chat_id, session_id, limit, before_id, after_id, latest)
+                cursor.execute(query, params)
+                rows: list = cursor.fetchall()
+
+                if before_id is not None or latest:
+                    rows.reverse()
+
+                messages = [_row_to_message(row) for row in rows]
+
+                logger.info(f"{len(messages)} messages retrieved.")
+                return messages
+            except Exception as e:
+                logger.error(f"DB retrieval error: {e}")
+                raise
+
+    async def iter_messages(
+            self,
+            chat_id: str,
+            session_id: Optional[str] = None,
+            batch_size: int = 1000,
+            after_id: Optional[int] = None,
+    ) -> AsyncIterator[Message]:
+        """
+        Потоково отдаёт историю чата по возрастанию id, читая её страницами по batch_size.
+        В памяти одновременно держится только одна страница.
+        """
+        cursor_id = after_id
+        while True:
+            page: List[Message] = await self._run(
+                self._get_messages, chat_id, session_id, batch_size, None, cursor_id, False
+            )
+            for message in page:
+                yield message
+            if len(page) < batch_size:
+                return
+            cursor_id = page[-1].id
+
+    def _build_messages_query(
+            self,
+            chat_id: str,
+            session_id: Optional[str] = None,
+            limit: Optional[int] = None,
+            before_id: Optional[int] = None,
+            after_id: Optional[int] = None,
+            latest: bool = False,
+    ) -> Tuple[str, list]:
+        query: str = f'SELECT {MESSAGE_COLUMNS} FROM {self.TABLE_MESSAGES}'
+        params: list = []
+
+        conditions = []
+        if chat_id:
+            conditions.append(f"chat_id = ? AND epoch = {CHAT_EPOCH_SQL}")
+            params.extend([chat_id, chat_id])
+        else:
+            conditions.append(
+                f"epoch = COALESCE((SELECT history_epoch FROM {self.TABLE_CHATS} c "
+                f"WHERE c.chat_id = {self.TABLE_MESSAGES}.chat_id), 0)"
+            )
+
+        if session_id:
+            conditions.append("session_id = ?")
+            params.append(session_id)
+
+        if before_id is not None:
+            conditions.append("id < ?")
+            params.append(before_id)
+
+        if after_id is not None:
+            conditions.append("id > ?")
+            params.append(after_id)
+
+        if len(conditions) > 0:
+            query += " WHERE " + " AND ".join(conditions)
+
+        # id монотонен и входит в индексы (chat_id, epoch, id) / (chat_id, epoch, session_id, id) — сортировка не нужна.
+        # Страница "назад" читается с конца индекса и разворачивается в _get_messages
+        if before_id is not None or latest:
+            query += ' ORDER BY id DESC'
+        else:
+            query += ' ORDER BY id ASC'
+
+        if limit:
+            query += ' LIMIT ?'
+            params.append(limit)
+
+        return query, params
+
+    def _check_query_plans(self, connection: Connection) -> List[str]:
+        """Проверяет через EXPLAIN QUERY PLAN, что горячие запросы идут по индексу без временного B-дерева."""
+        hot_queries = [
+            self._build_messages_query(chat_id="plan"),
+            self._build_messages_query(chat_id="plan", session_id="plan"),
+            self._build_messages_query(chat_id="plan", limit=1),
+            self._build_messages_query(chat_id="plan", limit=1, latest=True),
+            self._build_messages_query(chat_id="plan", limit=1, before_id=1),
+            self._build_messages_query(chat_id="plan", limit=1, after_id=1),
+            self._build_messages_query(chat_id="plan", session_id="plan", limit=1, before_id=1),
+        ]
+
+        problems: List[str] = []
+        for query, params in hot_queries:
+            plan = [row["detail"] for row in connection.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+            for detail in plan:
+                if "TEMP B-TREE" in detail or (detail.startswith("SCAN") and "USING" not in detail):
+                    problems.append(f"{query} -> {detail}")
+        return problems
+
+    def check_query_plans(self) -> List[str]:
+        with self._pool.connection() as connection:
+            return self._check_query_plans(connection)
+
+    async def search_messages(
+            self,
+            query: str,
+            chat_id: Optional[str] = None,
+            limit: int = 20,
+            cursor: Optional[int] = None,
+            newest_first: bool = False,
+    ) -> SearchResultList:
+        """
+        Полнотекстовый поиск по истории по убыванию релевантности; cursor — смещение в выдаче из next_cursor.
+
+        newest_first — по убыванию id сообщения, cursor — id, старше которого продолжать.
+        """
+        return await self._run(self._search_messages, query, chat_id, limit, cursor, newest_first)
+
+    def _search_messages(
+            self,
+            query: str,
+            chat_id: Optional[str] = None,
+            limit: int = 20,
+            cursor: Optional[int] = None,
+            newest_first: bool = False,
+    ) -> SearchResultList:
+        match = self._build_fts_query(query)
+        if not match:
+            return SearchResultList(results=[])
+
+        offset = 0 if newest_first else cursor or 0
+        sql = f'''
+            SELECT m.id, m.chat_id, m.session_id, m.message_type, m.name, m.timestamp,
+                   snippet({self.TABLE_MESSAGES_FTS}, 0, '[', ']', '…', 16) AS snippet,
+                   bm25({self.TABLE_MESSAGES_FTS}) AS rank
+            FROM {self.TABLE_MESSAGES_FTS}
+            JOIN {self.TABLE_MESSAGES} m ON m.id = {self.TABLE_MESSAGES_FTS}.rowid
+            WHERE {self.TABLE_MESSAGES_FTS} MATCH ?
+              AND m.epoch = COALESCE((SELECT history_epoch FROM {self.TABLE_CHATS} c WHERE c.chat_id = m.chat_id), 0)
+        '''
+        params: list = [match]
+        if chat_id:
+            sql += " AND m.chat_id = ?"
+            params.append(chat_id)
+        if newest_first and cursor is not None:
+            sql += f" AND {self.TABLE_MESSAGES_FTS}.rowid < ?"
+            params.append(cursor)
+        # Лишняя строка показывает, есть ли следующая страница
+        sql += f" ORDER BY {self.TABLE_MESSAGES_FTS}.rowid DESC" if newest_first else " ORDER BY rank"
+        sql += " LIMIT ? OFFSET ?"
+        params.extend([limit + 1, offset])
+
+        with self._pool.connection() as connection:
+            try:
+                rows = connection.execute(sql, params).fetchall()
+            except Exception as e:
+                logger.error(f"Search error: {e}")
+                raise
+
+        results = [
+            SearchResult(
+                message_id=row["id"],
+                chat_id=row["chat_id"],
+                session_id=row["session_id"],
+                message_type=MessageType(row["message_type"]),
+                name=row["name"],
+                timestamp=row["timestamp"],
+                snippet=row["snippet"],
+                rank=row["rank"],
+            )
+            for row in rows[:limit]
+        ]
+        next_cursor: Optional[int] = None
+        if len(rows) > limit:
+            next_cursor = results[-1].message_id if newest_first else offset + limit
+        return SearchResultList(results=results, next_cursor=next_cursor)
+
+    @staticmethod
+    def _build_fts_query(query: str) -> str:
+        # Каждое слово — отдельная фраза в кавычках: пользовательский ввод не ломает синтаксис MATCH,
+        # слова объединяются через неявный AND
+        terms = [term.replace('"', '""') for term in query.split()]
+        return " ".join(f'"{term}"' for term in terms if term)
+
+    async def get_usage(self, chat_id: str, day: Optional[date] = None) -> ChatUsage:
+        """Расход чата за день (UTC) или за всё время — одно чтение по первичному ключу."""
+        return await self._run(self._get_usage, chat_id, day)
+
+    def _get_usage(self, chat_id: str, day: Optional[date] = None) -> ChatUsage:
+        columns = "messages, prompt_tokens, completion_tokens, request_time, price"
+        with self._pool.connection() as connection:
+            try:
+                if day is None:
+                    row = connection.execute(
+                        f"SELECT {columns} FROM {self.TABLE_USAGE_TOTALS} WHERE chat_id = ?",
+                        (chat_id,)
+                    ).fetchone()
+                else:
+                    row = connection.execute(
+                        f"SELECT {columns} FROM {self.TABLE_USAGE_DAILY} WHERE chat_id = ? AND day = ?",
+                        (chat_id, day.isoformat())
+                    ).fetchone()
+            except Exception as e:
+                logger.error(f"Error fetching usage: {e}")
+                raise
+
+        if not row:
+            return ChatUsage(
+                chat_id=chat_id, day=day, messages=0, prompt_tokens=0, completion_tokens=0, request_time=0, price=0
+            )
+        return ChatUsage(
+            chat_id=chat_id,
+            day=day,
+            messages=row["messages"],
+            prompt_tokens=row["prompt_tokens"],
+            completion_tokens=row["completion_tokens"],
+            request_time=row["request_time"],
+            price=row["price"],
+        )
 
     async def clear_messages(self, chat_id: str) -> None:
-        connection = self._get_connection()
-        cursor = connection.cursor()
+        await self._run(self._clear_messages, chat_id)
+        self._history_cache.invalidate(chat_id)
 
-        try:
+    def _clear_messages(self, chat_id: str) -> None:
+        with self._pool.connection() as connection:
+            cursor = connection.cursor()
+
+            try:
+                self._start_new_epoch(cursor, chat_id)
+                connection.commit()
+                logger.info(f"Messaging history cleared for chat: {chat_id}")
+            except Exception as e:
+                logger.error(f"Clear DB error: {e}")
+                raise
+
+    def _start_new_epoch(self, cursor: Cursor, chat_id: str) -> None:
+        # Очистка за O(1): старые сообщения становятся невидимы, удаляет их reclaim_stale_messages
+        cursor.execute(
+            f"UPDATE {self.TABLE_CHATS} SET history_epoch = history_epoch + 1, "
+            f"history_version = history_version + 1 WHERE chat_id = ?",
+            (chat_id,)
+        )
+        if cursor.rowcount == 0:
+            # Чата нет в chats — эпоху хранить негде, удаляем сразу
             cursor.execute(f"DELETE FROM {self.TABLE_MESSAGES} WHERE chat_id = ?", (chat_id,))
-            connection.commit()
-            logger.info(f"Messaging history cleared for chat: {chat_id}")
-        except Exception as e:
-            logger.error(f"Clear DB error: {e}")
-            raise
-        finally:
-            connection.close()
+
+    async def reclaim_stale_messages(self, batch_size: int, max_batches: int) -> ReclaimStats:
+        """Удаляет сообщения устаревших эпох пачками по batch_size, каждая пачка — отдельная короткая транзакция."""
+        started = time.perf_counter()
+        reclaimed = 0
+        batches = 0
+        finished = False
+        while batches < max_batches:
+            deleted = await self._run(self._reclaim_stale_batch, batch_size)
+            batches += 1
+            reclaimed += deleted
+            if deleted < batch_size:
+                finished = True
+                break
+            # Между пачками отдаём блокировку записи и потоки пула обычным запросам
+            await asyncio.sleep(0.01)
+
+        self._total_reclaimed += reclaimed
+        self._last_reclaim = ReclaimStats(
+            reclaimed=reclaimed,
+            batches=batches,
+            finished=finished,
+            duration_ms=(time.perf_counter() - started) * 1000,
+            total_reclaimed=self._total_reclaimed,
+            finished_at=datetime.now(timezone.utc).isoformat(),
+        )
+        if reclaimed:
+            logger.info(f"Удалено {reclaimed} сообщений устаревших эпох за {batches} пачек")
+        return self._last_reclaim
+
+    def _reclaim_stale_batch(self, batch_size: int) -> int:
+        with self._pool.connection() as connection:
+            try:
+                cursor = connection.execute(
+                    f'''
+                    DELETE FROM {self.TABLE_MESSAGES} WHERE id IN (
+                        SELECT m.id
+                        FROM {self.TABLE_CHATS} c
+                        JOIN {self.TABLE_MESSAGES} m ON m.chat_id = c.chat_id AND m.epoch < c.history_epoch
+                        LIMIT ?
+                    )
+                    ''',
+                    (batch_size,)
+                )
+                connection.commit()
+                return cursor.rowcount
+            except Exception as e:
+                logger.error(f"Reclaim error: {e}")
+                raise
 
     async def clear_all_table_messages(self) -> None:
-        connection: Connection = self._get_connection()
-        cursor: Cursor = connection.cursor()
+        await self._run(self._clear_all_table_messages)
+        self._history_cache.clear()
 
-        try:
-            cursor.execute(f'DELETE FROM {self.TABLE_MESSAGES}')
-            connection.commit()
-            logger.warning(f"Таблица {self.TABLE_MESSAGES} полностью очищена")
-        except Exception as e:
-            logger.error(f"Ошибка очистки БД: {e}")
-            raise
-        finally:
-            connection.close()
+    def _clear_all_table_messages(self) -> None:
+        with self._pool.connection() as connection:
+            cursor: Cursor = connection.cursor()
 
-    async def add_chat(self, chat: Chat) -> Optional[str]:
-        connection = self._get_connection()
-        cursor = connection.cursor()
+            try:
+                cursor.execute(f'DELETE FROM {self.TABLE_MESSAGES}')
+                connection.commit()
+                logger.warning(f"Таблица {self.TABLE_MESSAGES} полностью очищена")
+            except Exception as e:
+                logger.error(f"Ошибка очистки БД: {e}")
+                raise
 
+    async def add_chat(self, chat: Chat) -> Optional[str]:
         try:
-            cursor.execute(
-                "INSERT INTO chats (chat_id, name, system_prompt) VALUES (?, ?, ?)",
-                (chat.id, chat.name, chat.system_prompt)
-            )
-            connection.commit()
-            return chat.id
-        except Exception as e:
-            logger.error(f"Error adding chat: {e}")
-            raise
+            return await self._run(self._add_chat, chat)
         finally:
-            connection.close()
+            self._chat_cache.invalidate()
+
+    def _add_chat(self, chat: Chat) -> Optional[str]:
+        with self._pool.connection() as connection:
+            cursor = connection.cursor()
+
+            try:
+                cursor.execute(
+                    "INSERT INTO chats (chat_id, name, system_prompt) VALUES (?, ?, ?)",
+                    (chat.id, chat.name, chat.system_prompt)
+                )
+                connection.commit()
+                return chat.id
+            except Exception as e:
+                logger.error(f"Error adding chat: {e}")
+                raise
 
     async def recreate_table_messages(self) -> None:
-        connection: Connection = self._get_connection()
-        cursor: Cursor = connection.cursor()
+        await self._run(self._recreate_table_messages)
+        self._history_cache.clear()
 
-        try:
-            cursor.execute(f'DROP TABLE IF EXISTS {self.TABLE_MESSAGES}')
-            connection.commit()
-            logger.warning("Таблица удалена")
+    def _recreate_table_messages(self) -> None:
+        with self._pool.connection() as connection:
+            cursor: Cursor = connection.cursor()
 
-            self._init_db()
-            logger.info("Таблица пересоздана")
-        except Exception as e:
-            logger.error(f"Ошибка пересоздания таблицы: {e}")
-            raise
-        finally:
-            connection.close()
+            try:
+                cursor.execute(f'DROP TABLE IF EXISTS {self.TABLE_MESSAGES}')
+                # Индексы удалены вместе с таблицей — миграции нужно прогнать заново
+                set_schema_version(connection, 0)
+                connection.commit()
+                logger.warning("Таблица удалена")
 
-    async def update_chat_system_prompt(self, chat_id: str, system_prompt: str) -> Optional[Chat]:
-        connection = self._get_connection()
-        cursor = connection.cursor()
+                self._init_tables(connection)
 
+                # Новая таблица начинает id заново: не выдаём id, которые уже хранятся в архиве
+                connection.execute("BEGIN IMMEDIATE")
+                archived_max = connection.execute(
+                    f"SELECT MAX(message_id) FROM {self.TABLE_MESSAGES_ARCHIVE}"
+                ).fetchone()[0]
+                self._raise_message_sequence(connection, archived_max or 0)
+                connection.commit()
+                logger.info("Таблица пересоздана")
+            except Exception as e:
+                logger.error(f"Ошибка пересоздания таблицы: {e}")
+                raise
+
+    async def update_chat_system_prompt(self, chat_id: str, system_prompt: str) -> Optional[Chat]:
         try:
-            cursor.execute(
-                f"UPDATE {self.TABLE_CHATS} SET system_prompt = ? WHERE chat_id = ?",
-                (system_prompt, chat_id)
-            )
-            connection.commit()
+            return await self._run(self._update_chat_system_prompt, chat_id, system_prompt)
+        finally:
+            self._chat_cache.invalidate()
 
-            cursor.execute(f"SELECT * FROM {self.TABLE_CHATS} WHERE chat_id = ?", (chat_id,))
-            row = cursor.fetchone()
-            if row:
-                return Chat(
-                    id=row["chat_id"],
-                    name=row["name"],
-                    system_prompt=row["system_prompt"],
-                    created_at=row["created_at"]
+    def _update_chat_system_prompt(self, chat_id: str, system_prompt: str) -> Optional[Chat]:
+        with self._pool.connection() as connection:
+            cursor = connection.cursor()
+
+            try:
+                cursor.execute(
+                    f"UPDATE {self.TABLE_CHATS} SET system_prompt = ? WHERE chat_id = ?",
+                    (system_prompt, chat_id)
                 )
-            else:
+                connection.commit()
+
+                cursor.execute(f"SELECT * FROM {self.TABLE_CHATS} WHERE chat_id = ?", (chat_id,))
+                row = cursor.fetchone()
+                if row:
+                    return Chat(
+                        id=row["chat_id"],
+                        name=row["name"],
+                        system_prompt=row["system_prompt"],
+                        created_at=row["created_at"]
+                    )
+                else:
+                    return None
+            except Exception as e:
+                logger.error(f"Error updating chat system prompt: {e}")
                 return None
-        except Exception as e:
-            logger.error(f"Error updating chat system prompt: {e}")
-            return None
-        finally:
-            connection.close()
 
     async def get_chat_by_id(self, chat_id: str) -> Optional[Chat]:
-        connection = self._get_connection()
-        cursor = connection.cursor()
+        if not self._chat_cache.enabled:
+            return await self._run(self._get_chat_by_id, chat_id)
+        return (await self._load_chats()).get(chat_id)
 
-        try:
-            cursor.execute(f"SELECT * FROM {self.TABLE_CHATS} WHERE chat_id = ?", (chat_id,))
-            row = cursor.fetchone()
-            if row:
-                return Chat(
-                    id=row["chat_id"],
-                    name=row["name"],
-                    system_prompt=row["system_prompt"],
-                    created_at=row["created_at"]
-                )
-            else:
+    def _get_chat_by_id(self, chat_id: str) -> Optional[Chat]:
+        with self._pool.connection() as connection:
+            cursor = connection.cursor()
+
+            try:
+                cursor.execute(f"SELECT * FROM {self.TABLE_CHATS} WHERE chat_id = ?", (chat_id,))
+                row = cursor.fetchone()
+                if row:
+                    return Chat(
+                        id=row["chat_id"],
+                        name=row["name"],
+                        system_prompt=row["system_prompt"],
+                        created_at=row["created_at"]
+                    )
+                else:
+                    return None
+            except Exception as e:
+                logger.error(f"Error fetching chat by ID: {e}")
                 return None
-        except Exception as e:
-            logger.error(f"Error fetching chat by ID: {e}")
-            return None
-        finally:
-            connection.close()
 
     async def get_chats(self) -> List[Chat]:
-        connection = self._get_connection()
-        cursor = connection.cursor()
+        if not self._chat_cache.enabled:
+            return await self._run(self._get_chats)
+        return list((await self._load_chats()).values())
+
+    async def _load_chats(self) -> Dict[str, Chat]:
+        # Чатов единицы — при промахе читаем и кэшируем всю таблицу одним запросом
+        if self._chat_cache.needs_check():
+            # chats мог изменить другой воркер (например, системный промпт при суммаризации):
+            # раз в check_interval сверяем версию с базой, между проверками его изменения видны с задержкой
+            self._chat_cache.revalidate(await self._run(self._get_chats_version))
+        cached = self._chat_cache.get()
+        if cached is not None:
+            return cached
+
+        version = self._chat_cache.version
+        data_version, chats = await self._run(self._get_chats_with_version)
+        self._chat_cache.put(chats, version, data_version)
+        return {chat.id: chat for chat in chats}
 
+    def _get_chats_version(self) -> Optional[int]:
+        # Растёт триггерами на chats; None — таблицы версий нет (миграция не применена)
+        with self._pool.connection() as connection:
+            row = connection.execute("SELECT version FROM data_versions WHERE scope = 'chats'").fetchone()
+            return int(row[0]) if row else None
+
+    def _get_chats_with_version(self) -> Tuple[Optional[int], List[Chat]]:
+        # Версия читается до строк: коммит между ними только сделает кэш устаревшим
+        data_version = self._get_chats_version()
+        return data_version, self._get_chats()
+
+    def _get_chats(self) -> List[Chat]:
+        with self._pool.connection() as connection:
+            cursor = connection.cursor()
+
+            try:
+                cursor.execute(f"SELECT chat_id, name, system_prompt, created_at FROM {self.TABLE_CHATS}")
+                rows = cursor.fetchall()
+                return [Chat(id=row["chat_id"], name=row["name"], system_prompt=row["system_prompt"], created_at=row["created_at"]) for row in rows]
+            except Exception as e:
+                logger.error(f"Error getting chats: {e}")
+                raise
+
+    async def update_name_chat(self, chat_id: str, chat_name: Optional[str]) -> bool:
         try:
-            cursor.execute(f"SELECT chat_id, name, system_prompt, created_at FROM {self.TABLE_CHATS}")
-            rows = cursor.fetchall()
-            return [Chat(id=row["chat_id"], name=row["name"], system_prompt=row["system_prompt"], created_at=row["created_at"]) for row in rows]
-        except Exception as e:
-            logger.error(f"Error getting chats: {e}")
-            raise
+            return await self._run(self._update_name_chat, chat_id, chat_name)
         finally:
-            connection.close()
+            self._chat_cache.invalidate()
 
-    async def update_name_chat(self, chat_id: str, chat_name: Optional[str]) -> bool:
-        connection = self._get_connection()
-        cursor = connection.cursor()
+    def _update_name_chat(self, chat_id: str, chat_name: Optional[str]) -> bool:
+        with self._pool.connection() as connection:
+            cursor = connection.cursor()
 
-        try:
-            cursor.execute(
-                f"UPDATE {self.TABLE_CHATS} SET name = ? WHERE chat_id = ?",
-                (chat_name, chat_id)
+            try:
+                cursor.execute(
+                    f"UPDATE {self.TABLE_CHATS} SET name = ? WHERE chat_id = ?",
+                    (chat_name, chat_id)
+                )
+                connection.commit()
+                return True
+            except Exception as e:
+                logger.error(f"Error updating chat: {e}")
+                return False
+
+    def _move_chat_from(self, source: "DbManager", chat_id: str) -> None:
+        """
+        Переносит чат из другого файла базы одной транзакцией: строку chats, сообщения текущей эпохи,
+        архив и статистику использования; в source от чата ничего не остаётся.
+
+        Сообщения и архив получают новые id из диапазона этой базы в прежнем порядке и дописываются
+        после того, что у чата уже есть здесь; статистика суммируется.
+        """
+        with self._pool.connection() as connection:
+            connection.execute("ATTACH DATABASE ? AS source", (str(source.db_path),))
+            try:
+                # Транзакция охватывает оба файла. В WAL она атомарна в каждом из них, но не между ними:
+                # при сбое ОС посреди COMMIT чат может остаться в обоих файлах
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    self._copy_chat_from_source(connection, chat_id)
+                    for table in (self.TABLE_MESSAGES, self.TABLE_MESSAGES_ARCHIVE, self.TABLE_USAGE_DAILY,
+                                  self.TABLE_USAGE_TOTALS, self.TABLE_CHATS):
+                        connection.execute(f"DELETE FROM source.{table} WHERE chat_id = ?", (chat_id,))
+                    connection.commit()
+                except Exception:
+                    connection.rollback()
+                    raise
+            finally:
+                connection.execute("DETACH DATABASE source")
+
+        for manager in (self, source):
+            manager._chat_cache.invalidate()
+            manager._history_cache.invalidate(chat_id)
+
+    def _copy_chat_from_source(self, connection: Connection, chat_id: str) -> None:
+        connection.execute(
+            f"""
+            INSERT INTO main.{self.TABLE_CHATS} (chat_id, name, system_prompt, created_at)
+            SELECT chat_id, name, system_prompt, created_at FROM source.{self.TABLE_CHATS} WHERE chat_id = ?
+            ON CONFLICT (chat_id) DO UPDATE SET
+                name = COALESCE(excluded.name, name),
+                system_prompt = COALESCE(excluded.system_prompt, system_prompt)
+            """,
+            (chat_id,)
+        )
+
+        # id архива выдаём вручную из той же последовательности, что и id сообщений
+        last_id = max(
+            self.message_id_base,
+            connection.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM main.sqlite_sequence WHERE name = ?", (self.TABLE_MESSAGES,)
+            ).fetchone()[0],
+            connection.execute(
+                f"SELECT COALESCE(MAX(message_id), 0) FROM main.{self.TABLE_MESSAGES_ARCHIVE}"
+            ).fetchone()[0],
+        )
+        archived = connection.execute(
+            f"""
+            INSERT INTO main.{self.TABLE_MESSAGES_ARCHIVE} ({ARCHIVE_COLUMNS}, created_at, archived_at)
+            SELECT ? + ROW_NUMBER() OVER (ORDER BY message_id), chat_id, session_id, message_type, agent_id,
+                   name, timestamp, message, prompt_tokens, completion_tokens, request_time, price, meta,
+                   created_at, archived_at
+            FROM source.{self.TABLE_MESSAGES_ARCHIVE} WHERE chat_id = ?
+            ORDER BY message_id
+            """,
+            (last_id, chat_id)
+        ).rowcount
+        self._raise_message_sequence(connection, last_id + archived)
+
+        # Вставка сообщений начисляет usage триггером за сегодня: сохраняем статистику до неё
+        # и восстанавливаем после, прибавив статистику из source
+        usage = {
+            table: connection.execute(f"SELECT * FROM main.{table} WHERE chat_id = ?", (chat_id,)).fetchall()
+            for table in (self.TABLE_USAGE_DAILY, self.TABLE_USAGE_TOTALS)
+        }
+        connection.execute(
+            f"""
+            INSERT INTO main.{self.TABLE_MESSAGES}
+            (chat_id, session_id, message_type, agent_id, name, timestamp, message,
+             prompt_tokens, completion_tokens, request_time, price, meta, created_at, epoch)
+            SELECT chat_id, session_id, message_type, agent_id, name, timestamp, message,
+                   prompt_tokens, completion_tokens, request_time, price, meta, created_at,
+                   (SELECT history_epoch FROM main.{self.TABLE_CHATS} WHERE chat_id = ?)
+            FROM source.{self.TABLE_MESSAGES}
+            WHERE chat_id = ?
+              AND epoch = COALESCE((SELECT history_epoch FROM source.{self.TABLE_CHATS} WHERE chat_id = ?), 0)
+            ORDER BY id
+            """,
+            (chat_id, chat_id, chat_id)
+        )
+
+        counters = "messages, prompt_tokens, completion_tokens, request_time, price"
+        merge = ", ".join(f"{column} = {column} + excluded.{column}" for column in counters.split(", "))
+        for table, key in ((self.TABLE_USAGE_DAILY, "chat_id, day"), (self.TABLE_USAGE_TOTALS, "chat_id")):
+            connection.execute(f"DELETE FROM main.{table} WHERE chat_id = ?", (chat_id,))
+            for row in usage[table]:
+                connection.execute(
+                    f"INSERT INTO main.{table} ({', '.join(row.keys())}) VALUES ({', '.join('?' * len(row))})",
+                    tuple(row)
+                )
+            connection.execute(
+                f"""
+                INSERT INTO main.{table} ({key}, {counters})
+                SELECT {key}, {counters} FROM source.{table} WHERE chat_id = ?
+                ON CONFLICT ({key}) DO UPDATE SET {merge}
+                """,
+                (chat_id,)
             )
-            connection.commit()
-            return True
-        except Exception as e:
-            logger.error(f"Error updating chat: {e}")
-            return False
-        finally:
-            connection.close()
 
     async def remove_all_messages_chat(self, chat_id: str) -> bool:
-        connection = self._get_connection()
-        cursor = connection.cursor()
+        removed = await self._run(self._remove_all_messages_chat, chat_id)
+        self._history_cache.invalidate(chat_id)
+        return removed
 
-        try:
-            cursor.execute(f"DELETE FROM {self.TABLE_MESSAGES} WHERE chat_id = ?", (chat_id,))
-            connection.commit()
-            return True
-        except Exception as e:
-            logger.error(f"Error deleting messages chat: {e}")
-            return False
-        finally:
-            connection.close()
+    def _remove_all_messages_chat(self, chat_id: str) -> bool:
+        with self._pool.connection() as connection:
+            cursor = connection.cursor()
+
+            try:
+                self._start_new_epoch(cursor, chat_id)
+                connection.commit()
+                return True
+            except Exception as e:
+                logger.error(f"Error deleting messages chat: {e}")
+                return False
 
 
-_db_manager: Optional[DbManager] = None
+_db_manager: Optional[Union[DbManager, "ShardedDbManager"]] = None
 
-def get_db_manager() -> DbManager:
+def get_db_manager() -> Union[DbManager, "ShardedDbManager"]:
     global _db_manager
     if _db_manager is None:
-        _db_manager = DbManager()
+        from src.chat.core.configs import settings
+        # При DB_SHARDS=1 после работы с шардами их файлы нужно разобрать в app.db — это делает ShardedDbManager
+        if settings.DB_SHARDS > 1 or any(Path(settings.DB_DIR).glob("app.shard*.db")):
+            from src.chat.db.sharded_db_manager import ShardedDbManager
+            _db_manager = ShardedDbManager(shard_count=settings.DB_SHARDS)
+        else:
+            _db_manager = DbManager()
     return _db_manager
@@ -0,0 +1,212 @@
+"""
+LRU-кэш полной истории чатов с ограничением по числу чатов и по памяти.
+"""
+import bisect
+import logging
+import sys
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from src.chat.model.messages import Message
+from src.chat.model.stats import HistoryCacheStats
+
+logger = logging.getLogger(__name__)
+
+# Грубая оценка накладных расходов на объект Message и его поля
+_MESSAGE_OVERHEAD_BYTES = 600
+
+
+def estimate_message_size(message: Message) -> int:
+    return (
+        _MESSAGE_OVERHEAD_BYTES
+        + sys.getsizeof(message.message)
+        + sys.getsizeof(message.meta or "")
+        + sys.getsizeof(message.name)
+        + sys.getsizeof(message.timestamp)
+    )
+
+
+class _Entry:
+    __slots__ = ("messages", "ids", "size", "history_version", "checked_at")
+
+    def __init__(self, messages: List[Message], history_version: int) -> None:
+        self.messages: List[Message] = messages
+        self.history_version: int = history_version
+        # Когда history_version последний раз совпала с базой (time.monotonic)
+        self.checked_at: float = time.monotonic()
+        self.ids: List[int] = [message.id or 0 for message in messages]
+        self.size: int = sum(estimate_message_size(message) for message in messages)
+
+
+class HistoryCache:
+
+    def __init__(self, max_chats: int, max_bytes: int, check_interval: float = 0.0) -> None:
+        self.max_chats: int = max_chats
+        self.max_bytes: int = max_bytes
+        # Как часто сверять history_version записи с базой, с (0 — на каждом чтении)
+        self.check_interval: float = check_interval
+
+        # Без блокировок: кэш трогают только корутины DbManager в event loop, потоки executor — нет
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # Версия чата растёт при каждом изменении: заполнение из базы, начатое до изменения, отбрасывается
+        self._versions: Dict[str, int] = {}
+        self._bytes: int = 0
+
+        self._hits: int = 0
+        self._misses: int = 0
+        self._stale: int = 0
+        self._evictions: int = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_chats > 0 and self.max_bytes > 0
+
+    def version(self, chat_id: str) -> int:
+        return self._versions.get(chat_id, 0)
+
+    def _bump(self, chat_id: str) -> None:
+        self._versions[chat_id] = self._versions.get(chat_id, 0) + 1
+
+    def needs_check(self, chat_id: str) -> bool:
+        """Чат в кэше, и его версию пора сверить с базой."""
+        entry = self._entries.get(chat_id)
+        return entry is not None and time.monotonic() - entry.checked_at >= self.check_interval
+
+    def revalidate(self, chat_id: str, history_version: Optional[int]) -> None:
+        """history_version — текущая версия истории чата в базе; запись с другой версией устарела и удаляется."""
+        entry = self._entries.get(chat_id)
+        if entry is None:
+            return
+        if entry.history_version != history_version:
+            self._stale += 1
+            self._drop(chat_id)
+            return
+        entry.checked_at = time.monotonic()
+
+    def get(
+            self,
+            chat_id: str,
+            limit: Optional[int] = None,
+            before_id: Optional[int] = None,
+            after_id: Optional[int] = None,
+            latest: bool = False,
+    ) -> Optional[List[Message]]:
+        """Страница истории из кэша с той же семантикой, что у DbManager.get_messages; None — промах."""
+        entry = self._entries.get(chat_id)
+        if entry is None:
+            self._misses += 1
+            return None
+
+        self._entries.move_to_end(chat_id)
+        self._hits += 1
+
+        start = bisect.bisect_right(entry.ids, after_id) if after_id is not None else 0
+        end = bisect.bisect_left(entry.ids, before_id) if before_id is not None else len(entry.ids)
+
+        if limit:
+            if before_id is not None or latest:
+                start = max(start, end - limit)
+            else:
+                end = min(end, start + limit)
+
+        return entry.messages[start:end]
+
+    def put(self, chat_id: str, messages: List[Message], version: int, history_version: Optional[int]) -> None:
+        """
+        Кладёт полную историю, прочитанную из базы, если чат не менялся в этом процессе с начала чтения.
+
+        history_version читается до строк истории: если между ними был коммит, версия отстаёт
+        и запись просто перечитается при следующей проверке. None — чата нет в chats, не кэшируем.
+        """
+        if not self.enabled or self.version(chat_id) != version or history_version is None:
+            return
+        self._store(chat_id, _Entry(list(messages), history_version))
+
+    def replace(self, chat_id: str, messages: List[Message], history_version: Optional[int]) -> None:
+        """История чата целиком заменена и известна — кэшируем её без чтения из базы."""
+        self._bump(chat_id)
+        self._drop(chat_id)
+        if self.enabled and history_version is not None:
+            self._store(chat_id, _Entry(list(messages), history_version))
+
+    def append(self, chat_id: str, messages: List[Message], history_version: Optional[int]) -> None:
+        """
+        Дописывает сообщения, вставленные одной транзакцией; history_version — версия сразу после неё.
+
+        Каждая вставка увеличивает версию на 1, поэтому запись дополняется, только если до транзакции
+        её версия была history_version - len(messages). Иначе между ними писал другой процесс —
+        запись удаляется.
+        """
+        self._bump(chat_id)
+        entry = self._entries.get(chat_id)
+        if entry is None:
+            return
+
+        if history_version is None or entry.history_version not in (
+                history_version - len(messages), history_version):
+            self._stale += 1
+            self._drop(chat_id)
+            return
+        entry.history_version = history_version
+        entry.checked_at = time.monotonic()
+
+        for message in messages:
+            message_id = message.id or 0
+            position = bisect.bisect_right(entry.ids, message_id)
+            if position and entry.ids[position - 1] == message_id:
+                # Уже попало в кэш вместе с чтением истории, завершившимся после коммита вставки
+                continue
+            entry.ids.insert(position, message_id)
+            entry.messages.insert(position, message)
+            size = estimate_message_size(message)
+            entry.size += size
+            self._bytes += size
+
+        self._entries.move_to_end(chat_id)
+        self._evict()
+
+    def invalidate(self, chat_id: str) -> None:
+        self._bump(chat_id)
+        self._drop(chat_id)
+
+    def clear(self) -> None:
+        for chat_id in list(self._versions):
+            self._bump(chat_id)
+        self._entries.clear()
+        self._bytes = 0
+
+    def _store(self, chat_id: str, entry: _Entry) -> None:
+        if entry.size > self.max_bytes:
+            logger.info(f"История чата {chat_id} больше лимита кэша ({entry.size} байт), не кэшируем")
+            return
+        self._drop(chat_id)
+        self._entries[chat_id] = entry
+        self._bytes += entry.size
+        self._evict()
+
+    def _drop(self, chat_id: str) -> None:
+        entry = self._entries.pop(chat_id, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self.max_chats or self._bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self._evictions += 1
+
+    def stats(self) -> HistoryCacheStats:
+        requests = self._hits + self._misses
+        return HistoryCacheStats(
+            chats=len(self._entries),
+            max_chats=self.max_chats,
+            messages=sum(len(entry.messages) for entry in self._entries.values()),
+            bytes=self._bytes,
+            max_bytes=self.max_bytes,
+            hits=self._hits,
+            misses=self._misses,
+            hit_rate=self._hits / requests if requests else 0.0,
+            stale=self._stale,
+            evictions=self._evictions,
+        )
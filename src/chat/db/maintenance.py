@@ -0,0 +1,147 @@
+"""
+Фоновое обслуживание SQLite: периодический чекпоинт WAL, удаление сообщений устаревших эпох,
+сроки хранения, incremental_vacuum и PRAGMA optimize.
+
+Удаление по сроку хранения и vacuum держат блокировку записи, поэтому в рабочие часы не запускаются.
+В шардированном режиме каждая задача обходит все шарды по очереди.
+"""
+import logging
+from datetime import datetime
+from typing import List, Optional, Union
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+
+from src.chat.core.configs import settings
+from src.chat.db.db_manager import DbManager, get_db_manager
+from src.chat.db.sharded_db_manager import ShardedDbManager
+
+logger = logging.getLogger(__name__)
+
+
+class DbMaintenanceService:
+
+    def __init__(self, db_manager: Optional[Union[DbManager, ShardedDbManager]] = None) -> None:
+        self.db_manager: Union[DbManager, ShardedDbManager] = db_manager or get_db_manager()
+        self.scheduler: Optional[AsyncIOScheduler] = None
+
+    @property
+    def databases(self) -> List[DbManager]:
+        return self.db_manager.shards
+
+    async def start(self) -> None:
+        self.scheduler = AsyncIOScheduler()
+
+        if self.databases[0].profile.is_wal and settings.DB_WAL_CHECKPOINT_SECONDS > 0:
+            self.scheduler.add_job(
+                self._checkpoint_wal,
+                IntervalTrigger(seconds=settings.DB_WAL_CHECKPOINT_SECONDS),
+                id="db_wal_checkpoint",
+                name="фоновый чекпоинт WAL",
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+            )
+
+        if settings.DB_RECLAIM_SECONDS > 0:
+            self.scheduler.add_job(
+                self._reclaim_stale_messages,
+                IntervalTrigger(seconds=settings.DB_RECLAIM_SECONDS),
+                id="db_reclaim_stale_messages",
+                name="удаление очищенной истории",
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+            )
+
+        if settings.DB_MAINTENANCE_SECONDS > 0:
+            self.scheduler.add_job(
+                self._maintain,
+                IntervalTrigger(seconds=settings.DB_MAINTENANCE_SECONDS),
+                id="db_maintenance",
+                name="сроки хранения, incremental_vacuum, optimize",
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+            )
+
+        self.scheduler.start()
+        logger.info("✅ Обслуживание БД запущено")
+
+    async def shutdown(self) -> None:
+        if self.scheduler and self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+            logger.info("❌ Обслуживание БД остановлено")
+
+    async def _checkpoint_wal(self) -> None:
+        for db in self.databases:
+            # PASSIVE не блокирует читателей и писателей; если WAL разросся — TRUNCATE, чтобы вернуть место
+            mode = "TRUNCATE" if db.wal_size_bytes() > settings.DB_WAL_TRUNCATE_BYTES else "PASSIVE"
+            try:
+                await db.checkpoint_wal(mode)
+            except Exception as e:
+                logger.error(f"Ошибка чекпоинта WAL {db.db_path}: {e}")
+
+    async def _reclaim_stale_messages(self) -> None:
+        for db in self.databases:
+            # Удаляем только в простое: если база сейчас обслуживает запросы — ждём следующего запуска
+            if db.get_stats().pool.in_use > 0:
+                logger.info(f"База {db.db_path} занята, удаление очищенной истории отложено")
+                continue
+            try:
+                await db.reclaim_stale_messages(
+                    batch_size=settings.DB_RECLAIM_BATCH_SIZE,
+                    max_batches=settings.DB_RECLAIM_MAX_BATCHES,
+                )
+            except Exception as e:
+                logger.error(f"Ошибка удаления очищенной истории {db.db_path}: {e}")
+
+    @staticmethod
+    def is_business_hours(now: Optional[datetime] = None) -> bool:
+        start, end = settings.DB_BUSINESS_HOURS_START, settings.DB_BUSINESS_HOURS_END
+        if start == end:
+            return False
+        hour = (now or datetime.now()).hour
+        # Окно может переходить через полночь, например 22–6
+        return start <= hour < end if start < end else hour >= start or hour < end
+
+    async def _maintain(self) -> None:
+        business_hours = self.is_business_hours()
+        if business_hours:
+            logger.info("Рабочие часы: удаление по сроку хранения и vacuum отложены")
+
+        for db in self.databases:
+            try:
+                if not business_hours:
+                    await self._enforce_retention(db)
+                    await db.enable_incremental_vacuum()
+                    await db.incremental_vacuum(settings.DB_INCREMENTAL_VACUUM_PAGES)
+                # optimize дешёвый и почти никогда не пишет — запускаем всегда
+                await db.optimize()
+            except Exception as e:
+                logger.error(f"Ошибка обслуживания БД {db.db_path}: {e}")
+
+    @staticmethod
+    async def _enforce_retention(db: DbManager) -> None:
+        retention = [
+            (db.TABLE_MESSAGES, settings.DB_MESSAGES_RETENTION_DAYS),
+            (db.TABLE_MESSAGES_ARCHIVE, settings.DB_ARCHIVE_RETENTION_DAYS),
+        ]
+        for table, days in retention:
+            if days > 0:
+                await db.enforce_retention(
+                    table=table,
+                    days=days,
+                    batch_size=settings.DB_RETENTION_BATCH_SIZE,
+                    max_batches=settings.DB_RETENTION_MAX_BATCHES,
+                )
+
+
+_db_maintenance_service: Optional[DbMaintenanceService] = None
+
+
+def get_db_maintenance_service() -> DbMaintenanceService:
+    global _db_maintenance_service
+    if _db_maintenance_service is None:
+        _db_maintenance_service = DbMaintenanceService()
+    return _db_maintenance_service
@@ -0,0 +1,330 @@
+"""
+Версионированные миграции схемы SQLite.
+
+Номер применённой миграции хранится в PRAGMA user_version. Каждая миграция идемпотентна:
+recreate_table_messages сбрасывает версию и прогоняет миграции заново на пересозданной таблице.
+"""
+import logging
+from sqlite3 import Connection
+from typing import Callable, Final, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+Migration = Tuple[int, str, Callable[[Connection], None]]
+
+
+def _add_message_history_indexes(connection: Connection) -> None:
+    # История чата: WHERE chat_id = ? ORDER BY id
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS idx_messages_chat_id ON messages (chat_id, id)"
+    )
+    # История сессии в чате: WHERE chat_id = ? AND session_id = ? ORDER BY id
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS idx_messages_chat_session_id ON messages (chat_id, session_id, id)"
+    )
+
+
+def _add_messages_fts(connection: Connection) -> None:
+    # External-content FTS5: текст хранится только в messages, индекс держат в синхронизации триггеры
+    connection.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+            message,
+            content='messages',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """
+    )
+    connection.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN
+            INSERT INTO messages_fts (rowid, message) VALUES (new.id, new.message);
+        END
+        """
+    )
+    connection.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, message) VALUES ('delete', old.id, old.message);
+        END
+        """
+    )
+    connection.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF message ON messages BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, message) VALUES ('delete', old.id, old.message);
+            INSERT INTO messages_fts (rowid, message) VALUES (new.id, new.message);
+        END
+        """
+    )
+    # Индексируем уже существующую историю (и чистим индекс после пересоздания messages)
+    connection.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+
+
+def _add_usage_rollups(connection: Connection) -> None:
+    # Счётчики обновляются триггером в той же транзакции, что и вставка сообщения.
+    # Триггера на DELETE нет: очистка истории при суммаризации не отменяет уже потраченные токены и деньги
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS usage_daily (
+            chat_id TEXT NOT NULL,
+            day TEXT NOT NULL,
+            messages INTEGER NOT NULL DEFAULT 0,
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            completion_tokens INTEGER NOT NULL DEFAULT 0,
+            request_time REAL NOT NULL DEFAULT 0,
+            price REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (chat_id, day)
+        ) WITHOUT ROWID
+        """
+    )
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS usage_totals (
+            chat_id TEXT PRIMARY KEY,
+            messages INTEGER NOT NULL DEFAULT 0,
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            completion_tokens INTEGER NOT NULL DEFAULT 0,
+            request_time REAL NOT NULL DEFAULT 0,
+            price REAL NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """
+    )
+    connection.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS usage_rollups_ai AFTER INSERT ON messages BEGIN
+            INSERT INTO usage_daily (chat_id, day, messages, prompt_tokens, completion_tokens, request_time, price)
+            VALUES (new.chat_id, date('now'), 1, new.prompt_tokens, new.completion_tokens, new.request_time, new.price)
+            ON CONFLICT (chat_id, day) DO UPDATE SET
+                messages = messages + 1,
+                prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                completion_tokens = completion_tokens + excluded.completion_tokens,
+                request_time = request_time + excluded.request_time,
+                price = price + excluded.price;
+            INSERT INTO usage_totals (chat_id, messages, prompt_tokens, completion_tokens, request_time, price)
+            VALUES (new.chat_id, 1, new.prompt_tokens, new.completion_tokens, new.request_time, new.price)
+            ON CONFLICT (chat_id) DO UPDATE SET
+                messages = messages + 1,
+                prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                completion_tokens = completion_tokens + excluded.completion_tokens,
+                request_time = request_time + excluded.request_time,
+                price = price + excluded.price;
+        END
+        """
+    )
+    # Досчитываем уже сохранённую историю один раз — при первом создании таблиц
+    if connection.execute("SELECT COUNT(*) FROM usage_totals").fetchone()[0] == 0:
+        connection.execute(
+            """
+            INSERT INTO usage_daily (chat_id, day, messages, prompt_tokens, completion_tokens, request_time, price)
+            SELECT chat_id, date(created_at), COUNT(*), SUM(prompt_tokens), SUM(completion_tokens),
+                   SUM(request_time), SUM(price)
+            FROM messages GROUP BY chat_id, date(created_at)
+            """
+        )
+        connection.execute(
+            """
+            INSERT INTO usage_totals (chat_id, messages, prompt_tokens, completion_tokens, request_time, price)
+            SELECT chat_id, COUNT(*), SUM(prompt_tokens), SUM(completion_tokens), SUM(request_time), SUM(price)
+            FROM messages GROUP BY chat_id
+            """
+        )
+
+
+def _add_messages_archive(connection: Connection) -> None:
+    # Холодное хранилище суммаризированной истории: message и meta сжаты zlib (SQL-функция zlib_compress)
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS messages_archive (
+            id INTEGER PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            agent_id TEXT,
+            chat_id TEXT NOT NULL,
+            message_type TEXT NOT NULL,
+            name TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            message BLOB NOT NULL,
+            prompt_tokens INTEGER NOT NULL,
+            completion_tokens INTEGER NOT NULL,
+            request_time INTEGER NOT NULL,
+            price INTEGER NOT NULL,
+            meta BLOB,
+            created_at TIMESTAMP,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS idx_messages_archive_chat_id ON messages_archive (chat_id, id)"
+    )
+
+
+def _has_column(connection: Connection, table: str, column: str) -> bool:
+    return any(row[1] == column for row in connection.execute(f"PRAGMA table_info({table})"))
+
+
+def _add_history_epochs(connection: Connection) -> None:
+    # Очистка чата — инкремент chats.history_epoch; читаются только сообщения текущей эпохи,
+    # устаревшие строки удаляет фоновый reclaimer. ADD COLUMN с DEFAULT не переписывает таблицу
+    if not _has_column(connection, "chats", "history_epoch"):
+        connection.execute("ALTER TABLE chats ADD COLUMN history_epoch INTEGER NOT NULL DEFAULT 0")
+    if not _has_column(connection, "messages", "epoch"):
+        connection.execute("ALTER TABLE messages ADD COLUMN epoch INTEGER NOT NULL DEFAULT 0")
+
+    # Эпоха встаёт между chat_id и id: чтение текущей эпохи и поиск устаревших строк идут по индексу
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS idx_messages_chat_epoch_id ON messages (chat_id, epoch, id)"
+    )
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS idx_messages_chat_epoch_session_id ON messages (chat_id, epoch, session_id, id)"
+    )
+    connection.execute("DROP INDEX IF EXISTS idx_messages_chat_id")
+    connection.execute("DROP INDEX IF EXISTS idx_messages_chat_session_id")
+
+
+def _add_history_versions(connection: Connection) -> None:
+    # Версия истории растёт при каждом изменении видимых сообщений чата, в каком бы процессе оно ни было:
+    # по ней кэш истории в памяти воркера проверяет, что его копия не устарела
+    if not _has_column(connection, "chats", "history_version"):
+        connection.execute("ALTER TABLE chats ADD COLUMN history_version INTEGER NOT NULL DEFAULT 0")
+
+    connection.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS messages_version_ai AFTER INSERT ON messages BEGIN
+            UPDATE chats SET history_version = history_version + 1 WHERE chat_id = new.chat_id;
+        END
+        """
+    )
+    connection.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS messages_version_au AFTER UPDATE ON messages BEGIN
+            UPDATE chats SET history_version = history_version + 1 WHERE chat_id IN (old.chat_id, new.chat_id);
+        END
+        """
+    )
+    # Удаление строк прошлых эпох (reclaimer) видимую историю не меняет — версию не трогаем
+    connection.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS messages_version_ad AFTER DELETE ON messages
+        WHEN old.epoch = (SELECT history_epoch FROM chats WHERE chat_id = old.chat_id) BEGIN
+            UPDATE chats SET history_version = history_version + 1 WHERE chat_id = old.chat_id;
+        END
+        """
+    )
+
+
+def _add_chats_version(connection: Connection) -> None:
+    # Общая версия таблицы chats: по ней кэш чатов в памяти воркера видит изменения из других процессов.
+    # Триггер на UPDATE ограничен колонками метаданных — history_epoch/history_version меняются на каждой вставке
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS data_versions (
+            scope TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """
+    )
+    connection.execute("INSERT OR IGNORE INTO data_versions (scope, version) VALUES ('chats', 0)")
+    for name, event in (
+            ("chats_version_ai", "AFTER INSERT ON chats"),
+            ("chats_version_ad", "AFTER DELETE ON chats"),
+            ("chats_version_au", "AFTER UPDATE OF chat_id, name, system_prompt, created_at ON chats"),
+    ):
+        connection.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN
+                UPDATE data_versions SET version = version + 1 WHERE scope = 'chats';
+            END
+            """
+        )
+
+
+def _add_archive_message_id(connection: Connection) -> None:
+    # У архива свой rowid, а id сообщения — отдельная колонка message_id: строки архива не теряются,
+    # даже если id сообщения повторился (например, после recreate_table_messages). Таблицу пересобираем —
+    # первичный ключ через ALTER TABLE не поменять
+    if not _has_column(connection, "messages_archive", "message_id"):
+        connection.execute(
+            """
+            CREATE TABLE messages_archive_new (
+                id INTEGER PRIMARY KEY,
+                message_id INTEGER NOT NULL,
+                session_id TEXT NOT NULL,
+                agent_id TEXT,
+                chat_id TEXT NOT NULL,
+                message_type TEXT NOT NULL,
+                name TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                message BLOB NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                request_time INTEGER NOT NULL,
+                price INTEGER NOT NULL,
+                meta BLOB,
+                created_at TIMESTAMP,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        connection.execute(
+            """
+            INSERT INTO messages_archive_new
+            (message_id, session_id, agent_id, chat_id, message_type, name, timestamp, message,
+             prompt_tokens, completion_tokens, request_time, price, meta, created_at, archived_at)
+            SELECT id, session_id, agent_id, chat_id, message_type, name, timestamp, message,
+                   prompt_tokens, completion_tokens, request_time, price, meta, created_at, archived_at
+            FROM messages_archive ORDER BY id
+            """
+        )
+        connection.execute("DROP TABLE messages_archive")
+        connection.execute("ALTER TABLE messages_archive_new RENAME TO messages_archive")
+
+    # Страницы архива листаются по message_id
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS idx_messages_archive_chat_message_id ON messages_archive (chat_id, message_id)"
+    )
+
+
+MIGRATIONS: Final[List[Migration]] = [
+    (1, "индексы истории сообщений", _add_message_history_indexes),
+    (2, "полнотекстовый поиск по сообщениям (FTS5)", _add_messages_fts),
+    (3, "накопительная статистика использования по чатам", _add_usage_rollups),
+    (4, "архив суммаризированной истории со сжатием", _add_messages_archive),
+    (5, "эпохи истории для очистки чата за O(1)", _add_history_epochs),
+    (6, "версии истории чатов для проверки кэша между процессами", _add_history_versions),
+    (7, "версия таблицы chats для проверки кэша между процессами", _add_chats_version),
+    (8, "собственный id строк архива и колонка message_id", _add_archive_message_id),
+]
+
+
+def get_schema_version(connection: Connection) -> int:
+    return int(connection.execute("PRAGMA user_version").fetchone()[0])
+
+
+def set_schema_version(connection: Connection, version: int) -> None:
+    connection.execute(f"PRAGMA user_version = {int(version)}")
+
+
+def apply_migrations(connection: Connection) -> int:
+    """Применяет недостающие миграции, каждую в своей транзакции. Возвращает итоговую версию."""
+    for version, name, migrate in MIGRATIONS:
+        if version <= get_schema_version(connection):
+            continue
+
+        # BEGIN IMMEDIATE сериализует миграцию между воркерами; версию перепроверяем под блокировкой
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if version <= get_schema_version(connection):
+                connection.rollback()
+                continue
+            migrate(connection)
+            set_schema_version(connection, version)
+            connection.commit()
+            logger.info(f"Миграция {version} применена: {name}")
+        except Exception:
+            connection.rollback()
+            logger.exception(f"Ошибка миграции {version}: {name}")
+            raise
+
+    return get_schema_version(connection)
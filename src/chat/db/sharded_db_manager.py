@@ -0,0 +1,279 @@
+"""
+Шардированное хранилище: каждый чат целиком живёт в одном из N файлов SQLite.
+
+Шард выбирается стабильным хэшем crc32(chat_id) % N; шард 0 — прежний app.db, остальные app.shard{i}.db.
+В шарде хранятся и сообщения, и строка chats (эпохи, usage, архив связаны с ней внутри одного файла),
+поэтому запись в разные чаты не упирается в одну блокировку записи SQLite.
+
+Публичный API совпадает с DbManager. Операции над одним чатом уходят в его шард, запросы по всем
+чатам (get_chats, поиск без chat_id, очистка таблицы) выполняются параллельно во всех шардах.
+id сообщений глобально уникальны: шард i выдаёт их из диапазона [i * SHARD_ID_SPAN, (i + 1) * SHARD_ID_SPAN),
+шард 0 продолжает нумерацию прежнего app.db.
+
+При включении шардов на существующей базе app.db (шард 0) ещё хранит все чаты; после смены DB_SHARDS
+чаты лежат в прежних шардах, в том числе в файлах с номером не меньше нового DB_SHARDS. Такие чаты
+переносятся в свой шард при старте вместе с историей, архивом и статистикой.
+"""
+import asyncio
+import logging
+import zlib
+from datetime import date
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Final, List, Optional
+
+from src.chat.core.constants import CHATS_DEFAULT
+from src.chat.db.db_manager import DbManager
+from src.chat.model.chat import Chat
+from src.chat.model.messages import Message
+from src.chat.model.search import SearchResultList
+from src.chat.model.stats import DbStats
+from src.chat.model.usage import ChatUsage
+
+logger = logging.getLogger(__name__)
+
+# Ёмкость диапазона id одного шарда. Все id остаются меньше 2**53 (точно представимы в JSON/JS)
+# вплоть до MAX_SHARDS шардов
+SHARD_ID_SPAN: Final[int] = 10 ** 12
+MAX_SHARDS: Final[int] = 2 ** 53 // SHARD_ID_SPAN
+
+
+def shard_for(chat_id: str, shard_count: int) -> int:
+    # crc32 стабилен между процессами и запусками, в отличие от hash()
+    return zlib.crc32(chat_id.encode("utf-8")) % shard_count
+
+
+def shard_db_name(index: int) -> str:
+    return "app.db" if index == 0 else f"app.shard{index}.db"
+
+
+class ShardedDbManager:
+
+    def __init__(self, shard_count: int, db_dir: Optional[Path] = None, **kwargs: Any) -> None:
+        if not 1 <= shard_count <= MAX_SHARDS:
+            raise ValueError(f"shard_count должен быть от 1 до {MAX_SHARDS}")
+
+        self.shard_count: int = shard_count
+        self._shards: List[DbManager] = [
+            DbManager(
+                db_dir=db_dir,
+                db_name=shard_db_name(index),
+                default_chats=[chat for chat in CHATS_DEFAULT if shard_for(chat.id, shard_count) == index],
+                message_id_base=index * SHARD_ID_SPAN,
+                **kwargs,
+            )
+            for index in range(shard_count)
+        ]
+        try:
+            self._drain_extra_shards(**kwargs)
+            self._rebalance_misplaced_chats()
+        except Exception:
+            self.close()
+            raise
+        logger.info(f"Шардированное хранилище: {shard_count} шардов в {self._shards[0].db_dir}")
+
+    def _drain_extra_shards(self, **kwargs: Any) -> None:
+        """Переносит чаты из файлов шардов с номером не меньше DB_SHARDS (после уменьшения DB_SHARDS)."""
+        db_dir = self._shards[0].db_dir
+        indexes = sorted(
+            int(path.name[len("app.shard"):-len(".db")])
+            for path in db_dir.glob("app.shard*.db")
+            if path.name[len("app.shard"):-len(".db")].isdigit()
+        )
+        for index in indexes:
+            if index < self.shard_count:
+                continue
+            extra = DbManager(
+                db_dir=db_dir,
+                db_name=shard_db_name(index),
+                default_chats=[],
+                message_id_base=index * SHARD_ID_SPAN,
+                **kwargs,
+            )
+            try:
+                for chat in extra._get_chats():
+                    target = self.shard(chat.id)
+                    target._move_chat_from(extra, chat.id)
+                    logger.warning(f"Чат {chat.id} перенесён из {extra.db_path.name} в {target.db_path.name}")
+            finally:
+                extra.close()
+
+    def _rebalance_misplaced_chats(self) -> None:
+        """Переносит чаты, оставшиеся в шардах от запуска без шардов или с другим DB_SHARDS."""
+        misplaced = [
+            (shard, chat)
+            for index, shard in enumerate(self._shards)
+            for chat in shard._get_chats()
+            if shard_for(chat.id, self.shard_count) != index
+        ]
+        for shard, chat in misplaced:
+            target = self.shard(chat.id)
+            target._move_chat_from(shard, chat.id)
+            logger.warning(f"Чат {chat.id} перенесён из {shard.db_path.name} в {target.db_path.name}")
+
+    @property
+    def shards(self) -> List[DbManager]:
+        return list(self._shards)
+
+    def shard(self, chat_id: str) -> DbManager:
+        return self._shards[shard_for(chat_id, self.shard_count)]
+
+    # ===== Служебное =====
+
+    def get_stats(self) -> DbStats:
+        stats = self._shards[0].get_stats()
+        stats.shards = [shard.get_stats() for shard in self._shards[1:]]
+        return stats
+
+    async def collect_stats(self) -> DbStats:
+        stats, *others = await asyncio.gather(*[shard.collect_stats() for shard in self._shards])
+        stats.shards = others
+        return stats
+
+    def check_query_plans(self) -> List[str]:
+        return [problem for shard in self._shards for problem in shard.check_query_plans()]
+
+    async def flush(self) -> None:
+        await asyncio.gather(*[shard.flush() for shard in self._shards])
+
+    def close(self) -> None:
+        for shard in self._shards:
+            shard.close()
+
+    # ===== Сообщения одного чата =====
+
+    async def add_message(self, message: Message) -> Optional[Message]:
+        return await self.shard(message.chat_id).add_message(message)
+
+    async def add_messages(self, messages: List[Message]) -> List[Message]:
+        """Одна транзакция на шард; сообщения возвращаются в исходном порядке."""
+        groups: Dict[int, List[int]] = {}
+        for position, message in enumerate(messages):
+            groups.setdefault(shard_for(message.chat_id, self.shard_count), []).append(position)
+
+        saved_groups = await asyncio.gather(*[
+            self._shards[index].add_messages([messages[position] for position in positions])
+            for index, positions in groups.items()
+        ])
+
+        result: List[Optional[Message]] = [None] * len(messages)
+        for positions, saved in zip(groups.values(), saved_groups):
+            for position, message in zip(positions, saved):
+                result[position] = message
+        return [message for message in result if message is not None]
+
+    async def replace_chat_history(
+            self,
+            chat_id: str,
+            messages: List[Message],
+            system_prompt: Optional[str] = None,
+            archive: bool = True,
+    ) -> List[Message]:
+        return await self.shard(chat_id).replace_chat_history(chat_id, messages, system_prompt, archive)
+
+    async def get_archived_messages(
+            self,
+            chat_id: str,
+            limit: int = 50,
+            before_id: Optional[int] = None,
+    ) -> List[Message]:
+        return await self.shard(chat_id).get_archived_messages(chat_id, limit, before_id)
+
+    async def get_messages(
+            self,
+            chat_id: str,
+            session_id: Optional[str] = None,
+            limit: Optional[int] = None,
+            before_id: Optional[int] = None,
+            after_id: Optional[int] = None,
+            latest: bool = False,
+    ) -> List[Message]:
+        if chat_id:
+            return await self.shard(chat_id).get_messages(chat_id, session_id, limit, before_id, after_id, latest)
+
+        # Диапазоны id шардов не пересекаются и идут по возрастанию: склейка страниц уже отсортирована по id,
+        # а общая страница — её начало (или конец для before_id/latest) длиной limit
+        pages = await asyncio.gather(*[
+            shard.get_messages(chat_id, session_id, limit, before_id, after_id, latest) for shard in self._shards
+        ])
+        merged = [message for page in pages for message in page]
+        if limit:
+            merged = merged[-limit:] if before_id is not None or latest else merged[:limit]
+        return merged
+
+    async def iter_messages(
+            self,
+            chat_id: str,
+            session_id: Optional[str] = None,
+            batch_size: int = 1000,
+            after_id: Optional[int] = None,
+    ) -> AsyncIterator[Message]:
+        async for message in self.shard(chat_id).iter_messages(chat_id, session_id, batch_size, after_id):
+            yield message
+
+    async def get_usage(self, chat_id: str, day: Optional[date] = None) -> ChatUsage:
+        return await self.shard(chat_id).get_usage(chat_id, day)
+
+    async def clear_messages(self, chat_id: str) -> None:
+        await self.shard(chat_id).clear_messages(chat_id)
+
+    async def remove_all_messages_chat(self, chat_id: str) -> bool:
+        return await self.shard(chat_id).remove_all_messages_chat(chat_id)
+
+    # ===== Поиск и операции над всеми шардами =====
+
+    async def search_messages(
+            self,
+            query: str,
+            chat_id: Optional[str] = None,
+            limit: int = 20,
+            cursor: Optional[int] = None,
+    ) -> SearchResultList:
+        """
+        Поиск в одном чате ранжирован по релевантности. Поиск по всем чатам идёт по убыванию id сообщения:
+        bm25 считается по статистике своего шарда и между шардами несравним. cursor — id из next_cursor.
+        """
+        if chat_id:
+            return await self.shard(chat_id).search_messages(query, chat_id, limit, cursor)
+
+        # Каждый шард отдаёт до limit результатов старше cursor; общая страница — начало слияния по id
+        pages = await asyncio.gather(*[
+            shard.search_messages(query, None, limit, cursor, newest_first=True) for shard in self._shards
+        ])
+        merged = sorted(
+            (result for page in pages for result in page.results),
+            key=lambda result: result.message_id,
+            reverse=True,
+        )
+        has_more = len(merged) > limit or any(page.next_cursor is not None for page in pages)
+        results = merged[:limit]
+        return SearchResultList(
+            results=results,
+            next_cursor=results[-1].message_id if has_more and results else None,
+        )
+
+    async def clear_all_table_messages(self) -> None:
+        await asyncio.gather(*[shard.clear_all_table_messages() for shard in self._shards])
+
+    async def recreate_table_messages(self) -> None:
+        await asyncio.gather(*[shard.recreate_table_messages() for shard in self._shards])
+
+    # ===== Чаты =====
+
+    async def add_chat(self, chat: Chat) -> Optional[str]:
+        return await self.shard(chat.id).add_chat(chat)
+
+    async def update_chat_system_prompt(self, chat_id: str, system_prompt: str) -> Optional[Chat]:
+        return await self.shard(chat_id).update_chat_system_prompt(chat_id, system_prompt)
+
+    async def get_chat_by_id(self, chat_id: str) -> Optional[Chat]:
+        return await self.shard(chat_id).get_chat_by_id(chat_id)
+
+    async def get_chats(self) -> List[Chat]:
+        chats = [chat for shard_chats in await asyncio.gather(*[shard.get_chats() for shard in self._shards])
+                 for chat in shard_chats]
+        # Порядок как у одной базы: сначала чаты по умолчанию, затем остальные по времени создания
+        default_order = {chat.id: position for position, chat in enumerate(CHATS_DEFAULT)}
+        return sorted(chats, key=lambda chat: (default_order.get(chat.id, len(default_order)), str(chat.created_at)))
+
+    async def update_name_chat(self, chat_id: str, chat_name: Optional[str]) -> bool:
+        return await self.shard(chat_id).update_name_chat(chat_id, chat_name)
@@ -0,0 +1,60 @@
+from dataclasses import dataclass
+from typing import Dict, Final, Union
+
+from src.chat.core.configs import Settings
+
+
+@dataclass(frozen=True)
+class StorageProfile:
+    """Набор PRAGMA, который DbManager применяет к каждому соединению пула."""
+
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    mmap_size: int = 256 * 1024 * 1024       # байт; 0 — без mmap
+    cache_size: int = -64 * 1024             # отрицательное — в КиБ, положительное — в страницах
+    busy_timeout_ms: int = 5000
+    wal_autocheckpoint: int = 1000           # страниц; 0 — только фоновые чекпоинты
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "StorageProfile":
+        return cls(
+            journal_mode=settings.DB_JOURNAL_MODE,
+            synchronous=settings.DB_SYNCHRONOUS,
+            mmap_size=settings.DB_MMAP_SIZE,
+            cache_size=settings.DB_CACHE_SIZE,
+            busy_timeout_ms=settings.DB_BUSY_TIMEOUT_MS,
+            wal_autocheckpoint=settings.DB_WAL_AUTOCHECKPOINT,
+        )
+
+    @property
+    def is_wal(self) -> bool:
+        return self.journal_mode.upper() == "WAL"
+
+    def pragmas(self) -> Dict[str, Union[str, int]]:
+        # busy_timeout первым: смена journal_mode ждёт блокировку других воркеров
+        pragmas: Dict[str, Union[str, int]] = {
+            "busy_timeout": self.busy_timeout_ms,
+            "journal_mode": self.journal_mode,
+            "synchronous": self.synchronous,
+            "cache_size": self.cache_size,
+            "mmap_size": self.mmap_size,
+        }
+        if self.is_wal:
+            pragmas["wal_autocheckpoint"] = self.wal_autocheckpoint
+        return pragmas
+
+
+# Готовые профили для сравнения (benchmarks/storage_profiles.py)
+PROFILE_SQLITE_DEFAULT: Final[StorageProfile] = StorageProfile(
+    journal_mode="DELETE", synchronous="FULL", mmap_size=0, cache_size=-2000
+)
+PROFILE_DURABLE: Final[StorageProfile] = StorageProfile(synchronous="FULL")
+PROFILE_BALANCED: Final[StorageProfile] = StorageProfile()
+PROFILE_FAST: Final[StorageProfile] = StorageProfile(synchronous="OFF", wal_autocheckpoint=0)
+
+STORAGE_PROFILES: Final[Dict[str, StorageProfile]] = {
+    "sqlite_default": PROFILE_SQLITE_DEFAULT,
+    "durable": PROFILE_DURABLE,
+    "balanced": PROFILE_BALANCED,
+    "fast": PROFILE_FAST,
+}
@@ -0,0 +1,122 @@
+"""
+Групповой коммит вставок сообщений (write-behind).
+
+add_message кладёт сообщение в очередь и ждёт future. Фоновая задача забирает сообщения
+пачками (до batch_size штук или flush_interval секунд) и пишет каждую пачку одной транзакцией,
+так что под нагрузкой один fsync приходится на много вставок.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from src.chat.model.messages import Message
+from src.chat.model.stats import WriteBehindStats
+
+logger = logging.getLogger(__name__)
+
+BatchWriter = Callable[[List[Message]], Awaitable[List[Message]]]
+PendingItem = Tuple[Message, "asyncio.Future[Message]"]
+
+
+class WriteBehindQueue:
+
+    def __init__(self, write_batch: BatchWriter, batch_size: int, flush_interval: float) -> None:
+        self._write_batch: BatchWriter = write_batch
+        self.batch_size: int = max(1, batch_size)
+        self.flush_interval: float = max(0.0, flush_interval)
+
+        self._queue: Optional["asyncio.Queue[Optional[PendingItem]]"] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+        self._batches: int = 0
+        self._messages: int = 0
+        self._max_batch: int = 0
+        self._failed_batches: int = 0
+        self._total_flush: float = 0.0
+
+    def _ensure_started(self) -> "asyncio.Queue[Optional[PendingItem]]":
+        # Очередь и задача привязаны к event loop — создаём при первой вставке в работающем loop
+        if self._queue is None or self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._queue
+
+    async def submit(self, message: Message) -> Message:
+        queue = self._ensure_started()
+        future: "asyncio.Future[Message]" = asyncio.get_running_loop().create_future()
+        await queue.put((message, future))
+        return await future
+
+    async def _collect_batch(self, queue: "asyncio.Queue[Optional[PendingItem]]") -> Tuple[List[PendingItem], bool]:
+        first = await queue.get()
+        if first is None:
+            return [], True
+
+        batch: List[PendingItem] = [first]
+        deadline = time.perf_counter() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = queue.get_nowait() if timeout <= 0 else await asyncio.wait_for(queue.get(), timeout)
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._collect_batch(self._queue)
+            if batch:
+                await self._flush(batch)
+
+    async def _flush(self, batch: List[PendingItem]) -> None:
+        started = time.perf_counter()
+        messages = [message for message, _ in batch]
+        try:
+            saved = await self._write_batch(messages)
+            for (_, future), message in zip(batch, saved):
+                if not future.done():
+                    future.set_result(message)
+        except Exception as e:
+            # Пачка откатилась целиком — пишем поштучно, чтобы ошибку получили только виноватые
+            self._failed_batches += 1
+            logger.error(f"Ошибка группового коммита ({len(batch)} сообщений): {e}")
+            for message, future in batch:
+                try:
+                    saved_message, = await self._write_batch([message])
+                    if not future.done():
+                        future.set_result(saved_message)
+                except Exception as single_error:
+                    if not future.done():
+                        future.set_exception(single_error)
+
+        self._batches += 1
+        self._messages += len(batch)
+        self._max_batch = max(self._max_batch, len(batch))
+        self._total_flush += time.perf_counter() - started
+
+    async def close(self) -> None:
+        """Дописывает всё, что уже в очереди, и останавливает фоновую задачу."""
+        if self._queue is None or self._task is None or self._task.done():
+            return
+        await self._queue.put(None)
+        await self._task
+        logger.info(f"Очередь group commit остановлена: {self._messages} сообщений в {self._batches} пачках")
+
+    def stats(self) -> WriteBehindStats:
+        return WriteBehindStats(
+            batch_size=self.batch_size,
+            flush_interval_ms=self.flush_interval * 1000,
+            queued=self._queue.qsize() if self._queue is not None else 0,
+            batches=self._batches,
+            messages=self._messages,
+            avg_batch=self._messages / self._batches if self._batches else 0.0,
+            max_batch=self._max_batch,
+            failed_batches=self._failed_batches,
+            avg_flush_ms=(self._total_flush / self._batches * 1000) if self._batches else 0.0,
+        )
@@ -1,15 +1,17 @@
 import logging
-from typing import List
+from datetime import date
+from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from starlette.responses import Response
 from starlette.requests import Request
 
 from src.chat.business.verify import verify
-from src.chat.business.messages_interactor import get_all_chats, get_all_messages_chat
-from src.chat.core.constants import KEY_SELECTED_CHAT, ONE_DAY_IN_SECONDS
+from src.chat.business.messages_interactor import get_all_chats, get_all_messages_chat, get_chat_usage
+from src.chat.core.constants import KEY_SELECTED_CHAT, ONE_DAY_IN_SECONDS, HISTORY_PAGE_SIZE
 from src.chat.model.messages import MessageList
 from src.chat.model.chat import ChatList, ChatIdRequest
+from src.chat.model.usage import ChatUsage
 
 router = APIRouter()
 
@@ -49,4 +51,19 @@ async def set_chat(
         httponly=True,
         max_age=ONE_DAY_IN_SECONDS,
     )
-    return await get_all_messages_chat(value.id)
\ No newline at end of file
+    return await get_all_messages_chat(value.id, limit=HISTORY_PAGE_SIZE)
+
+
+@router.get(
+    path="/v1/usage",
+    response_model=ChatUsage,
+    summary="Расход чата (сообщения, токены, время, цена) за день или за всё время"
+)
+async def get_usage(
+        response: Response,
+        request: Request,
+        chat_id: str = Query(..., description="Chat ID"),
+        day: Optional[date] = Query(None, description="День в UTC (YYYY-MM-DD); без параметра — за всё время"),
+) -> ChatUsage:
+    await verify(request=request)
+    return await get_chat_usage(chat_id=chat_id, day=day)
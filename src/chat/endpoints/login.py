@@ -4,10 +4,14 @@ from fastapi import APIRouter, HTTPException
 from starlette.requests import Request
 from starlette.responses import Response, JSONResponse
 
+from src.chat.business.auth_token import get_token_signer
 from src.chat.business.session_interactor import get_session_manager
-from src.chat.core.constants import KEY_PASSWORD_SALT, KEY_SESSION_ID, ONE_DAY_IN_SECONDS
+from src.chat.business.verify import is_authorized
+from src.chat.core.configs import settings
+from src.chat.core.constants import KEY_PASSWORD_SALT, KEY_SESSION_ID, ONE_DAY_IN_SECONDS, KEY_AUTH_TOKEN
 from src.chat.model.common import StandardResponse
 from src.chat.model.verify import AuthResponse
+from src.chat.server.session_middleware import get_request_session_id
 
 router = APIRouter()
 
@@ -24,7 +28,14 @@ async def login_endpoint(
         response: Response,
         request: Request
 ) -> StandardResponse:
-    session_id = request.cookies.get(KEY_SESSION_ID)
+    session_id = get_request_session_id(request)
+
+    if not session_id:
+        # Без сессии нечего подписывать токеном и некуда сохранять пароль
+        raise HTTPException(
+            status_code=401,
+            detail="Сессия не найдена"
+        )
 
     salt = await get_session_manager().login(
         session_id=session_id,
@@ -54,6 +65,14 @@ async def login_endpoint(
         max_age=ONE_DAY_IN_SECONDS,
     )
 
+    if settings.AUTH_MODE == "token":
+        response.set_cookie(
+            key=KEY_AUTH_TOKEN,
+            value=get_token_signer().issue(session_id),
+            httponly=True,
+            max_age=min(ONE_DAY_IN_SECONDS, settings.AUTH_TOKEN_TTL_SECONDS),
+        )
+
     return StandardResponse(message=salt)
 
 @router.get(
@@ -66,21 +85,16 @@ async def check_auth(
         request: Request
 ) -> StandardResponse:
     session_id = request.cookies.get(KEY_SESSION_ID)
-    password_salt = request.cookies.get(KEY_PASSWORD_SALT)
+    credential = request.cookies.get(KEY_AUTH_TOKEN if settings.AUTH_MODE == "token" else KEY_PASSWORD_SALT)
 
-    if not session_id or not password_salt:
+    if not session_id or not credential:
         raise HTTPException(
             status_code=401,
             detail="Не авторизован"
         )
 
     # Проверяем валидность
-    result = await get_session_manager().verify_session(
-        session_id=session_id,
-        cookie_password_salt=password_salt
-    )
-
-    if not result:
+    if not await is_authorized(request):
         raise HTTPException(
             status_code=401,
             detail="Невалидная сессия"
@@ -1,15 +1,19 @@
 import logging
 from typing import Optional
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
 from starlette.requests import Request
 from starlette.responses import Response
 
-from src.chat.business.messages_interactor import process_message, delete_all_messages_chat, get_all_messages_chat
+from src.chat.business.messages_interactor import process_message, delete_all_messages_chat, get_all_messages_chat, \
+    search_messages, get_archived_messages_chat
 from src.chat.business.verify import verify
-from src.chat.core.constants import KEY_SELECTED_FORMAT_TYPE_REQUEST, CHATS_DEFAULT, KEY_SELECTED_CHAT, KEY_SESSION_ID
+from src.chat.core.constants import KEY_SELECTED_FORMAT_TYPE_REQUEST, CHATS_DEFAULT, KEY_SELECTED_CHAT, KEY_SESSION_ID, \
+    HISTORY_PAGE_SIZE, HISTORY_PAGE_SIZE_MAX
 from src.chat.model.common import StandardResponse
 from src.chat.model.messages import MessageRequest, MessageList
+from src.chat.model.search import SearchResultList
+from src.chat.endpoints.responses import ModelJSONResponse
 from src.chat.model.tape_formats_response import FormatType
 
 router = APIRouter()
@@ -48,14 +52,48 @@ async def message(
     )
 
 
-@router.get("/v1/history_message")
+@router.get("/v1/history_message", response_model=MessageList)
 async def get_history_message(
         response: Response,
         request: Request,
-        id: str = Query(..., description="Chat ID")
-) -> MessageList:
+        id: str = Query(..., description="Chat ID"),
+        limit: Optional[int] = Query(
+            None, ge=1, le=HISTORY_PAGE_SIZE_MAX, description="Размер страницы; без параметров пагинации — вся история"
+        ),
+        before_id: Optional[int] = Query(None, description="Курсор: сообщения старше этого id"),
+        after_id: Optional[int] = Query(None, description="Курсор: сообщения новее этого id"),
+) -> Response:
+    await verify(request=request)
+    if before_id is not None and after_id is not None:
+        raise HTTPException(
+            status_code=400,
+            detail="Укажите только один курсор: before_id или after_id"
+        )
+    history: MessageList = await get_all_messages_chat(
+        chat_id=id,
+        limit=limit,
+        before_id=before_id,
+        after_id=after_id,
+    )
+    # Сообщения из базы уже корректны — отдаём без повторной валидации через response_model
+    return ModelJSONResponse(history)
+
+
+@router.get("/v1/archive_message", response_model=MessageList)
+async def get_archive_message(
+        response: Response,
+        request: Request,
+        id: str = Query(..., description="Chat ID"),
+        limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_PAGE_SIZE_MAX, description="Размер страницы"),
+        before_id: Optional[int] = Query(None, description="Курсор: сообщения старше этого id"),
+) -> Response:
     await verify(request=request)
-    return await get_all_messages_chat(id)
+    archive: MessageList = await get_archived_messages_chat(
+        chat_id=id,
+        limit=limit,
+        before_id=before_id,
+    )
+    return ModelJSONResponse(archive)
 
 
 @router.delete("/v1/history_message")
@@ -70,3 +108,21 @@ async def delete_history_message(
         message="История удалена",
         success=True
     )
+
+
+@router.get("/v1/search")
+async def search(
+        response: Response,
+        request: Request,
+        q: str = Query(..., min_length=1, description="Поисковый запрос"),
+        chat_id: Optional[str] = Query(None, description="Искать только в этом чате"),
+        limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_PAGE_SIZE_MAX, description="Размер страницы"),
+        cursor: Optional[int] = Query(None, ge=0, description="next_cursor предыдущей страницы"),
+) -> SearchResultList:
+    await verify(request=request)
+    return await search_messages(
+        query=q,
+        chat_id=chat_id,
+        limit=limit,
+        cursor=cursor,
+    )
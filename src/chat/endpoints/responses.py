@@ -0,0 +1,21 @@
+from typing import Any, Union
+
+from pydantic import BaseModel
+from starlette.responses import Response
+
+
+class ModelJSONResponse(Response):
+    """
+    Отдаёт уже собранную pydantic-модель как JSON без повторной валидации.
+
+    FastAPI прогоняет возвращённый объект через response_model (dump + validate) — для длинных
+    историй это дороже самого чтения из базы. Готовый Response FastAPI отдаёт как есть,
+    а response_model у маршрута остаётся для документации.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> Union[bytes, memoryview]:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode("utf-8")
+        return super().render(content)
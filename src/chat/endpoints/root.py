@@ -4,9 +4,9 @@ from fastapi import APIRouter
 from starlette.requests import Request
 from starlette.responses import HTMLResponse, Response
 
-from src.chat.core.configs import settings
+from src.chat.business.page_cache import get_chat_page
 from src.chat.core.constants import KEY_SELECTED_CHAT, KEY_SELECTED_FORMAT_TYPE_REQUEST, ONE_DAY_IN_SECONDS, \
-    KEY_SESSION_ID, KEY_PASSWORD_SALT, CHATS_DEFAULT
+    KEY_SESSION_ID, KEY_PASSWORD_SALT, CHATS_DEFAULT, KEY_AUTH_TOKEN
 from src.chat.model.tape_formats_response import FormatType
 
 router = APIRouter()
@@ -37,11 +37,12 @@ async def root() -> HTMLResponse:
 )
 async def chat_page(
         request: Request
-) -> HTMLResponse:
+) -> Response:
     id_chat = request.cookies.get(KEY_SELECTED_CHAT)
     format_response = request.cookies.get(KEY_SELECTED_FORMAT_TYPE_REQUEST)
     session_id = request.cookies.get(KEY_SESSION_ID)
     password_salt = request.cookies.get(KEY_PASSWORD_SALT)
+    auth_token = request.cookies.get(KEY_AUTH_TOKEN)
 
     if not id_chat:
         id_chat = CHATS_DEFAULT[0].id
@@ -50,44 +51,56 @@ async def chat_page(
         format_response = FormatType.DEFAULT
 
     try:
-        path_site: str = str(settings.SITE_DIR)
-        logger.info(f"Попытка открыть {path_site}/index.html")
-        with open(f"{path_site}/index.html", encoding="utf-8") as f:
-            logger.info("📄 Страница чата загружена")
-            response = HTMLResponse(f.read())
-
-            if session_id:
-                response.set_cookie(
-                    key=KEY_SESSION_ID,
-                    value=session_id,
-                    httponly=True,
-                    max_age=ONE_DAY_IN_SECONDS,
-                )
-
-            if password_salt:
-                response.set_cookie(
-                    key=KEY_PASSWORD_SALT,
-                    value=password_salt,
-                    httponly=True,
-                    max_age=ONE_DAY_IN_SECONDS,
-                )
-
-            response.set_cookie(
-                key=KEY_SELECTED_CHAT,
-                value=id_chat,
-                httponly=True,
-                max_age=ONE_DAY_IN_SECONDS,
-            )
-            response.set_cookie(
-                key=KEY_SELECTED_FORMAT_TYPE_REQUEST,
-                value=format_response,
-                httponly=True,
-                max_age=ONE_DAY_IN_SECONDS,
-            )
-            return response
+        page = get_chat_page().get()
     except FileNotFoundError:
         logger.error("❌ Файл index.html не найден")
         return HTMLResponse(
             "<h1>404: Страница не найдена</h1><p>Файл index.html отсутствует</p>",
             status_code=404
         )
+
+    # Браузер всегда переспрашивает сервер (no-cache): на 304 тоже продлеваем cookies
+    headers = {"ETag": page.etag, "Last-Modified": page.last_modified, "Cache-Control": "no-cache"}
+    if page.is_not_modified(request.headers.get("if-none-match"), request.headers.get("if-modified-since")):
+        response = Response(status_code=304, headers=headers)
+    else:
+        response = HTMLResponse(page.body, headers=headers)
+
+    if session_id:
+        response.set_cookie(
+            key=KEY_SESSION_ID,
+            value=session_id,
+            httponly=True,
+            max_age=ONE_DAY_IN_SECONDS,
+        )
+
+    if password_salt:
+        response.set_cookie(
+            key=KEY_PASSWORD_SALT,
+            value=password_salt,
+            httponly=True,
+            max_age=ONE_DAY_IN_SECONDS,
+        )
+
+    if auth_token:
+        # Срок действия задан внутри токена, продлевается только cookie
+        response.set_cookie(
+            key=KEY_AUTH_TOKEN,
+            value=auth_token,
+            httponly=True,
+            max_age=ONE_DAY_IN_SECONDS,
+        )
+
+    response.set_cookie(
+        key=KEY_SELECTED_CHAT,
+        value=id_chat,
+        httponly=True,
+        max_age=ONE_DAY_IN_SECONDS,
+    )
+    response.set_cookie(
+        key=KEY_SELECTED_FORMAT_TYPE_REQUEST,
+        value=format_response,
+        httponly=True,
+        max_age=ONE_DAY_IN_SECONDS,
+    )
+    return response
@@ -0,0 +1,40 @@
+import logging
+
+from fastapi import APIRouter
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.chat.business.verify import verify
+from src.chat.business.session_interactor import get_session_manager
+from src.chat.db.db_manager import get_db_manager
+from src.chat.model.stats import DbStats, SessionCacheStats
+
+router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
+
+@router.get(
+    path="/v1/stats/db",
+    response_model=DbStats,
+    summary="Статистика хранилища: пул соединений, профиль, чекпоинт WAL, размер и обслуживание"
+)
+async def get_db_stats(
+        response: Response,
+        request: Request
+) -> DbStats:
+    await verify(request=request)
+    return await get_db_manager().collect_stats()
+
+
+@router.get(
+    path="/v1/stats/sessions",
+    response_model=SessionCacheStats,
+    summary="Статистика сессий: кэш, блокировки, удаление устаревших"
+)
+async def get_session_stats(
+        response: Response,
+        request: Request
+) -> SessionCacheStats:
+    await verify(request=request)
+    return get_session_manager().cache_stats()
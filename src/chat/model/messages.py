@@ -33,6 +33,9 @@ class Message(BaseModel):
 
 class MessageList(BaseModel):
     messages: List[Message] = Field(..., description="список сообщений")
+    next_cursor: Optional[int] = Field(
+        default=None, description="id для запроса следующей страницы (before_id или after_id), None если страниц больше нет"
+    )
 
 
 class MessageOutput(BaseModel):
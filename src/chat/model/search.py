@@ -0,0 +1,21 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from src.chat.model.messages import MessageType
+
+
+class SearchResult(BaseModel):
+    message_id: int = Field(..., description="ID сообщения")
+    chat_id: str = Field(..., description="ID чата")
+    session_id: str = Field(..., description="Id сессии")
+    message_type: MessageType = Field(..., description="Тип сообщения")
+    name: str = Field(..., description="имя тела, которое написало сообщение")
+    timestamp: str = Field(..., description="время сообщения")
+    snippet: str = Field(..., description="Фрагмент сообщения с подсвеченными совпадениями")
+    rank: float = Field(..., description="Релевантность bm25 (меньше — лучше)")
+
+
+class SearchResultList(BaseModel):
+    results: List[SearchResult] = Field(..., description="Найденные сообщения по убыванию релевантности (по всем чатам в нескольких шардах — по убыванию id)")
+    next_cursor: Optional[int] = Field(default=None, description="Курсор следующей страницы, None если страниц больше нет")
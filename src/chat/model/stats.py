@@ -0,0 +1,129 @@
+from typing import Dict, List, Optional, Union
+
+from pydantic import BaseModel, Field
+
+
+class PoolStats(BaseModel):
+    db_path: str = Field(..., description="Путь к файлу базы")
+    max_size: int = Field(..., description="Максимальный размер пула")
+    size: int = Field(..., description="Открыто соединений")
+    idle: int = Field(..., description="Свободных соединений")
+    in_use: int = Field(..., description="Занятых соединений")
+    hits: int = Field(..., description="Выдано уже открытых соединений")
+    misses: int = Field(..., description="Открыто новых соединений")
+    hit_rate: float = Field(..., description="Доля переиспользованных соединений")
+    waits: int = Field(..., description="Сколько раз пришлось ждать свободное соединение")
+    timeouts: int = Field(..., description="Сколько раз соединение не дождались")
+    total_wait_ms: float = Field(..., description="Суммарное время ожидания, мс")
+    avg_wait_ms: float = Field(..., description="Среднее время ожидания, мс")
+    max_wait_ms: float = Field(..., description="Максимальное время ожидания, мс")
+
+
+class WalCheckpointStats(BaseModel):
+    mode: str = Field(..., description="Режим чекпоинта: PASSIVE, TRUNCATE, ...")
+    busy: bool = Field(..., description="Чекпоинт не завершён из-за активных читателей/писателей")
+    log_frames: int = Field(..., description="Кадров в WAL")
+    checkpointed_frames: int = Field(..., description="Перенесено кадров в базу")
+    wal_size_bytes: int = Field(..., description="Размер WAL до чекпоинта, байт")
+    duration_ms: float = Field(..., description="Длительность, мс")
+    finished_at: str = Field(..., description="Время завершения (UTC, ISO)")
+
+
+class ReclaimStats(BaseModel):
+    reclaimed: int = Field(..., description="Удалено устаревших сообщений за запуск")
+    batches: int = Field(..., description="Пачек удаления за запуск")
+    finished: bool = Field(..., description="Устаревших сообщений не осталось")
+    duration_ms: float = Field(..., description="Длительность, мс")
+    total_reclaimed: int = Field(..., description="Удалено устаревших сообщений с запуска процесса")
+    finished_at: str = Field(..., description="Время завершения (UTC, ISO)")
+
+
+class DbSizeStats(BaseModel):
+    file_size_bytes: int = Field(..., description="Размер файла базы, байт")
+    wal_size_bytes: int = Field(..., description="Размер WAL, байт")
+    page_size: int = Field(..., description="Размер страницы, байт")
+    page_count: int = Field(..., description="Страниц в базе")
+    freelist_count: int = Field(..., description="Свободных страниц (можно вернуть incremental_vacuum)")
+    free_ratio: float = Field(..., description="Доля свободных страниц")
+    auto_vacuum: str = Field(..., description="Режим auto_vacuum: NONE, FULL, INCREMENTAL")
+
+
+class MaintenanceRunStats(BaseModel):
+    task: str = Field(..., description="Задача обслуживания")
+    rows: int = Field(..., description="Удалено строк или освобождено страниц")
+    duration_ms: float = Field(..., description="Длительность, мс")
+    finished_at: str = Field(..., description="Время завершения (UTC, ISO)")
+
+
+class WriteBehindStats(BaseModel):
+    batch_size: int = Field(..., description="Максимум сообщений в одном коммите")
+    flush_interval_ms: float = Field(..., description="Максимальное ожидание добора пачки, мс")
+    queued: int = Field(..., description="Сообщений в очереди")
+    batches: int = Field(..., description="Выполнено групповых коммитов")
+    messages: int = Field(..., description="Записано сообщений")
+    avg_batch: float = Field(..., description="Средний размер пачки")
+    max_batch: int = Field(..., description="Максимальный размер пачки")
+    failed_batches: int = Field(..., description="Пачек, переписанных поштучно после ошибки")
+    avg_flush_ms: float = Field(..., description="Среднее время записи пачки, мс")
+
+
+class HistoryCacheStats(BaseModel):
+    chats: int = Field(..., description="Чатов в кэше")
+    max_chats: int = Field(..., description="Максимум чатов в кэше")
+    messages: int = Field(..., description="Сообщений в кэше")
+    bytes: int = Field(..., description="Оценка занятой памяти, байт")
+    max_bytes: int = Field(..., description="Лимит памяти, байт")
+    hits: int = Field(..., description="Чтений истории из кэша")
+    misses: int = Field(..., description="Чтений истории мимо кэша")
+    hit_rate: float = Field(..., description="Доля попаданий")
+    stale: int = Field(..., description="Записей, устаревших из-за изменений в другом процессе")
+    evictions: int = Field(..., description="Вытеснено чатов")
+
+
+class ChatCacheStats(BaseModel):
+    enabled: bool = Field(..., description="Кэш включён")
+    chats: int = Field(..., description="Чатов в кэше")
+    hits: int = Field(..., description="Чтений чатов из кэша")
+    misses: int = Field(..., description="Чтений таблицы chats из базы")
+    hit_rate: float = Field(..., description="Доля попаданий")
+    stale: int = Field(..., description="Сбросов кэша из-за изменения chats в другом процессе")
+    invalidations: int = Field(..., description="Сбросов кэша после изменения chats")
+
+
+class DbStats(BaseModel):
+    pool: PoolStats = Field(..., description="Статистика пула соединений")
+    storage_profile: Dict[str, Union[str, int]] = Field(..., description="PRAGMA профиля хранения")
+    last_checkpoint: Optional[WalCheckpointStats] = Field(None, description="Последний фоновый чекпоинт WAL")
+    last_reclaim: Optional[ReclaimStats] = Field(None, description="Последний запуск очистки устаревших эпох")
+    size: Optional[DbSizeStats] = Field(default=None, description="Размер файла и фрагментация")
+    maintenance: Dict[str, MaintenanceRunStats] = Field(default_factory=dict, description="Последние запуски обслуживания")
+    write_behind: Optional[WriteBehindStats] = Field(None, description="Групповой коммит, если включён")
+    history_cache: HistoryCacheStats = Field(..., description="Кэш истории чатов")
+    chat_cache: ChatCacheStats = Field(..., description="Кэш метаданных чатов")
+    shards: List["DbStats"] = Field(default_factory=list, description="Остальные шарды (шардированный режим)")
+
+
+class SessionSweepStats(BaseModel):
+    backend: str = Field(..., description="Хранилище сессий: file или sqlite")
+    swept: int = Field(..., description="Удалено устаревших сессий за запуск")
+    scanned: int = Field(..., description="Проверено сессий за запуск")
+    batches: int = Field(..., description="Пачек за запуск")
+    finished: bool = Field(..., description="Проход по всем сессиям завершён")
+    cursor: Optional[str] = Field(None, description="Позиция продолжения обхода каталога сессий")
+    duration_ms: float = Field(..., description="Длительность, мс")
+    total_swept: int = Field(..., description="Удалено устаревших сессий с запуска процесса")
+    finished_at: str = Field(..., description="Время завершения (UTC, ISO)")
+
+
+class SessionCacheStats(BaseModel):
+    entries: int = Field(..., description="Сессий в кэше (включая отрицательные записи)")
+    max_entries: int = Field(..., description="Максимум записей")
+    ttl_seconds: float = Field(..., description="Время жизни записи о сессии, с")
+    negative_ttl_seconds: float = Field(..., description="Время жизни записи о неизвестной сессии, с")
+    hits: int = Field(..., description="Сессия найдена в кэше")
+    negative_hits: int = Field(..., description="Неизвестная сессия отклонена по кэшу")
+    misses: int = Field(..., description="Чтений хранилища сессий")
+    hit_rate: float = Field(..., description="Доля запросов без обращения к хранилищу")
+    evictions: int = Field(..., description="Вытеснено записей")
+    locks: int = Field(default=0, description="Сессий с удерживаемым или ожидаемым lock")
+    last_sweep: Optional[SessionSweepStats] = Field(default=None, description="Последний запуск удаления устаревших сессий")
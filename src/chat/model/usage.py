@@ -0,0 +1,14 @@
+from datetime import date
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class ChatUsage(BaseModel):
+    chat_id: str = Field(..., description="ID чата")
+    day: Optional[date] = Field(None, description="День (UTC); None — за всё время")
+    messages: int = Field(..., description="Количество сообщений")
+    prompt_tokens: int = Field(..., description="Отправлено токенов")
+    completion_tokens: int = Field(..., description="Получено токенов")
+    request_time: float = Field(..., description="Суммарное время запросов")
+    price: float = Field(..., description="Суммарная цена")
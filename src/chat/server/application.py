@@ -1,5 +1,4 @@
 import logging
-import uuid
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator, Any
 
@@ -8,21 +7,25 @@ from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.middleware.cors import CORSMiddleware
 from starlette.staticfiles import StaticFiles
 
-from src.chat.core.constants import KEY_SESSION_ID, ONE_DAY_IN_SECONDS
 from src.chat.endpoints.login import router as router_login
 from src.chat.endpoints.root import router as router_root
 from src.chat.endpoints.chats import router as router_chats
 from src.chat.endpoints.format import router as router_format
 from src.chat.endpoints.messages import router as router_messages
+from src.chat.endpoints.stats import router as router_stats
 from src.chat.model.error import ErrorDetail, ErrorResponse
 from src.chat.ai.managers.giga_chat_manager import setup_giga_chat_manager
+from src.chat.business.session_interactor import get_session_manager
+from src.chat.business.session_maintenance import get_session_maintenance_service
 from src.chat.core.configs import settings
 from src.chat.core.logging_config import setup_logging
 from src.chat.db.db_manager import get_db_manager
+from src.chat.db.maintenance import get_db_maintenance_service
+from src.chat.server.session_middleware import SessionInitMiddleware
+from src.chat.server.static_assets import PrecompressedStaticFiles, get_static_assets
 
 logger = logging.getLogger(__name__)
 
@@ -56,6 +59,7 @@ def get_application() -> FastAPI:
     fast_app.include_router(router_chats)
     fast_app.include_router(router_format)
     fast_app.include_router(router_messages)
+    fast_app.include_router(router_stats)
 
     @fast_app.exception_handler(StarletteHTTPException)
     async def http_exception_handler(request: Request, exc: StarletteHTTPException) -> JSONResponse:
@@ -116,7 +120,14 @@ def get_application() -> FastAPI:
     # ===== Подключение статических файлов =====
     path_site: str = str(settings.SITE_DIR)
     logger.info("🚀 Подключение статических файлов")
-    fast_app.mount("/", StaticFiles(directory=path_site, html=True, check_dir=False), name="site")
+    fast_app.mount(
+        "/",
+        PrecompressedStaticFiles(
+            assets=get_static_assets(),
+            fallback=StaticFiles(directory=path_site, html=True, check_dir=False),
+        ),
+        name="site",
+    )
 
     return fast_app
 
@@ -132,32 +143,14 @@ async def _lifespan(app: FastAPI) -> AsyncGenerator[None, Any]:
     print("   - API документация: http://127.0.0.1:8010/docs")
     print("   - Альтернативная документация: http://127.0.0.1:8010/redoc")
     print("\n" + "=" * 70 + "\n")
+    await get_db_maintenance_service().start()
+    await get_session_maintenance_service().start()
     yield
     logger.info("🛑 Приложение выключается...")
-
-class SessionInitMiddleware(BaseHTTPMiddleware):
-    """Middleware для инициализации session_id в куки при первом запросе."""
-
-    async def dispatch(self, request: Request, call_next):
-        session_id = request.cookies.get(KEY_SESSION_ID)
-
-        # Если session_id не существует, генерируем новый
-        if not session_id:
-            session_id = str(uuid.uuid4())
-            logger.info(f"🆔 Новый session_id создан: {session_id}")
-
-        response = await call_next(request)
-
-        # Устанавливаем session_id в куки если его нет или если это первый запрос
-        if KEY_SESSION_ID not in request.cookies:
-            response.set_cookie(
-                key=KEY_SESSION_ID,
-                value=session_id,
-                httponly=True,
-                max_age=ONE_DAY_IN_SECONDS,
-            )
-            logger.info(f"✅ session_id установлен в куки: {session_id}")
-
-        return response
+    await get_db_maintenance_service().shutdown()
+    await get_session_maintenance_service().shutdown()
+    await get_db_manager().flush()
+    get_db_manager().close()
+    get_session_manager().close()
 
 server = get_application()
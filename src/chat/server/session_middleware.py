@@ -0,0 +1,69 @@
+"""
+Выдача session_id в cookie при первом запросе.
+
+Чистое ASGI-middleware: в отличие от BaseHTTPMiddleware не запускает обработчик в отдельной задаче
+и не оборачивает тело ответа — только дописывает Set-Cookie в http.response.start. Потоковые ответы
+и статика проходят без изменений.
+
+Новый session_id кладётся в scope["state"], поэтому обработчик первого запроса (cookie у клиента
+ещё нет) видит его через get_request_session_id.
+"""
+import logging
+import uuid
+from http.cookies import SimpleCookie
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection, cookie_parser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.chat.core.constants import KEY_SESSION_ID, ONE_DAY_IN_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def get_request_session_id(connection: HTTPConnection) -> Optional[str]:
+    """session_id из cookie, а для первого запроса — выданный SessionInitMiddleware."""
+    return connection.cookies.get(KEY_SESSION_ID) or connection.scope.get("state", {}).get(KEY_SESSION_ID)
+
+
+def _session_cookie_header(session_id: str) -> str:
+    # Те же атрибуты, что у Response.set_cookie(httponly=True, max_age=ONE_DAY_IN_SECONDS)
+    cookie: SimpleCookie = SimpleCookie()
+    cookie[KEY_SESSION_ID] = session_id
+    cookie[KEY_SESSION_ID]["max-age"] = ONE_DAY_IN_SECONDS
+    cookie[KEY_SESSION_ID]["path"] = "/"
+    cookie[KEY_SESSION_ID]["httponly"] = True
+    cookie[KEY_SESSION_ID]["samesite"] = "lax"
+    return cookie.output(header="").strip()
+
+
+class SessionInitMiddleware:
+    """Middleware для инициализации session_id в куки при первом запросе."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self._has_session_cookie(scope):
+            await self.app(scope, receive, send)
+            return
+
+        session_id = str(uuid.uuid4())
+        scope.setdefault("state", {})[KEY_SESSION_ID] = session_id
+        logger.info(f"🆔 Новый session_id создан: {session_id}")
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("set-cookie", _session_cookie_header(session_id))
+                logger.info(f"✅ session_id установлен в куки: {session_id}")
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+    @staticmethod
+    def _has_session_cookie(scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"cookie":
+                return bool(cookie_parser(value.decode("latin-1")).get(KEY_SESSION_ID))
+        return False
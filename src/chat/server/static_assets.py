@@ -0,0 +1,204 @@
+"""
+Предсжатая статика SITE_DIR с адресами по хэшу содержимого.
+
+При старте каждый файл каталога читается в память, для текстовых типов заранее готовятся варианты
+gzip и brotli (если установлен пакет brotli) — только если они меньше исходника. Вариант выбирается
+по Accept-Encoding запроса.
+
+Каждый файл доступен по двум адресам: обычному (style.css — Cache-Control: no-cache, проверка по ETag)
+и с отпечатком содержимого (style.3f9a1c2b7e.css — immutable, кэшируется браузером на год).
+Ссылки в index.html переписываются на адреса с отпечатком. Чего нет в памяти — отдаёт StaticFiles.
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.chat.core.configs import settings
+
+try:
+    import brotli  # type: ignore[import-untyped]
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Больше — не держим в памяти, отдаёт StaticFiles
+_MAX_ASSET_BYTES = 4 * 1024 * 1024
+_COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml", "application/xml")
+_REFERENCE_RE = re.compile(r'''(?P<attr>\b(?:href|src)=["'])(?P<prefix>\.?/?)(?P<path>[^"'?#:]+)''')
+
+
+@dataclass
+class StaticAsset:
+    path: str
+    fingerprinted_path: str
+    media_type: str
+    etag: str
+    # кодировка ("identity", "gzip", "br") -> тело
+    variants: Dict[str, bytes] = field(default_factory=dict)
+
+    def select(self, accept_encoding: str) -> Tuple[str, bytes]:
+        accepted = _parse_accept_encoding(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+                return encoding, self.variants[encoding]
+        return "identity", self.variants["identity"]
+
+
+def _parse_accept_encoding(value: str) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for item in value.split(","):
+        name, _, params = item.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def _fingerprint(path: str, digest: str) -> str:
+    stem, dot, suffix = path.rpartition(".")
+    if not dot or "/" in suffix:
+        return f"{path}.{digest}"
+    return f"{stem}.{digest}.{suffix}"
+
+
+class StaticAssets:
+
+    def __init__(self, site_dir: Path, precompress: bool = True, min_compress_bytes: int = 0) -> None:
+        self.site_dir: Path = site_dir
+        self.precompress: bool = precompress
+        self.min_compress_bytes: int = min_compress_bytes
+        # URL-путь без ведущего "/" -> (файл, адрес с отпечатком)
+        self._by_path: Dict[str, Tuple[StaticAsset, bool]] = {}
+        self._assets: List[StaticAsset] = []
+
+    def build(self) -> "StaticAssets":
+        if not self.site_dir.exists():
+            logger.warning(f"⚠️ Каталог статики не найден: {self.site_dir}")
+            return self
+
+        encodings = ["gzip"] + (["br"] if brotli is not None else [])
+        for root, _, files in os.walk(self.site_dir):
+            for name in sorted(files):
+                file_path = Path(root) / name
+                if file_path.stat().st_size > _MAX_ASSET_BYTES:
+                    continue
+                self._add(file_path, encodings)
+
+        compressed = sum(len(asset.variants) > 1 for asset in self._assets)
+        logger.info(
+            f"📦 Статика подготовлена: {len(self._assets)} файлов, сжато {compressed}, "
+            f"варианты: {', '.join(encodings) if self.precompress else 'нет'}"
+        )
+        return self
+
+    def _add(self, file_path: Path, encodings: List[str]) -> None:
+        body = file_path.read_bytes()
+        digest = hashlib.sha256(body).hexdigest()
+        path = file_path.relative_to(self.site_dir).as_posix()
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+        asset = StaticAsset(
+            path=path,
+            fingerprinted_path=_fingerprint(path, digest[:10]),
+            media_type=media_type,
+            etag=f'"{digest[:32]}"',
+            variants={"identity": body},
+        )
+        if self.precompress and len(body) >= self.min_compress_bytes and media_type.startswith(_COMPRESSIBLE_TYPES):
+            for encoding in encodings:
+                # mtime=0 — одинаковые байты gzip при каждом запуске
+                variant = gzip.compress(body, compresslevel=9, mtime=0) if encoding == "gzip" else brotli.compress(body)
+                if len(variant) < len(body):
+                    asset.variants[encoding] = variant
+
+        self._assets.append(asset)
+        self._by_path[asset.path] = (asset, False)
+        self._by_path[asset.fingerprinted_path] = (asset, True)
+
+    def lookup(self, path: str) -> Optional[Tuple[StaticAsset, bool]]:
+        """Файл по URL-пути и признак адреса с отпечатком."""
+        return self._by_path.get(path.lstrip("/"))
+
+    def rewrite_references(self, html: bytes) -> bytes:
+        """Заменяет href/src на известные файлы адресами с отпечатком."""
+
+        def replace(match: "re.Match[str]") -> str:
+            found = self._by_path.get(match.group("path"))
+            if found is None or found[1]:
+                original: str = match.group(0)
+                return original
+            return f'{match.group("attr")}{match.group("prefix")}{found[0].fingerprinted_path}'
+
+        return _REFERENCE_RE.sub(replace, html.decode("utf-8")).encode("utf-8")
+
+
+class PrecompressedStaticFiles:
+    """ASGI-приложение: файлы из StaticAssets из памяти, остальное — в fallback (StaticFiles)."""
+
+    def __init__(self, assets: StaticAssets, fallback: ASGIApp) -> None:
+        self.assets = assets
+        self.fallback = fallback
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        found = None
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            found = self.assets.lookup(scope["path"])
+        if found is None:
+            await self.fallback(scope, receive, send)
+            return
+
+        asset, fingerprinted = found
+        request_headers = Headers(scope=scope)
+        headers = {
+            "ETag": asset.etag,
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if fingerprinted else REVALIDATE_CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and asset.etag in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}:
+            await Response(status_code=304, headers=headers)(scope, receive, send)
+            return
+
+        encoding, body = asset.select(request_headers.get("accept-encoding", ""))
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        response = Response(body, media_type=asset.media_type, headers=headers)
+        if scope["method"] == "HEAD":
+            response.body = b""
+        await response(scope, receive, send)
+
+
+_static_assets: Optional[StaticAssets] = None
+
+
+def get_static_assets() -> StaticAssets:
+    global _static_assets
+    if _static_assets is None:
+        _static_assets = StaticAssets(
+            site_dir=settings.SITE_DIR,
+            precompress=settings.STATIC_PRECOMPRESS,
+            min_compress_bytes=settings.STATIC_COMPRESS_MIN_BYTES,
+        ).build()
+    return _static_assets
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from src.chat.business.session_interactor import SessionManager
+from src.chat.business.session_store import FileSessionStore
+
+CONCURRENCY = 50
+
+
+class CountingFileSessionStore(FileSessionStore):
+    """Файловое хранилище, которое запоминает записи и их максимальную параллельность."""
+
+    def __init__(self, sessions_dir: Path, write_delay: float = 0.005) -> None:
+        super().__init__(sessions_dir=sessions_dir, ttl=3600)
+        self.write_delay: float = write_delay
+        self.saved: List[Dict[str, Any]] = []
+        self.max_parallel: int = 0
+        self._parallel: int = 0
+        self._counter_lock = threading.Lock()
+
+    def save(self, session_id: str, record: Dict[str, Any]) -> None:
+        with self._counter_lock:
+            self.saved.append(record)
+            self._parallel += 1
+            self.max_parallel = max(self.max_parallel, self._parallel)
+        try:
+            # Задержка держит записи открытыми достаточно долго, чтобы параллельность была видна
+            time.sleep(self.write_delay)
+            super().save(session_id, record)
+        finally:
+            with self._counter_lock:
+                self._parallel -= 1
+
+
+def test_concurrent_first_requests_create_one_session(tmp_path: Path) -> None:
+    store = CountingFileSessionStore(tmp_path)
+    manager = SessionManager(store=store)
+
+    async def scenario() -> List[Dict[str, Any]]:
+        return await asyncio.gather(*[manager.get_or_create_session("new") for _ in range(CONCURRENCY)])
+
+    sessions = asyncio.run(scenario())
+
+    assert len(store.saved) == 1
+    assert len({session["created_at"] for session in sessions}) == 1
+    assert len(manager._locks) == 0
+
+
+def test_concurrent_login_creates_one_session(tmp_path: Path) -> None:
+    store = CountingFileSessionStore(tmp_path)
+    manager = SessionManager(store=store)
+
+    async def scenario() -> None:
+        await asyncio.gather(*[manager.login("new", "password") for _ in range(CONCURRENCY)])
+
+    asyncio.run(scenario())
+
+    created = [record for record in store.saved if record["password"]["hash"] is None]
+    assert len(created) == 1
+    assert [path.name for path in tmp_path.glob("*.json")] == ["new.json"]
+    assert store.load("new") == asyncio.run(manager.get_session("new"))
+
+
+def test_same_session_writes_do_not_lose_updates(tmp_path: Path) -> None:
+    store = CountingFileSessionStore(tmp_path)
+    manager = SessionManager(store=store)
+
+    async def scenario() -> List[str]:
+        await manager.get_or_create_session("user")
+        return await asyncio.gather(*[manager.set_password("user", f"password-{n}") for n in range(CONCURRENCY)])
+
+    salts = asyncio.run(scenario())
+
+    # Записи одной сессии идут строго по одной, и последняя из них — та, что в хранилище и в кэше
+    assert store.max_parallel == 1
+    assert len(set(salts)) == CONCURRENCY
+    stored = store.load("user")
+    assert stored is not None and stored == store.saved[-1]
+    assert stored == asyncio.run(manager.get_session("user"))
+    assert len(manager._locks) == 0
+
+
+def test_unrelated_sessions_write_in_parallel(tmp_path: Path) -> None:
+    store = CountingFileSessionStore(tmp_path)
+    manager = SessionManager(store=store)
+    session_ids = [f"user-{n}" for n in range(CONCURRENCY)]
+
+    async def scenario() -> List[str]:
+        await asyncio.gather(*[manager.get_or_create_session(session_id) for session_id in session_ids])
+        store.max_parallel = 0
+        return await asyncio.gather(*[manager.set_password(session_id, "password") for session_id in session_ids])
+
+    salts = asyncio.run(scenario())
+
+    assert store.max_parallel > 1
+    # Ни одна запись не потерялась: у каждой сессии в хранилище соль, которую вернул её set_password
+    for session_id, salt in zip(session_ids, salts):
+        stored = store.load(session_id)
+        assert stored is not None and stored["password"]["salt"] == salt
+    assert len(manager._locks) == 0
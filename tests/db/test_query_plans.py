@@ -0,0 +1,20 @@
+from pathlib import Path
+
+from src.chat.db.db_manager import DbManager
+from src.chat.db.sharded_db_manager import ShardedDbManager
+
+
+def test_history_queries_use_indexes(tmp_path: Path) -> None:
+    db = DbManager(db_dir=tmp_path, write_behind=False)
+    try:
+        assert db.check_query_plans() == []
+    finally:
+        db.close()
+
+
+def test_history_queries_use_indexes_in_every_shard(tmp_path: Path) -> None:
+    db = ShardedDbManager(shard_count=3, db_dir=tmp_path, write_behind=False)
+    try:
+        assert db.check_query_plans() == []
+    finally:
+        db.close()
@@ -0,0 +1,108 @@
+import asyncio
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+from src.chat.db.db_manager import DbManager
+from src.chat.db.sharded_db_manager import ShardedDbManager
+from src.chat.model.chat import Chat
+from src.chat.model.messages import Message, MessageType
+
+CHAT_IDS = ("1", "2", "12", "mcp_default", "custom")
+
+Snapshot = Dict[str, Tuple[List[str], List[str], int]]
+
+
+def make_message(chat_id: str, text: str) -> Message:
+    return Message(
+        id=None,
+        chat_id=chat_id,
+        session_id="session",
+        agent_id=None,
+        message_type=MessageType.USER,
+        name="user",
+        timestamp="00:00:00",
+        message=text,
+        prompt_tokens=1,
+        completion_tokens=2,
+        request_time=0,
+        price=3,
+        meta="",
+    )
+
+
+async def snapshot(db: Union[DbManager, ShardedDbManager]) -> Snapshot:
+    return {
+        chat_id: (
+            [message.message for message in await db.get_messages(chat_id)],
+            [message.message for message in await db.get_archived_messages(chat_id)],
+            (await db.get_usage(chat_id)).messages,
+        )
+        for chat_id in CHAT_IDS
+    }
+
+
+async def fill(db: DbManager) -> Snapshot:
+    await db.add_chat(Chat(id="custom", name="custom", system_prompt="prompt", created_at=None))
+    for chat_id in CHAT_IDS:
+        for number in range(3):
+            await db.add_message(make_message(chat_id, f"{chat_id} old {number}"))
+        await db.replace_chat_history(chat_id, [make_message(chat_id, f"{chat_id} summary")])
+        await db.add_message(make_message(chat_id, f"{chat_id} new"))
+    return await snapshot(db)
+
+
+def test_enabling_shards_moves_history(tmp_path: Path) -> None:
+    db = DbManager(db_dir=tmp_path, write_behind=False)
+    expected = asyncio.run(fill(db))
+    db.close()
+
+    for shard_count in (3, 2, 1):
+        sharded = ShardedDbManager(shard_count=shard_count, db_dir=tmp_path, write_behind=False)
+        try:
+            assert asyncio.run(snapshot(sharded)) == expected
+            assert sorted(chat.id for chat in asyncio.run(sharded.get_chats())) == sorted(CHAT_IDS)
+            chat = asyncio.run(sharded.get_chat_by_id("custom"))
+            assert chat is not None and chat.system_prompt == "prompt"
+        finally:
+            sharded.close()
+
+
+def test_history_written_without_shards_is_appended(tmp_path: Path) -> None:
+    sharded = ShardedDbManager(shard_count=3, db_dir=tmp_path, write_behind=False)
+    asyncio.run(sharded.add_message(make_message("1", "sharded")))
+    sharded.close()
+
+    # Запуск с DB_SHARDS=1 снова создаёт чат "1" в app.db и пишет в него
+    db = DbManager(db_dir=tmp_path, write_behind=False)
+    asyncio.run(db.add_message(make_message("1", "single")))
+    db.close()
+
+    sharded = ShardedDbManager(shard_count=3, db_dir=tmp_path, write_behind=False)
+    try:
+        messages = asyncio.run(sharded.get_messages("1"))
+        assert [message.message for message in messages] == ["sharded", "single"]
+        assert asyncio.run(sharded.get_usage("1")).messages == 2
+    finally:
+        sharded.close()
+
+
+def test_search_across_shards_pages_by_id(tmp_path: Path) -> None:
+    sharded = ShardedDbManager(shard_count=3, db_dir=tmp_path, write_behind=False)
+    try:
+        for number in range(7):
+            for chat_id in CHAT_IDS[:4]:
+                asyncio.run(sharded.add_message(make_message(chat_id, f"needle {number}")))
+
+        found: List[int] = []
+        cursor = None
+        while True:
+            page = asyncio.run(sharded.search_messages("needle", limit=5, cursor=cursor))
+            found.extend(result.message_id for result in page.results)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+        assert len(found) == 28
+        assert found == sorted(found, reverse=True)
+    finally:
+        sharded.close()
@@ -2,6 +2,9 @@
 let currentPassword = '';
 let selectedChatId = null;
 let messageHistory = [];
+let historyCursor = null;
+let isLoadingOlderHistory = false;
+const HISTORY_PAGE_SIZE = 50;
 let currentResponseFormat = {
   format_type: '[DEFAULT]',
   format: ''
@@ -180,8 +183,12 @@ async function sendMessage(message) {
   return response.json();
 }
 
-async function getMessageHistory(chatId) {
-  const response = await fetch(`/v1/history_message?id=${chatId}`, {
+async function getMessageHistory(chatId, beforeId = null) {
+  let url = `/v1/history_message?id=${chatId}&limit=${HISTORY_PAGE_SIZE}`;
+  if (beforeId !== null) {
+    url += `&before_id=${beforeId}`;
+  }
+  const response = await fetch(url, {
     credentials: 'include'
   });
 
@@ -279,6 +286,38 @@ function renderMessages(messages) {
   scrollToBottom();
 }
 
+// Подгрузка более старых сообщений при прокрутке к началу
+async function loadOlderMessages() {
+  if (!historyCursor || isLoadingOlderHistory || !selectedChatId) {
+    return;
+  }
+
+  isLoadingOlderHistory = true;
+  try {
+    const historyResponse = await getMessageHistory(selectedChatId, historyCursor);
+    const olderMessages = historyResponse.messages || [];
+    historyCursor = historyResponse.next_cursor;
+
+    const previousHeight = messageArea.scrollHeight;
+    const firstChild = messageArea.firstChild;
+    olderMessages.forEach(message => {
+      messageArea.insertBefore(renderMessage(message), firstChild);
+    });
+    messageHistory = olderMessages.concat(messageHistory);
+    messageArea.scrollTop = messageArea.scrollHeight - previousHeight;
+  } catch (error) {
+    showNotification('Ошибка загрузки истории: ' + error.message, 'error');
+  } finally {
+    isLoadingOlderHistory = false;
+  }
+}
+
+messageArea.addEventListener('scroll', () => {
+  if (messageArea.scrollTop === 0) {
+    loadOlderMessages();
+  }
+});
+
 
 async function isAuthorized() {
   try {
@@ -372,6 +411,7 @@ async function initializeApp() {
       const historyResponse = await getMessageHistory(selectedChatId);
       if (historyResponse.messages) {
         messageHistory = historyResponse.messages;
+        historyCursor = historyResponse.next_cursor;
         console.log(`✅ Загружено ${messageHistory.length} сообщений`);
         renderMessages(messageHistory);
       } else {
@@ -462,6 +502,7 @@ chatSelector.addEventListener('change', async (e) => {
     const historyResponse = await getMessageHistory(chatId);
     if (historyResponse.messages) {
       messageHistory = historyResponse.messages;
+      historyCursor = historyResponse.next_cursor;
       renderMessages(messageHistory);
     }
     showNotification(`Чат "${chatId}" выбран`, 'success');
@@ -532,6 +573,7 @@ clearChatBtn.addEventListener('click', async () => {
   try {
     await deleteMessageHistory(selectedChatId);
     messageHistory = [];
+    historyCursor = null;
     renderMessages(messageHistory);
     showNotification('История текущего чата очищена', 'success');
   } catch (error) {